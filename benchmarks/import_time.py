@@ -0,0 +1,138 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+Import-time benchmark of the tools package and of the scripts. Every module is imported, and every
+script with a command line is run with --help, in a fresh interpreter; the best wall time of a few
+repeats is compared with its budget, and the heavy libraries that must only be imported on first use
+are checked to be absent. The script exits with status 1 if a module or script is over budget or
+imports a deferred library, so that start-up regressions are caught. The scripts without a command line
+run their whole workflow and are not measured.
+
+Usage: python benchmarks/import_time.py [--repeat N] [--scale FACTOR]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import budget of every module, in seconds
+BUDGETS = {
+    'tools.events': 0.5,
+    'tools.ogip': 0.5,
+    'tools.gti': 0.4,
+    'tools.timeconv': 0.4,
+    'tools.timing': 0.5,
+    'tools.phasespec': 0.5,
+    'tools.pulseprofile': 0.5,
+    'tools.timeslice': 0.6,
+    'tools.flares': 0.6,
+    'tools.specstack': 0.6,
+    'tools.xspecbatch': 0.6,
+    'tools.specfold': 0.8,
+    'tools.xspecplot': 0.4,
+    'tools.plotLC': 0.6,
+    'tools.js9helper': 0.6,
+    'tools.extract': 0.6,
+    'tools.sasrun': 0.4,
+    'tools.scratch': 0.4,
+    'tools.campaign': 0.4,
+    'tools.pipeline': 0.4,
+    'tools.store': 0.4,
+    'tools.preview': 0.5,
+    'tools.synthetic': 0.5,
+    'tools.sasstub': 0.5,
+}
+
+# Start-up budget of every script with a command line (run with --help), in seconds
+SCRIPT_BUDGETS = {
+    'scripts/campaign.py': 0.4,
+    'scripts/energy-resolvedLC.py': 0.6,
+    'scripts/gtiloop.py': 0.6,
+    'scripts/loopgtispectra.py': 0.6,
+    'scripts/make-synthetic-data.py': 0.6,
+    'scripts/run-pipeline.py': 0.4,
+    'scripts/slim-events.py': 0.6,
+    'scripts/spectrum-extractor.py': 0.6,
+    'scripts/store-products.py': 0.4,
+}
+
+# Libraries that are only imported by the functions that need them
+DEFERRED = ('matplotlib.pyplot', 'plotly', 'lcviz', 'jdaviz', 'lightkurve', 'xspec', 'jpyjs9',
+            'pysas', 'scipy.optimize', 'astropy.table')
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{'time': elapsed, 'deferred': [name for name in {deferred!r} if name in sys.modules]}}))
+"""
+
+SCRIPT_PROBE = """
+import json, runpy, sys, time
+sys.argv = [{script!r}, '--help']
+start = time.perf_counter()
+try:
+    runpy.run_path({script!r}, run_name='__main__')
+except SystemExit:
+    pass
+elapsed = time.perf_counter() - start
+print(json.dumps({{'time': elapsed, 'deferred': [name for name in {deferred!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module, repeat=5):
+    """
+    Returns the best import time (in seconds) of a module, or the best start-up time of a script
+    ("scripts/<name>.py", run with --help), over fresh interpreters, and the deferred libraries it imported.
+    """
+    if module.endswith('.py'):
+        probe = SCRIPT_PROBE.format(script=os.path.join(REPO_DIR, module), deferred=DEFERRED)
+    else:
+        probe = PROBE.format(module=module, deferred=DEFERRED)
+    best, deferred = None, []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-c', probe],
+                                cwd=REPO_DIR, capture_output=True, text=True, check=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        best = result['time'] if best is None else min(best, result['time'])
+        deferred = result['deferred']
+    return best, deferred
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters per module (default 5)')
+    parser.add_argument('--scale', type=float, default=1.0, help='Multiply all budgets (slow machines)')
+    args = parser.parse_args()
+
+    failures = []
+    print(f"{'module':<32}{'time (s)':>10}{'budget (s)':>12}  deferred imports")
+    for module, budget in {**BUDGETS, **SCRIPT_BUDGETS}.items():
+        try:
+            elapsed, deferred = measure(module, args.repeat)
+        except subprocess.CalledProcessError as e:
+            print(f"{module:<32}{'failed':>10}{budget * args.scale:>12.3f}  {e.stderr.strip().splitlines()[-1]}")
+            failures.append(module)
+            continue
+        print(f"{module:<32}{elapsed:>10.3f}{budget * args.scale:>12.3f}  {', '.join(deferred) or '-'}")
+        if elapsed > budget * args.scale or deferred:
+            failures.append(module)
+
+    if failures:
+        print(f"Start-up regression in: {', '.join(failures)}")
+        sys.exit(1)
+    print("All modules and scripts within budget.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+Benchmark of the pipeline stages on synthetic event lists of several sizes (tools/synthetic.py). Each
+stage (column cache, gtiloop, loopgtispectra, energy-resolvedLC, plotVelaX1LC, plotLC, read_lightcurve)
+runs in a fresh interpreter, and its wall time and peak memory (maximum resident set size of the process)
+are recorded. The SAS tasks run with the Wrapper selected by --sas-wrapper (default is the local stand-in
+of tools/sasstub.py, so that no SAS installation is needed). The results are written as JSON, by default
+to benchmarks/results/<commit>.json, and can be compared with the results of another commit: the script
+exits with status 1 if a stage is slower, or uses more memory, than the baseline by more than the threshold,
+or if a stage that ran in the baseline fails or is skipped. Stages whose libraries are not installed (e.g.
+Plotly or lightkurve) are reported as skipped.
+
+Usage: python benchmarks/pipeline_stages.py [--sizes 1e5 1e6 ...] [--repeat N] [--compare BASELINE.json]
+"""
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, 'benchmarks', 'results')
+
+# Event list sizes (number of events)
+SIZES = (1e5, 1e6)
+
+# Relative increase of the time or memory of a stage counted as a regression, and the absolute
+# differences below which a change is considered noise
+THRESHOLD = 0.2
+MIN_TIME = 0.05
+MIN_MEMORY_MB = 10.0
+
+# Number of pulse GTIs extracted by the loopgtispectra stage (the same for every size)
+MAX_SLICES = 50
+
+
+def _lightcurves(workdir):
+    lightcurves = sorted(glob.glob(os.path.join(workdir, 'PN_lccorr_*.lc')))
+    if not lightcurves:
+        raise FileNotFoundError("No light curves, the energy-resolvedLC stage did not run.")
+    return lightcurves
+
+
+def stage_column_cache(table, workdir, max_slices):
+    from tools.events import EVENT_COLUMNS, cache_event_columns
+    cache_event_columns(table, EVENT_COLUMNS)
+    return {'columns': len(EVENT_COLUMNS)}
+
+
+def stage_gtiloop(table, workdir, max_slices):
+    from tools.extract import pulse_gtis
+    return {'products': len(pulse_gtis(table, os.path.join(workdir, 'gti_files')))}
+
+
+def stage_loopgtispectra(table, workdir, max_slices):
+    from tools.extract import gti_spectra
+    gti_files = sorted(glob.glob(os.path.join(workdir, 'gti_files', '*.fits')))[:max_slices]
+    if not gti_files:
+        raise FileNotFoundError("No GTI files, the gtiloop stage did not run.")
+    return {'products': len(gti_spectra(table, gti_files, os.path.join(workdir, 'spectra')))}
+
+
+def stage_energy_resolved_lc(table, workdir, max_slices):
+    from tools.extract import energy_resolved_lightcurves
+    return {'products': len(energy_resolved_lightcurves(table, workdir))}
+
+
+def stage_plot_vela_x1_lc(table, workdir, max_slices):
+    from tools.plotLC import plotVelaX1LC
+    lightcurves = _lightcurves(workdir)
+    plotVelaX1LC(lightcurves, [os.path.basename(path) for path in lightcurves],
+                 figname=os.path.join(workdir, 'lightcurve.png'))
+    return {'products': len(lightcurves)}
+
+
+def stage_plot_lc(table, workdir, max_slices):
+    from tools.plotLC import plotLC
+    lightcurves = _lightcurves(workdir)
+    plotLC(lightcurves, [os.path.basename(path) for path in lightcurves])
+    return {'products': len(lightcurves)}
+
+
+def stage_read_lightcurve(table, workdir, max_slices):
+    from tools.plotLC import read_lightcurve
+    return {'products': len([read_lightcurve(path) for path in _lightcurves(workdir)])}
+
+
+# Stages in running order; the later stages read the products of the earlier ones
+STAGES = {
+    'column_cache': stage_column_cache,
+    'gtiloop': stage_gtiloop,
+    'loopgtispectra': stage_loopgtispectra,
+    'energy-resolvedLC': stage_energy_resolved_lc,
+    'plotVelaX1LC': stage_plot_vela_x1_lc,
+    'plotLC': stage_plot_lc,
+    'read_lightcurve': stage_read_lightcurve,
+}
+
+
+def _peak_rss_mb():
+    # VmHWM starts again with the new process image, whereas on Linux ru_maxrss keeps the peak of the
+    # parent across fork and exec
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in kB on Linux and in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024**2 if sys.platform == 'darwin' else peak / 1024
+
+
+def run_stage(name, table, workdir, max_slices):
+    """
+    Runs one stage in this process and returns its result: "status" ("ok", "skipped" when a library is
+    missing, or "failed"), "time" (s), "peak_rss_mb" and "info" or "detail".
+    """
+    sys.path.insert(0, REPO_DIR)
+    start = time.perf_counter()
+    try:
+        info = STAGES[name](table, workdir, max_slices)
+    except ModuleNotFoundError as e:
+        return {'status': 'skipped', 'detail': f"{e.name} is not installed"}
+    except Exception as e:
+        return {'status': 'failed', 'detail': f"{type(e).__name__}: {e}"}
+    return {'status': 'ok', 'time': time.perf_counter() - start, 'peak_rss_mb': _peak_rss_mb(), 'info': info}
+
+
+def measure(name, table, workdir, max_slices, repeat=1, env=None):
+    """
+    Returns the result of a stage run in fresh interpreters: the best time of the repeats, with the
+    peak memory of that run.
+    """
+    best = None
+    for _ in range(repeat):
+        process = subprocess.run([sys.executable, os.path.abspath(__file__), '--run-stage', name, '--table', table,
+                                  '--workdir', workdir, '--max-slices', str(max_slices)],
+                                 cwd=workdir, env=env, capture_output=True, text=True)
+        lines = process.stdout.strip().splitlines()
+        try:
+            result = json.loads(lines[-1])
+        except (IndexError, json.JSONDecodeError):
+            stderr = process.stderr.strip().splitlines()
+            return {'status': 'failed', 'detail': stderr[-1] if stderr else f"exit code {process.returncode}"}
+        if result['status'] != 'ok':
+            return result
+        if best is None or result['time'] < best['time']:
+            best = result
+    return best
+
+
+def event_list(data_dir, size, seed=0):
+    """
+    Returns the path of the synthetic event list of a size, writing it on first use.
+    """
+    from tools.synthetic import synthetic_event_list
+
+    table = os.path.join(data_dir, f'events_{int(size)}_seed{seed}', 'PN_clean_evt.fits')
+    if not os.path.exists(table):
+        os.makedirs(os.path.dirname(table), exist_ok=True)
+        print(f"Writing a synthetic event list of {int(size)} events...")
+        synthetic_event_list(table, nevents=int(size), seed=seed)
+    return table
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Returns the regressions of results with respect to baseline, as lines of text: the stages that ran in
+    the baseline but failed or were skipped, and the stages that are slower or use more memory by more than
+    the threshold (and by more than MIN_TIME or MIN_MEMORY_MB).
+    """
+    regressions = []
+    for size, stages in results['results'].items():
+        for name, result in stages.items():
+            base = baseline['results'].get(size, {}).get(name)
+            if not base or base['status'] != 'ok':
+                continue
+            if result['status'] != 'ok':
+                regressions.append(f"{name} ({size} events): {result['status']} ({result.get('detail', '')}), "
+                                   f"ok in the baseline")
+                continue
+            for key, unit, minimum in (('time', 's', MIN_TIME), ('peak_rss_mb', 'MB', MIN_MEMORY_MB)):
+                if result[key] > base[key] * (1 + threshold) and result[key] - base[key] > minimum:
+                    regressions.append(f"{name} ({size} events): {key} {result[key]:.3f} {unit} vs "
+                                       f"{base[key]:.3f} {unit} ({result[key] / base[key] - 1:+.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=float, nargs='+', default=SIZES, help="Event list sizes, e.g. 1e5 1e6 1e7 1e8")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES), help="Stages to run")
+    parser.add_argument('--repeat', type=int, default=1, help="Fresh interpreters per stage (default 1)")
+    parser.add_argument('--max-slices', type=int, default=MAX_SLICES, help="GTIs extracted by loopgtispectra")
+    parser.add_argument('--sas-wrapper', default='tools.sasstub:Wrapper', help="SAS_WRAPPER of the SAS tasks")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'xmm-benchmark-data'),
+                        help="Directory of the synthetic event lists, kept between runs")
+    parser.add_argument('--output', help="Results file (default is benchmarks/results/<commit>.json)")
+    parser.add_argument('--compare', help="Results file of the baseline commit")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="Relative increase counted as a regression")
+    parser.add_argument('--run-stage', help=argparse.SUPPRESS)
+    parser.add_argument('--table', help=argparse.SUPPRESS)
+    parser.add_argument('--workdir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_stage:
+        print(json.dumps(run_stage(args.run_stage, args.table, args.workdir, args.max_slices)))
+        return
+
+    sys.path.insert(0, REPO_DIR)
+    env = dict(os.environ, SAS_WRAPPER=args.sas_wrapper, MPLBACKEND='Agg')
+    commit = _commit()
+    results = {'commit': commit, 'date': datetime.datetime.now().isoformat(timespec='seconds'),
+               'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count(),
+               'sas_wrapper': args.sas_wrapper, 'max_slices': args.max_slices, 'results': {}}
+
+    print(f"{'stage':<20}{'events':>12}{'time (s)':>10}{'peak (MB)':>11}  info")
+    for size in args.sizes:
+        table = event_list(args.data_dir, size)
+        # The column cache is built again by the column_cache stage, and read by the later stages
+        if 'column_cache' in args.stages:
+            shutil.rmtree(f'{table}.cols', ignore_errors=True)
+        workdir = tempfile.mkdtemp(prefix='xmm-benchmark-')
+        stages = results['results'][str(int(size))] = {}
+        try:
+            for name in args.stages:
+                result = stages[name] = measure(name, table, workdir, args.max_slices, args.repeat, env)
+                if result['status'] == 'ok':
+                    print(f"{name:<20}{int(size):>12}{result['time']:>10.3f}{result['peak_rss_mb']:>11.1f}  "
+                          f"{', '.join(f'{key}={value}' for key, value in result['info'].items())}")
+                else:
+                    print(f"{name:<20}{int(size):>12}{result['status']:>10}{'-':>11}  {result['detail']}")
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{commit}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=4)
+    print(f"Results written to {output}.")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        if (baseline.get('sas_wrapper'), baseline.get('max_slices')) != (args.sas_wrapper, args.max_slices):
+            print("Warning: the baseline was run with other --sas-wrapper or --max-slices settings.")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Regressions with respect to {baseline['commit']}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"No regression with respect to {baseline['commit']} (threshold {args.threshold:.0%}).")
+
+
+if __name__ == '__main__':
+    main()
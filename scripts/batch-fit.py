@@ -0,0 +1,51 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+import glob
+import os.path
+import sys
+
+# Make the tools package importable when running from the scripts directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.specfold import fit_spectra_fast
+from tools.xspecbatch import fit_chain, fit_spectra
+
+
+# Grouped spectra produced by loopgtispectra.py
+spectrum_dir = "./spectra"
+grouped_spectra = sorted(glob.glob(os.path.join(spectrum_dir, "PN_spectrum_grp_*.fits")))
+
+# Same model definition for every spectrum
+model = "phabs*(powerlaw + gaussian)"
+params = {1: 1.0,      # nH (10^22 cm^-2)
+          2: 1.0,      # Photon index
+          3: 0.1,      # Power-law normalisation
+          4: 6.4,      # Fe K-alpha line energy (keV)
+          5: 0.1,      # Line width (keV)
+          6: 1e-3}     # Line normalisation
+
+# 'parallel' fits every spectrum from the initial values above, 'chain' orders the spectra by
+# time and seeds each slice with the best fit of the previous one, 'fast' is a quick-look fit of
+# an absorbed power law folded natively through the RMF/ARF, without XSPEC
+mode = 'chain'
+n_chains = 4      # Number of contiguous chains fitted in parallel (chain mode)
+
+print(f"Fitting {len(grouped_spectra)} spectra with {model} ({mode} mode)...")
+if mode == 'chain':
+    results = fit_chain(grouped_spectra, model, params=params, nchains=n_chains, ignore="**-0.5 10.0-**", statistic='chi')
+    for row in results:
+        print(f"{row['SPECTRUM']}: {row['NITER']} iterations, {row['TIME_S']:.2f} s, seeded from {row['SEED']}")
+elif mode == 'fast':
+    results = fit_spectra_fast(grouped_spectra, model='wabs*powerlaw', params={'nH': 1.0, 'PhoIndex': 1.0},
+                               erange=(0.5, 10.0), statistic='chi')
+else:
+    results = fit_spectra(grouped_spectra, model, params=params, ignore="**-0.5 10.0-**", statistic='chi')
+
+out_file = os.path.join(spectrum_dir, "batch_fit_results.fits")
+results.write(out_file, overwrite=True)
+print(results)
+print(f"Fit results saved in {out_file}.")
@@ -0,0 +1,67 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+import argparse
+import json
+import os.path
+import sys
+import time
+
+# Make the tools package importable when running from the scripts directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.campaign import DEFAULT_PIPELINE, campaign_status, create_campaign, requeue, run_worker
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the same reduction over many observations from a shared queue.")
+    parser.add_argument('campaign_dir', help="Campaign directory, on a file system shared by the worker nodes")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    create = commands.add_parser('create', help="Create a campaign, or add observations to it")
+    create.add_argument('observations', nargs='+', help="ODF IDs or ODF directories")
+    create.add_argument('--pipeline', default=DEFAULT_PIPELINE, help="module:function run for every observation")
+    create.add_argument('--cpus', type=int, default=1, help="CPUs used by one observation")
+    create.add_argument('--memory-gb', type=float, default=4.0, help="Memory used by one observation in GB")
+    create.add_argument('--params', default='{}', help="Parameters of the pipeline, as JSON or a JSON file")
+
+    work = commands.add_parser('work', help="Run queued observations on this node")
+    work.add_argument('--cpus', type=int, default=None, help="CPU budget of this node (default is all CPUs)")
+    work.add_argument('--memory-gb', type=float, default=None, help="Memory budget in GB (default is the available memory)")
+    work.add_argument('--max-observations', type=int, default=None, help="Stop after this many observations")
+
+    commands.add_parser('status', help="Show the state of every observation")
+
+    retry = commands.add_parser('requeue', help="Put failed and stale observations back in the queue")
+    retry.add_argument('--stale-after', type=float, default=600.0, help="Age in seconds of stale running observations")
+    args = parser.parse_args()
+
+    if args.command == 'create':
+        params = json.load(open(args.params)) if os.path.isfile(args.params) else json.loads(args.params)
+        added = create_campaign(args.campaign_dir, args.observations, pipeline=args.pipeline, cpus=args.cpus,
+                                memory_gb=args.memory_gb, params=params)
+        print(f"{len(added)} observations added to {args.campaign_dir}.")
+    elif args.command == 'work':
+        results = run_worker(args.campaign_dir, cpus=args.cpus, memory_gb=args.memory_gb,
+                             max_observations=args.max_observations)
+        print(f"{sum(state == 'done' for state in results.values())} of {len(results)} observations done.")
+    elif args.command == 'status':
+        for obsid, entry in campaign_status(args.campaign_dir).items():
+            line = f"{obsid}  {entry['state']:8s}  attempts={entry.get('attempts', 0)}"
+            if entry['state'] == 'running':
+                line += f"  host={entry.get('host')}  running for {time.time() - entry['started']:.0f} s"
+            elif entry['state'] in ('done', 'failed'):
+                line += f"  host={entry.get('host')}  {entry.get('elapsed', 0):.0f} s"
+            if entry.get('error'):
+                line += f"  {entry['error']}"
+            print(line)
+    else:
+        print(f"Requeued: {requeue(args.campaign_dir, stale_after=args.stale_after)}")
+
+
+# The worker starts one spawned process per observation, which re-imports this script
+if __name__ == '__main__':
+    main()
@@ -5,112 +5,37 @@
 #   this file, may be copied, modified, propagated, or distributed except according to
 #   the terms contained in the file ‘LICENCE.txt’.
 
-from pysas.wrapper import Wrapper as w
+import argparse
 import os.path
-from os import path
-import subprocess
-import numpy as np
-import matplotlib.pyplot as plt
-from astropy.io import fits
-from astropy.table import Table
-from matplotlib.colors import LogNorm
-from matplotlib.ticker import ScalarFormatter  # For formatting axis labels
+import sys
+
+# Make the tools package importable when running from the scripts directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.events import slim_event_list_for
+from tools.extract import ENERGY_RANGES, energy_resolved_lightcurves, start_sas
 
 
 # Define path to working directory
 home = os.path.expanduser('~')
 wdir=f'{home}/VelaX1-data'
 
-# Set up path to CCFs
-ccf_paths = ['/data/user/pub', '/data/pub']
-for user_ccfpath in ccf_paths:
-    ccf_path = f'{home}{user_ccfpath}'
-    if os.path.isdir(ccf_path):
-        os.environ['SAS_CCFPATH'] = ccf_path
-        print("Path to the XMM-Newton CCFs: " + ccf_path + "\n")
-        break
-else:
-    raise FileNotFoundError("Cannot locate the specified CCF paths, please check your data volume.")
-    
-inargs = [f'sas_ccf={wdir}/ccf.cif', f'sas_odf={wdir}/3553_0841890201_SCX00000SUM.SAS', f'workdir={wdir}']
-w('startsas', inargs).run()
+parser = argparse.ArgumentParser(description="Extract energy-resolved corrected light curves.")
+parser.add_argument('--wdir', default=wdir, help="Working directory with the event list")
+parser.add_argument('--energy-ranges', type=int, nargs='+', default=ENERGY_RANGES, help="Band edges in eV")
+parser.add_argument('--lc-bin', type=int, default=283, help="Light curve bin size in seconds")
+parser.add_argument('--src-rawx', type=int, nargs=4, default=[32, 36, 40, 44], help="Source RAWX ranges (min max min max)")
+parser.add_argument('--bkg-rawx', type=int, nargs=2, default=[3, 5], help="Background RAWX range (min max)")
+args = parser.parse_args()
 
-table = wdir + "/PN_clean_evt.fits"
+start_sas(args.wdir)
 
 # Avoiding pile-up regions
-rawX1src= 32
-rawX2src = 44
-rawX3src = 36
-rawX4src = 40
-
-rawX1bkg = 3 #RAWX1 of the bkg rectangle region (in pixels)
-rawX2bkg = 5 #RAWX2 of the bkg rectangle region (in pixels)
-
-energy_ranges= [500, 3000, 6000, 8000, 10000]
-
-EresolvedLC=[]
-
-for i in range(len(energy_ranges) - 1):
-    
-    # Define E ranges
-    e_min = energy_ranges[i]  # Start of the E range 
-    e_max = energy_ranges[i+1]  # End of the E range
-    
-    # Extract the source region lightcurve
-
-    # Define some parameters for filtering the event file and define the lightcurve binning
-
-    q_flag       = "#XMMEA_EP" # Quality flag for EPIC pn
-    n_pattern    = 4           # Pattern selection
-    pn_pi_min    = e_min        # Low energy range eV
-    pn_pi_max    = e_max     # High energy range eV
-    lc_bin       = 283         # Lightcurve bin in secs
-
-    # Define the output ligthcurve file name
-
-    in_LCSRCFile = wdir+'/PN_source_lightcurve_raw_'+str(e_min)+'to'+str(e_max)+'eV_bin283sec.lc'   # Name of the output source lightcurve
-
-    # SAS Command
-    cmd        = "evselect" # SAS task to be executed                  
-
-    # Arguments of SAS Command
-    expression = f'{q_flag}&&(PATTERN<={n_pattern})&&(RAWX in [{rawX1src}:{rawX3src}] || RAWX in [{rawX4src}:{rawX2src}])&&(PI in [{pn_pi_min}:{pn_pi_max}])'  # event filter expression
-    inargs     = [f'table={table}','energycolumn=PI','withrateset=yes',f'rateset={in_LCSRCFile}',
-                  f'timebinsize={lc_bin}','maketimecolumn=yes','makeratecolumn=yes',f'expression={expression}']
-
-
-    w(cmd, inargs).run()
-    
-    # Extract the background region lightcurve
-
-    q_flag       = "#XMMEA_EP" # Quality flag for EPIC pn
-    n_pattern    = 4           # Pattern selection
-    pn_pi_min    = e_min        # Low energy range eV
-    pn_pi_max    = e_max      # High energy range eV
-    lc_bin       = 283         # Lightcurve bin in secs
-
-    # Define the output ligthcurve file name
-
-    in_LCBKGFile = wdir+'/PN_lightcurve_background_raw_'+str(e_min)+'to'+str(e_max)+'eV_bin283sec.lc'   # Name of the output source lightcurve
-
-    cmd        = "evselect" # SAS task to be executed                  
-
-    # Arguments of SAS Command
-    expression = f'{q_flag}&&(PATTERN<={n_pattern})&&(RAWX in [{rawX1bkg}:{rawX2bkg}])&&(PI in [{pn_pi_min}:{pn_pi_max}])'  # event filter expression
-    inargs     = [f'table={table}','energycolumn=PI','withrateset=yes',f'rateset={in_LCBKGFile}',
-                  f'timebinsize={lc_bin}','maketimecolumn=yes','makeratecolumn=yes',f'expression={expression}']
-    w(cmd, inargs).run()
-    
-    # Extract the corrected lightcurve
+src_rawx = [tuple(args.src_rawx[:2]), tuple(args.src_rawx[2:])]
 
-    in_LCFile = wdir+'/PN_lccorr_'+str(e_min)+'to'+str(e_max)+'eV_bin283sec.lc'   # Name of the output corrected lightcurve
-    cmd        = "epiclccorr" # SAS task to be executed                  
+# Slim event list (slim-events.py) when it covers the regions
+table = slim_event_list_for(args.wdir + "/PN_clean_evt.fits", src_rawx + [tuple(args.bkg_rawx)])
 
-    # Arguments of SAS Command
-    inargs     = [f'eventlist={table}',f'srctslist={in_LCSRCFile}',f'outset={in_LCFile}',
-                  f'bkgtslist={in_LCBKGFile}','withbkgset=yes','applyabsolutecorrections=yes']
-    w(cmd, inargs).run()
-    
-    EresolvedLC.append(in_LCFile)
+EresolvedLC = energy_resolved_lightcurves(table, args.wdir, energy_ranges=args.energy_ranges, src_rawx=src_rawx,
+                                          bkg_rawx=[tuple(args.bkg_rawx)], lc_bin=args.lc_bin)
 
-print(f'All the energy-resolved light curves produced: {EresolvedLC}')
\ No newline at end of file
+print(f'All the energy-resolved light curves produced: {EresolvedLC}')
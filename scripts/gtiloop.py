@@ -5,59 +5,44 @@
 #   this file, may be copied, modified, propagated, or distributed except according to
 #   the terms contained in the file ‘LICENCE.txt’.
 
-from pysas.wrapper import Wrapper as w
+import argparse
 import os.path
-from os import path
-import subprocess
-import numpy as np
-import matplotlib.pyplot as plt
-from astropy.io import fits
-from astropy.table import Table
+import sys
 
+# Make the tools package importable when running from the scripts directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.events import read_event_header, slim_event_list_for
+from tools.extract import PULSE_PERIOD, pulse_gtis, start_sas
 
 
 # Define path to working directory
 home = os.path.expanduser('~')
 wdir=f'{home}/VelaX1-data'
 
-# Set up path to CCFs
-ccf_paths = ['/data/user/pub', '/data/pub']
-for user_ccfpath in ccf_paths:
-    ccf_path = f'{home}{user_ccfpath}'
-    if os.path.isdir(ccf_path):
-        os.environ['SAS_CCFPATH'] = ccf_path
-        print("Path to the XMM-Newton CCFs: " + ccf_path + "\n")
-        break
-else:
-    raise FileNotFoundError("Cannot locate the specified CCF paths, please check your data volume.")
-
-inargs = [f'sas_ccf={wdir}/ccf.cif', f'sas_odf={wdir}/3553_0841890201_SCX00000SUM.SAS', f'workdir={wdir}']
-w('startsas', inargs).run()
-
-table = wdir + "/PN_clean_evt.fits"
-
-with fits.open(table) as hdul:
-    header = hdul[1].header 
-    obs_start = header.get("TSTART")
-    obs_end = header.get("TSTOP")
-    print(f"TIME-OBS: {obs_start}")
-    print(f"TIME-END: {obs_end}")
-
-
-# Create GTI files for each pulse period
-gti_dir = "./gti_files"
-os.makedirs(gti_dir, exist_ok=True)
-
-print("Creating 283.44-second GTI files...")
-start_time = obs_start
-
-while start_time < obs_end:
-    stop_time = start_time + 283.44
-    gti_file = os.path.join(gti_dir, f"gti_{start_time:.3f}_{stop_time:.3f}.fits")
-    cmd = "tabgtigen" 
-    expression = f'TIME >= {start_time} && TIME < {stop_time}'
-    inargs = [f'table={table}', f'expression={expression}', f'gtiset={gti_file}']
-    w(cmd, inargs).run()
-    start_time = stop_time
-
-print(f"GTI files created in {gti_dir}.")
\ No newline at end of file
+# 'fixed' cuts one GTI per pulse period, 'adaptive' cuts the GTIs so that every slice reaches
+# target_counts source counts ('counts' walks the cumulative counts, 'bblocks' merges Bayesian Blocks)
+parser = argparse.ArgumentParser(description="Create one GTI file per pulse period (or adaptive slice).")
+parser.add_argument('--wdir', default=wdir, help="Working directory with the event list")
+parser.add_argument('--gti-dir', default="./gti_files", help="Output directory of the GTI files")
+parser.add_argument('--period', type=float, default=PULSE_PERIOD, help="Window length in seconds (fixed mode)")
+parser.add_argument('--mode', choices=['fixed', 'adaptive'], default='fixed')
+parser.add_argument('--method', choices=['counts', 'bblocks'], default='counts', help="Adaptive method")
+parser.add_argument('--target-counts', type=int, default=20000, help="Source counts per slice (adaptive mode)")
+parser.add_argument('--src-rawx', type=int, nargs=4, default=[32, 36, 40, 44], help="Source RAWX ranges (min max min max)")
+args = parser.parse_args()
+
+start_sas(args.wdir)
+src_rawx = [tuple(args.src_rawx[:2]), tuple(args.src_rawx[2:])]
+
+# Slim event list (slim-events.py) when it covers the source region
+table = slim_event_list_for(args.wdir + "/PN_clean_evt.fits", src_rawx)
+
+header = read_event_header(table)
+print(f"TIME-OBS: {header.get('TSTART')}")
+print(f"TIME-END: {header.get('TSTOP')}")
+
+print(f"Creating {args.mode} GTI files...")
+gti_files = pulse_gtis(table, args.gti_dir, period=args.period, mode=args.mode, method=args.method,
+                       target_counts=args.target_counts, src_rawx=src_rawx)
+
+print(f"{len(gti_files)} GTI files created in {args.gti_dir}.")
@@ -5,75 +5,39 @@
 #   this file, may be copied, modified, propagated, or distributed except according to
 #   the terms contained in the file ‘LICENCE.txt’.
 
-from pysas.wrapper import Wrapper as w
+import argparse
 import os.path
-from os import path
-import subprocess
-import numpy as np
-import matplotlib.pyplot as plt
-from astropy.io import fits
-from astropy.table import Table
+import sys
 
+# Make the tools package importable when running from the scripts directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.events import slim_event_list_for
+from tools.extract import gti_spectra, gti_spectra_jobs, start_sas
 
 
 # Define path to working directory
 home = os.path.expanduser('~')
 wdir=f'{home}/VelaX1-data'
 
-# Set up path to CCFs
-ccf_paths = ['/data/user/pub', '/data/pub']
-for user_ccfpath in ccf_paths:
-    ccf_path = f'{home}{user_ccfpath}'
-    if os.path.isdir(ccf_path):
-        os.environ['SAS_CCFPATH'] = ccf_path
-        print("Path to the XMM-Newton CCFs: " + ccf_path + "\n")
-        break
+parser = argparse.ArgumentParser(description="Extract one grouped spectrum per GTI file.")
+parser.add_argument('--wdir', default=wdir, help="Working directory with the event list")
+parser.add_argument('--gti-dir', default="./gti_files", help="Directory of the GTI files (from gtiloop.py)")
+parser.add_argument('--spectrum-dir', default="./spectra", help="Output directory of the spectra")
+parser.add_argument('--src-rawx', type=int, nargs=4, default=[32, 36, 40, 44], help="Source RAWX ranges (min max min max)")
+parser.add_argument('--max-concurrent', type=int, default=1, help="Number of spectra extracted at the same time, each in its own scratch directory")
+args = parser.parse_args()
+
+start_sas(args.wdir)
+
+# Extract spectra for each GTI, avoiding pile-up regions
+gti_files = [os.path.join(args.gti_dir, gti_file) for gti_file in sorted(os.listdir(args.gti_dir))]
+src_rawx = [tuple(args.src_rawx[:2]), tuple(args.src_rawx[2:])]
+table = slim_event_list_for(args.wdir + "/PN_clean_evt.fits", src_rawx)
+if args.max_concurrent > 1:
+    from tools.sasrun import run_jobs_sync
+    jobs = gti_spectra_jobs(table, gti_files, args.spectrum_dir, src_rawx=src_rawx, scratch=True)
+    run_jobs_sync(jobs, max_concurrent=args.max_concurrent, log_dir=os.path.join(args.spectrum_dir, 'logs'))
 else:
-    raise FileNotFoundError("Cannot locate the specified CCF paths, please check your data volume.")
+    gti_spectra(table, gti_files, args.spectrum_dir, src_rawx=src_rawx)
 
-inargs = [f'sas_ccf={wdir}/ccf.cif', f'sas_odf={wdir}/3553_0841890201_SCX00000SUM.SAS', f'workdir={wdir}']
-w('startsas', inargs).run()
-
-table = wdir + "/PN_clean_evt.fits"
-gti_dir = "./gti_files"
-
-# Extract spectra for each GTI
-spectrum_dir = "./spectra"
-os.makedirs(spectrum_dir, exist_ok=True)
-
-# Avoiding pile-up regions
-rawX1src= 32
-rawX2src = 44
-rawX3src = 36
-rawX4src = 40
-
-for gti_file in sorted(os.listdir(gti_dir)):
-    gti_path = os.path.join(gti_dir, gti_file)
-    output_spectrum = os.path.join(spectrum_dir, f"spectrum_{os.path.splitext(gti_file)[0]}.fits")
-    print(f"Processing {gti_file}...")
-    cmd = "evselect"
-    expression = f'(FLAG==0) && (PATTERN<=4) && (RAWX in [{rawX1src}:{rawX3src}] || RAWX in [{rawX4src}:{rawX2src}]) && (gti({gti_path},TIME))' 
-    inargs = [f'table={table}', 'withspectrumset=yes', f'spectrumset={output_spectrum}', 'energycolumn=PI', 'spectralbinsize=5', 'withspecranges=yes', 'specchannelmin=0', 'specchannelmax=20479', f'expression={expression}']
-    w(cmd, inargs).run()
-    
-    cmd        = "backscale"            
-    inargs     = [f'spectrumset={output_spectrum}',f'badpixlocation={table}']
-    w(cmd, inargs).run()
-    
-    cmd        = "rmfgen" 
-    in_RESPFile = os.path.join(spectrum_dir, f"PN_{os.path.splitext(gti_file)[0]}.rmf")
-    inargs     = [f'spectrumset={output_spectrum}',f'rmfset={in_RESPFile}']
-    w(cmd, inargs).run()
-    
-    cmd        = "arfgen" 
-    in_ARFFile = os.path.join(spectrum_dir, f"PN_{os.path.splitext(gti_file)[0]}.arf")
-    inargs     = [f'spectrumset={output_spectrum}',f'arfset={in_ARFFile}', 'withrmfset=yes',f'rmfset={in_RESPFile}',f'badpixlocation={table}','detmaptype=psf', 'applyabsfluxcorr=yes']
-    w(cmd, inargs).run()
-    
-    cmd        = "specgroup" 
-    in_GRPFile = os.path.join(spectrum_dir, f"PN_spectrum_grp_{os.path.splitext(gti_file)[0]}.fits")
-    inargs     = [f'spectrumset={output_spectrum}','mincounts=25','oversample=3', f'rmfset={in_RESPFile}',f'arfset={in_ARFFile}', f'groupedset={in_GRPFile}']
-    w(cmd, inargs).run()
-    
-
-print(f"Spectra saved in {spectrum_dir}.")
\ No newline at end of file
+print(f"Spectra saved in {args.spectrum_dir}.")
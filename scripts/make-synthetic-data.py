@@ -0,0 +1,37 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+import argparse
+import os
+import sys
+
+# Make the tools package importable when running from the scripts directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.synthetic import PERIOD, synthetic_event_list
+
+
+parser = argparse.ArgumentParser(description="Write a synthetic EPIC-pn timing mode event list (PN_clean_evt.fits).")
+parser.add_argument('--wdir', default='./synthetic-data', help="Output working directory")
+parser.add_argument('--nevents', type=float, default=None, help="Approximate number of events, e.g. 1e6 (default is set by --rate)")
+parser.add_argument('--rate', type=float, default=300.0, help="Mean source count rate in counts/s")
+parser.add_argument('--background-rate', type=float, default=5.0, help="Particle background rate in counts/s")
+parser.add_argument('--period', type=float, default=PERIOD, help="Pulse period in seconds")
+parser.add_argument('--pulsed-fraction', type=float, default=0.3, help="Amplitude of the pulse profile")
+parser.add_argument('--flare', type=float, nargs=3, action='append', default=[], metavar=('CENTRE', 'WIDTH', 'PEAK'),
+                    help="Background flare: centre and width in seconds from the start, peak relative to the background (repeatable)")
+parser.add_argument('--pileup', type=float, default=0.0, help="Fraction of piled-up events in the central source columns")
+parser.add_argument('--seed', type=int, default=0, help="Random seed")
+args = parser.parse_args()
+
+os.makedirs(args.wdir, exist_ok=True)
+result = synthetic_event_list(os.path.join(args.wdir, 'PN_clean_evt.fits'),
+                              nevents=None if args.nevents is None else int(args.nevents), rate=args.rate,
+                              period=args.period, pulsed_fraction=args.pulsed_fraction,
+                              background_rate=args.background_rate, flares=args.flare, pileup=args.pileup,
+                              seed=args.seed)
+print(f"{result['filename']}: {result['nevents']} events, source rate {result['rate']:.1f} counts/s.")
+print(f"Run the scripts on it without SAS with: SAS_WRAPPER=tools.sasstub:Wrapper python3 scripts/<script>.py --wdir {args.wdir}")
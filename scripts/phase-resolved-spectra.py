@@ -0,0 +1,96 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+import os.path
+import sys
+from astropy.io import fits
+
+# Make the tools package importable when running from the scripts directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.events import quality_expression, read_event_header, slim_event_list_for
+from tools.extract import start_sas
+from tools.phasespec import phase_resolved_spectra
+from tools.sasrun import sas_wrapper
+from tools.timeconv import SECONDS_PER_DAY, VELA_X1_PORB, VELA_X1_T90, mjd_to_met
+
+# pySAS Wrapper, or the class selected with SAS_WRAPPER (see tools/sasrun.py)
+w = sas_wrapper()
+
+
+# Define path to working directory
+home = os.path.expanduser('~')
+wdir=f'{home}/VelaX1-data'
+
+start_sas(wdir)
+
+table = wdir + "/PN_clean_evt.fits"
+
+# Ephemeris: 'pulse' folds on the spin period (e.g. from pulsation-search.py),
+# 'orbital' folds on the orbital ephemeris of Vela X-1
+mode = 'pulse'
+n_phase = 10          # Number of phase bins
+
+header = read_event_header(table)
+if mode == 'pulse':
+    t0 = header['TSTART']     # Phase zero at the start of the observation (in seconds)
+    # Spin period in seconds, measured by pulsation-search.py if available
+    periodogram = wdir + '/PN_periodogram.fits'
+    if os.path.exists(periodogram):
+        period = fits.getheader(periodogram, 'PERIODOGRAM')['BESTPER']
+    else:
+        period = 283.44
+else:
+    t0 = float(mjd_to_met(VELA_X1_T90, header=header))   # T90 (MJD) converted to XMM TT seconds
+    period = VELA_X1_PORB * SECONDS_PER_DAY              # Orbital period in seconds
+
+# Avoiding pile-up regions
+rawX1src= 32
+rawX2src = 44
+rawX3src = 36
+rawX4src = 40
+
+# Slim event list (slim-events.py) when it covers the source region
+table = slim_event_list_for(table, [(rawX1src, rawX3src), (rawX4src, rawX2src)])
+
+phase_dir = wdir + f"/phase_{mode}"
+os.makedirs(phase_dir, exist_ok=True)
+
+# Phase-averaged spectrum of the same region, used as template and for the responses
+template = os.path.join(phase_dir, "PN_source_spectrum_phaseaveraged.fits")
+cmd = "evselect"
+expression = f'{quality_expression(table)} && (RAWX in [{rawX1src}:{rawX3src}] || RAWX in [{rawX4src}:{rawX2src}])'
+inargs = [f'table={table}', 'withspectrumset=yes', f'spectrumset={template}', 'energycolumn=PI', 'spectralbinsize=5', 'withspecranges=yes', 'specchannelmin=0', 'specchannelmax=20479', f'expression={expression}']
+w(cmd, inargs).run()
+
+cmd        = "backscale"
+inargs     = [f'spectrumset={template}',f'badpixlocation={table}']
+w(cmd, inargs).run()
+
+# The region is the same for every phase bin, so one RMF and one ARF are shared by all spectra
+cmd        = "rmfgen"
+in_RESPFile = os.path.join(phase_dir, "PN_phaseaveraged.rmf")
+inargs     = [f'spectrumset={template}',f'rmfset={in_RESPFile}']
+w(cmd, inargs).run()
+
+cmd        = "arfgen"
+in_ARFFile = os.path.join(phase_dir, "PN_phaseaveraged.arf")
+inargs     = [f'spectrumset={template}',f'arfset={in_ARFFile}', 'withrmfset=yes',f'rmfset={in_RESPFile}',f'badpixlocation={table}','detmaptype=psf', 'applyabsfluxcorr=yes']
+w(cmd, inargs).run()
+
+print(f"Folding events into {n_phase} {mode} phase bins (P = {period} s)...")
+phase_spectra = phase_resolved_spectra(table, t0, period, n_phase, os.path.join(phase_dir, "PN_source_spectrum"),
+                                       rawx_ranges=[(rawX1src, rawX3src), (rawX4src, rawX2src)], template=template)
+
+grouped_spectra = []
+for spectrum in phase_spectra:
+    cmd        = "specgroup"
+    in_GRPFile = spectrum.replace("PN_source_spectrum", "PN_spectrum_grp")
+    inargs     = [f'spectrumset={spectrum}','mincounts=25','oversample=3', f'rmfset={in_RESPFile}',f'arfset={in_ARFFile}', f'groupedset={in_GRPFile}']
+    w(cmd, inargs).run()
+    grouped_spectra.append(in_GRPFile)
+
+print(f'All the phase-resolved grouped spectra produced: {grouped_spectra}')
@@ -0,0 +1,54 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+import os.path
+import sys
+import matplotlib.pyplot as plt
+from astropy.io import fits
+
+# Make the tools package importable when running from the scripts directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.timing import search_event_file
+
+
+# Define path to working directory
+home = os.path.expanduser('~')
+wdir=f'{home}/VelaX1-data'
+
+table = wdir + "/PN_clean_evt.fits"   # Barycentred event list
+
+# Range of trial periods around the Vela X-1 spin period (in seconds)
+p_min = 280.
+p_max = 287.
+method = 'z2'     # 'z2', 'htest' or 'ef'
+n_harm = 2        # Number of harmonics for Z^2_n
+
+result = search_event_file(table, p_min, p_max, method=method, nharm=n_harm)
+
+print(f"Number of events: {result['nevents']}")
+print(f"Best period: {result['best_period']:.4f} +/- {result['period_error']:.4f} s ({method})")
+
+# Save the periodogram
+out_file = wdir + '/PN_periodogram.fits'
+hdu = fits.BinTableHDU.from_columns([
+    fits.Column(name='FREQUENCY', format='D', unit='Hz', array=result['frequency']),
+    fits.Column(name='PERIOD', format='D', unit='s', array=1.0 / result['frequency']),
+    fits.Column(name='POWER', format='D', array=result['power'])], name='PERIODOGRAM')
+hdu.header['METHOD'] = (method, 'Periodogram statistic')
+hdu.header['BESTPER'] = (result['best_period'], '[s] Best period')
+hdu.header['PERERR'] = (result['period_error'], '[s] Period uncertainty')
+hdu.writeto(out_file, overwrite=True)
+
+fig, ax = plt.subplots(figsize=(10, 5))
+ax.plot(1.0 / result['frequency'], result['power'])
+ax.axvline(result['best_period'], color='red', linestyle='--', linewidth=1)
+ax.set_xlabel("Period (s)")
+ax.set_ylabel(method.upper() + " power")
+ax.set_title(f"P = {result['best_period']:.3f} +/- {result['period_error']:.3f} s")
+plt.savefig(wdir + '/PN_periodogram.png')
+
+print(f"Periodogram saved in {out_file}.")
@@ -0,0 +1,90 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+import os.path
+import sys
+import numpy as np
+import matplotlib.pyplot as plt
+from astropy.io import fits
+
+# Make the tools package importable when running from the scripts directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.events import read_event_header, slim_event_list_for
+from tools.pulseprofile import profile_cube, pulsed_fraction, save_profile_cube
+
+
+# Define path to working directory
+home = os.path.expanduser('~')
+wdir=f'{home}/VelaX1-data'
+
+table = wdir + "/PN_clean_evt.fits"
+
+# Use the period measured by pulsation-search.py if available
+periodogram = wdir + '/PN_periodogram.fits'
+if os.path.exists(periodogram):
+    period = fits.getheader(periodogram, 'PERIODOGRAM')['BESTPER']
+else:
+    period = 283.44
+t0 = read_event_header(table)['TSTART']
+
+energy_ranges = [500, 3000, 6000, 8000, 10000]
+n_phase = 32             # Number of phase bins
+segment_length = 5000.   # Length of the time segments of the dynamic profiles (in seconds)
+
+# Avoiding pile-up regions
+rawX1src= 32
+rawX2src = 44
+rawX3src = 36
+rawX4src = 40
+
+# Slim event list (slim-events.py) when it covers the source region
+table = slim_event_list_for(table, [(rawX1src, rawX3src), (rawX4src, rawX2src)])
+
+cube = profile_cube(table, t0, period, n_phase, energy_ranges, segment_length=segment_length,
+                    rawx_ranges=[(rawX1src, rawX3src), (rawX4src, rawX2src)])
+cube_file = wdir + '/PN_profile_cube.npz'
+save_profile_cube(cube_file, cube)
+print(f"Profile cube {cube['counts'].shape} (segment x phase x band) saved in {cube_file}.")
+
+pf = pulsed_fraction(cube)
+rate = cube['counts'] / cube['exposure'][:, :, None]
+phase = (np.arange(n_phase) + 0.5) / n_phase
+labels = [f'{e_min/1000:.1f}-{e_max/1000:.1f} keV' for e_min, e_max in zip(energy_ranges[:-1], energy_ranges[1:])]
+
+# Energy-resolved pulse profiles (whole observation)
+fig, ax = plt.subplots(figsize=(8, 6))
+total = cube['counts'].sum(axis=0) / cube['exposure'].sum(axis=0)[:, None]
+for band, label in enumerate(labels):
+    profile = total[:, band] / total[:, band].mean()
+    ax.step(np.append(phase, phase + 1), np.tile(profile, 2), where='mid', label=label)
+ax.set_xlabel("Pulse phase")
+ax.set_ylabel("Normalised rate")
+ax.set_title(f"P = {period:.3f} s")
+ax.legend()
+plt.savefig(wdir + '/pulse_profiles.png')
+
+# Dynamic profile maps (time segment x phase), one per band
+fig, axes = plt.subplots(1, len(labels), figsize=(4 * len(labels), 6), sharey=True)
+segment_mid = 0.5 * (cube['segment_edges'][1:] + cube['segment_edges'][:-1]) - cube['segment_edges'][0]
+for band, (label, ax) in enumerate(zip(labels, axes)):
+    norm = rate[:, :, band] / np.nanmean(rate[:, :, band], axis=1, keepdims=True)
+    ax.imshow(np.tile(norm, 2), aspect='auto', origin='lower',
+              extent=[0, 2, 0, cube['segment_edges'][-1] - cube['segment_edges'][0]])
+    ax.set_title(label)
+    ax.set_xlabel("Pulse phase")
+axes[0].set_ylabel("Time (s)")
+plt.savefig(wdir + '/dynamic_profiles.png')
+
+# Pulsed fraction evolution
+fig, ax = plt.subplots(figsize=(10, 5))
+for band, label in enumerate(labels):
+    ax.errorbar(segment_mid, pf['rms'][:, band], yerr=pf['rms_err'][:, band], fmt='.', label=label)
+ax.set_xlabel("Time (s)")
+ax.set_ylabel("RMS pulsed fraction")
+ax.legend()
+plt.savefig(wdir + '/pulsed_fraction.png')
+plt.show()
@@ -0,0 +1,38 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+import argparse
+import json
+import os.path
+import sys
+
+# Make the tools package importable when running from the scripts directory
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+from tools.pipeline import run_pipeline
+
+
+def parse_override(text):
+    # name=value, where value is JSON (e.g. bkg_rawx=[[3,6]]) or a plain string
+    name, value = text.split('=', 1)
+    try:
+        return name, json.loads(value)
+    except json.JSONDecodeError:
+        return name, value
+
+
+parser = argparse.ArgumentParser(description="Run the out of date products of a pipeline file.")
+parser.add_argument('targets', nargs='*', help="Products to make, with what they depend on (default is all)")
+parser.add_argument('--pipeline', default=os.path.join(REPO_DIR, 'pipeline.toml'), help="Pipeline file")
+parser.add_argument('--set', dest='overrides', action='append', default=[], type=parse_override,
+                    metavar='NAME=VALUE', help="Override a parameter, e.g. --set 'lc_bin=100' (regions outside slim_rawx also need slim_rawx set)")
+parser.add_argument('--force', nargs='+', default=[], help="Products to run even if they are up to date")
+parser.add_argument('--dry-run', action='store_true', help="Only print the products that would run")
+args = parser.parse_args()
+
+run_pipeline(args.pipeline, targets=args.targets or None, force=args.force, overrides=dict(args.overrides),
+             dry_run=args.dry_run)
@@ -0,0 +1,33 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+import argparse
+import os.path
+import sys
+
+# Make the tools package importable when running from the scripts directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.events import SLIM_COLUMNS, SLIM_RAWX, slim_event_list
+
+
+# Define path to working directory
+home = os.path.expanduser('~')
+wdir=f'{home}/VelaX1-data'
+
+parser = argparse.ArgumentParser(description="Write the slim event list read by the extraction scripts.")
+parser.add_argument('--wdir', default=wdir, help="Working directory with the event list")
+parser.add_argument('--rawx', type=int, nargs='+', default=[v for r in SLIM_RAWX for v in r],
+                    help="RAWX ranges to keep (min max min max ...), covering the source and background regions")
+parser.add_argument('--columns', nargs='+', default=list(SLIM_COLUMNS), help="Columns to keep")
+args = parser.parse_args()
+
+table = args.wdir + "/PN_clean_evt.fits"
+rawx_ranges = list(zip(args.rawx[::2], args.rawx[1::2]))
+
+slim_table = slim_event_list(table, rawx_ranges=rawx_ranges, columns=args.columns)
+print(f"{slim_table}: {os.path.getsize(slim_table) / 1024**2:.1f} MB "
+      f"({os.path.getsize(slim_table) / os.path.getsize(table):.1%} of {os.path.basename(table)})")
@@ -0,0 +1,48 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+import glob
+import os.path
+import sys
+
+# Make the tools package importable when running from the scripts directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.sasrun import sas_wrapper
+from tools.specstack import group_by_time, stack_spectra
+
+# pySAS Wrapper, or the class selected with SAS_WRAPPER (see tools/sasrun.py)
+w = sas_wrapper()
+
+
+# Per-GTI spectra, RMFs and ARFs produced by loopgtispectra.py
+spectrum_dir = "./spectra"
+spectra = sorted(glob.glob(os.path.join(spectrum_dir, "spectrum_gti_*.fits")))
+
+# Length of the stacked intervals (in seconds), here 10 pulse periods
+interval = 10 * 283.44
+
+stack_dir = os.path.join(spectrum_dir, "stacked")
+os.makedirs(stack_dir, exist_ok=True)
+
+grouped_spectra = []
+for group in group_by_time(spectra, interval):
+    # Responses of each window follow the naming of loopgtispectra.py
+    roots = [os.path.basename(spectrum)[len("spectrum_"):-len(".fits")] for spectrum in group]
+    arfs = [os.path.join(spectrum_dir, f"PN_{root}.arf") for root in roots]
+    # The extraction region is the same for every window, so the first RMF is shared
+    rmf = os.path.join(spectrum_dir, f"PN_{roots[0]}.rmf")
+    outroot = os.path.join(stack_dir, f"PN_stack_{roots[0]}")
+    print(f"Stacking {len(group)} spectra into {outroot}.fits...")
+    stacked, rmf, arf = stack_spectra(group, outroot, arfs=arfs, rmf=rmf)
+
+    cmd        = "specgroup"
+    in_GRPFile = os.path.join(stack_dir, f"PN_stack_grp_{roots[0]}.fits")
+    inargs     = [f'spectrumset={stacked}','mincounts=25','oversample=3', f'rmfset={rmf}',f'arfset={arf}', f'groupedset={in_GRPFile}']
+    w(cmd, inargs).run()
+    grouped_spectra.append(in_GRPFile)
+
+print(f"{len(grouped_spectra)} stacked spectra saved in {stack_dir}.")
@@ -0,0 +1,57 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+import argparse
+import os.path
+import sys
+
+# Make the tools package importable when running from the scripts directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tools.store import STORE_DIR, VOLATILE_KEYWORDS, checkin, checkout, collect_garbage, store_usage
+
+
+def size(n):
+    return f"{n / 1024**2:.1f} MB"
+
+
+parser = argparse.ArgumentParser(description="Deduplicate and compress products in a content-addressed store.")
+parser.add_argument('--store', default=STORE_DIR, help="Store directory (default is .store in the current directory)")
+commands = parser.add_subparsers(dest='command', required=True)
+
+add = commands.add_parser('checkin', help="Move products into the store and replace them with links")
+add.add_argument('paths', nargs='+', help="Products or directories of products")
+add.add_argument('--no-compress', action='store_true', help="Store FITS products uncompressed")
+add.add_argument('--exact', action='store_true',
+                 help=f"Only share objects between byte-identical products (default ignores {', '.join(VOLATILE_KEYWORDS)})")
+add.add_argument('--min-size', type=int, default=0, help="Leave products smaller than this (bytes) in place")
+
+out = commands.add_parser('checkout', help="Replace links with private, writable copies")
+out.add_argument('paths', nargs='+', help="Products")
+
+gc = commands.add_parser('gc', help="Delete the objects not linked from the given directories")
+gc.add_argument('roots', nargs='+', help="All the directories whose products use the store")
+gc.add_argument('--dry-run', action='store_true', help="Only list the objects that would be deleted")
+
+usage = commands.add_parser('usage', help="Show the space saved by the store")
+usage.add_argument('roots', nargs='+', help="Directories whose products use the store")
+args = parser.parse_args()
+
+if args.command == 'checkin':
+    stats = checkin(args.paths, args.store, compress=not args.no_compress,
+                    ignore_keywords=() if args.exact else VOLATILE_KEYWORDS, min_size=args.min_size)
+    print(f"{stats['products']} products ({size(stats['bytes_in'])}) checked in, "
+          f"{stats['new_objects']} new objects ({size(stats['bytes_stored'])}).")
+elif args.command == 'checkout':
+    for path in args.paths:
+        checkout(path)
+elif args.command == 'gc':
+    removed = collect_garbage(args.roots, args.store, dry_run=args.dry_run)
+    print(f"{len(removed)} unreferenced objects{' (dry run)' if args.dry_run else ' deleted'}.")
+else:
+    stats = store_usage(args.roots, args.store)
+    print(f"{stats['links']} products ({size(stats['bytes_linked'])}) stored as "
+          f"{stats['objects']} objects ({size(stats['bytes_stored'])}).")
@@ -0,0 +1,452 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code runs the same reduction over many observations. A campaign is a directory on a shared file system holding the campaign definition (campaign.json: pipeline, CPU and memory needs of one observation, parameters) and a queue with one JSON file per observation in queue/todo, queue/running, queue/done or queue/failed. An observation is claimed by renaming its file from todo to running, which succeeds for a single worker, so several nodes can run workers on the same campaign. Each worker runs as many observations at the same time as its CPU and memory budgets allow, every one in its own process (the SAS environment is per process) with its log in logs/<obsid>.log. The running files are touched periodically, and the observations of a worker that stopped updating them are put back in the queue. It includes the following functions:
+
+create_campaign: Creates (or extends) a campaign with a list of ODF IDs or ODF directories.
+
+run_worker: Runs the observations of a campaign on this node within CPU and memory budgets.
+
+campaign_status: Returns the state of every observation.
+
+requeue: Puts failed (or stale running) observations back in the queue.
+
+reduce_observation: Default pipeline, the reduction of the notebook (epproc, flare filtering, barycen, slim event list, energy-resolved light curves, pulse GTIs and spectra). Completed steps are recorded in the working directory of the observation, so a requeued observation resumes after its last completed step.
+"""
+
+import glob
+import importlib
+import json
+import multiprocessing
+import os
+import re
+import socket
+import sys
+import time
+import traceback
+from multiprocessing.connection import wait
+
+QUEUE_STATES = ('todo', 'running', 'done', 'failed')
+
+DEFAULT_PIPELINE = 'tools.campaign:reduce_observation'
+
+# Seconds between two updates of the running files, and age after which a running file is stale
+HEARTBEAT_INTERVAL = 60.0
+STALE_AFTER = 600.0
+
+# Steps of reduce_observation, in order
+STANDARD_STEPS = ['epproc', 'flares', 'barycen', 'slim', 'lightcurves', 'pulse_gtis', 'pulse_spectra']
+
+# epproc arguments of the notebook (EPIC-pn timing mode)
+EPPROC_ARGS = ['withdefaultcal=no', 'withrdpha=no', 'runepreject=yes', 'withxrlcorrection=yes', 'runepfast=yes']
+
+
+def _queue_file(campaign_dir, state, obsid):
+    return os.path.join(campaign_dir, 'queue', state, f'{obsid}.json')
+
+
+def _write_json(filename, data):
+    # Written next to the target and renamed, so that readers on other nodes never see a partial file
+    tmp_file = f'{filename}.{socket.gethostname()}.{os.getpid()}.tmp'
+    with open(tmp_file, 'w') as file:
+        json.dump(data, file, indent=4)
+    os.replace(tmp_file, filename)
+
+
+def _read_json(filename):
+    with open(filename, 'r') as file:
+        return json.load(file)
+
+
+def _observation(entry, campaign_dir):
+    # An entry is a 10-digit ODF ID, or a directory with the ODF (or with the ODF summary file of startsas)
+    entry = str(entry)
+    if re.fullmatch(r'\d{10}', entry):
+        obsid, odf = entry, None
+    else:
+        odf = os.path.abspath(entry)
+        summaries = glob.glob(os.path.join(odf, '*SUM.SAS')) + glob.glob(os.path.join(odf, '*SUM.ASC'))
+        match = re.search(r'_(\d{10})_', os.path.basename(summaries[0])) if summaries else None
+        obsid = match.group(1) if match else os.path.basename(odf.rstrip('/'))
+    return {'obsid': obsid, 'odf': odf, 'workdir': os.path.join(os.path.abspath(campaign_dir), 'obs', obsid),
+            'attempts': 0}
+
+
+def create_campaign(campaign_dir, observations, pipeline=DEFAULT_PIPELINE, cpus=1, memory_gb=4.0, params=None):
+    """
+    Creates a campaign, or adds observations to an existing one.
+
+    Parameters:
+        campaign_dir (str): Campaign directory, on a file system shared by all the worker nodes.
+        observations (list): ODF IDs (e.g. "0841890201") or ODF directories.
+        pipeline (str): "module:function" called with the observation dict (obsid, odf, workdir, params).
+        cpus (int): CPUs used by one observation.
+        memory_gb (float): Memory used by one observation in GB.
+        params (dict): Parameters of the pipeline (e.g. {"steps": [...], "src_rawx": [[32, 36], [40, 44]]}).
+
+    Returns:
+        list: ObsIDs added to the queue (observations already in the campaign are left as they are).
+    """
+    for state in QUEUE_STATES:
+        os.makedirs(os.path.join(campaign_dir, 'queue', state), exist_ok=True)
+    os.makedirs(os.path.join(campaign_dir, 'logs'), exist_ok=True)
+    definition = os.path.join(campaign_dir, 'campaign.json')
+    if not os.path.exists(definition):
+        _write_json(definition, {'pipeline': pipeline, 'cpus': cpus, 'memory_gb': memory_gb,
+                                 'params': params or {}})
+
+    added = []
+    for entry in observations:
+        obs = _observation(entry, campaign_dir)
+        if any(os.path.exists(_queue_file(campaign_dir, state, obs['obsid'])) for state in QUEUE_STATES):
+            continue
+        _write_json(_queue_file(campaign_dir, 'todo', obs['obsid']), obs)
+        added.append(obs['obsid'])
+    return added
+
+
+def campaign_status(campaign_dir):
+    """
+    Returns the state of every observation of a campaign.
+
+    Returns:
+        dict: ObsID -> queue entry, with "state" (todo, running, done or failed) and, depending on the state,
+              "host", "pid", "started", "elapsed", "error" and "log".
+    """
+    status = {}
+    for state in QUEUE_STATES:
+        for filename in sorted(glob.glob(os.path.join(campaign_dir, 'queue', state, '*.json'))):
+            try:
+                entry = _read_json(filename)
+            except (FileNotFoundError, json.JSONDecodeError):
+                # Moved or being rewritten by another worker
+                continue
+            entry['state'] = state
+            if state == 'running':
+                entry['heartbeat_age'] = time.time() - os.path.getmtime(filename)
+            status[entry['obsid']] = entry
+    return status
+
+
+def requeue(campaign_dir, failed=True, stale_after=STALE_AFTER):
+    """
+    Puts observations back in the todo queue.
+
+    Parameters:
+        campaign_dir (str): Campaign directory.
+        failed (bool): Whether to requeue the failed observations.
+        stale_after (float): Running observations whose file has not been touched for this many seconds
+                             (their worker has stopped) are requeued; None to leave them.
+
+    Returns:
+        list: Requeued ObsIDs.
+    """
+    requeued = []
+    now = time.time()
+    for state in (['failed'] if failed else []) + (['running'] if stale_after is not None else []):
+        for filename in glob.glob(os.path.join(campaign_dir, 'queue', state, '*.json')):
+            try:
+                if state == 'running' and now - os.path.getmtime(filename) < stale_after:
+                    continue
+                obsid = os.path.splitext(os.path.basename(filename))[0]
+                os.rename(filename, _queue_file(campaign_dir, 'todo', obsid))
+            except FileNotFoundError:
+                # Finished or requeued by another worker meanwhile
+                continue
+            requeued.append(obsid)
+    return requeued
+
+
+def _claim(campaign_dir):
+    # Moves the first todo observation to running; the rename fails for all workers but one
+    for filename in sorted(glob.glob(os.path.join(campaign_dir, 'queue', 'todo', '*.json'))):
+        obsid = os.path.splitext(os.path.basename(filename))[0]
+        running_file = _queue_file(campaign_dir, 'running', obsid)
+        try:
+            os.rename(filename, running_file)
+        except FileNotFoundError:
+            continue
+        obs = _read_json(running_file)
+        obs.update(attempts=obs.get('attempts', 0) + 1, host=socket.gethostname(), pid=os.getpid(),
+                   started=time.time(), log=os.path.join(os.path.abspath(campaign_dir), 'logs', f'{obsid}.log'))
+        obs.pop('error', None)
+        _write_json(running_file, obs)
+        return obs
+    return None
+
+
+def _finish(campaign_dir, obs, error=None):
+    # Moved first, so that the observation is never both running and finished. An observation requeued as
+    # stale meanwhile (and possibly claimed by another worker) is left to the queue.
+    state = 'failed' if error else 'done'
+    running_file = _queue_file(campaign_dir, 'running', obs['obsid'])
+    finished_file = _queue_file(campaign_dir, state, obs['obsid'])
+    try:
+        owner = _read_json(running_file)
+        if any(owner.get(key) != obs[key] for key in ('host', 'pid', 'started')):
+            return 'requeued'
+        os.rename(running_file, finished_file)
+    except FileNotFoundError:
+        return 'requeued'
+    _write_json(finished_file, dict(obs, elapsed=time.time() - obs['started'], error=error))
+    return state
+
+
+def _load_pipeline(pipeline):
+    module, function = pipeline.split(':')
+    return getattr(importlib.import_module(module), function)
+
+
+def _run_observation(obs, pipeline, params):
+    # Entry point of the observation processes: output to the log, then the pipeline in the working directory
+    log = open(obs['log'], 'a', buffering=1)
+    os.dup2(log.fileno(), sys.stdout.fileno())
+    os.dup2(log.fileno(), sys.stderr.fileno())
+    print(f"=== {obs['obsid']} attempt {obs['attempts']} on {obs['host']} ({time.ctime()})", flush=True)
+    try:
+        os.makedirs(obs['workdir'], exist_ok=True)
+        os.chdir(obs['workdir'])
+        _load_pipeline(pipeline)(dict(obs, params=params))
+    except BaseException:
+        traceback.print_exc()
+        sys.stdout.flush()
+        os._exit(1)
+    sys.stdout.flush()
+
+
+def available_memory_gb():
+    """
+    Returns the memory available to this node in GB (MemAvailable, capped by the cgroup limit of a container).
+    """
+    available = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES')
+    if os.path.exists('/proc/meminfo'):
+        with open('/proc/meminfo') as file:
+            for line in file:
+                if line.startswith('MemAvailable:'):
+                    available = int(line.split()[1]) * 1024
+    for limit_file in ('/sys/fs/cgroup/memory.max', '/sys/fs/cgroup/memory/memory.limit_in_bytes'):
+        if os.path.exists(limit_file):
+            with open(limit_file) as file:
+                limit = file.read().strip()
+            if limit.isdigit():
+                available = min(available, int(limit))
+            break
+    return available / 1024**3
+
+
+def run_worker(campaign_dir, cpus=None, memory_gb=None, poll=10.0, stale_after=STALE_AFTER, max_observations=None):
+    """
+    Runs the queued observations of a campaign on this node until the queue is empty.
+
+    Parameters:
+        campaign_dir (str): Campaign directory.
+        cpus (int): CPU budget of this worker (default is os.cpu_count()).
+        memory_gb (float): Memory budget of this worker in GB (default is available_memory_gb()).
+        poll (float): Maximum number of seconds between two checks of the queue.
+        stale_after (float): Age in seconds of the running files of stopped workers to requeue.
+        max_observations (int): Stop claiming after this many observations (default is no limit).
+
+    Returns:
+        dict: ObsID -> final state ("done" or "failed") of the observations run by this worker, or "requeued"
+              when the observation was requeued as stale while it ran.
+    """
+    definition = _read_json(os.path.join(campaign_dir, 'campaign.json'))
+    cpus = os.cpu_count() if cpus is None else cpus
+    memory_gb = available_memory_gb() if memory_gb is None else memory_gb
+    need_cpus, need_memory = definition['cpus'], definition['memory_gb']
+    if need_cpus > cpus or need_memory > memory_gb:
+        raise ValueError(f"One observation needs {need_cpus} CPUs and {need_memory} GB, "
+                         f"the budget of this worker is {cpus} CPUs and {memory_gb:.1f} GB.")
+
+    # One fresh interpreter per observation, so that no SAS environment leaks between observations
+    context = multiprocessing.get_context('spawn')
+    running = {}
+    results = {}
+    claimed = 0
+    last_heartbeat = time.time()
+    while True:
+        requeue(campaign_dir, failed=False, stale_after=stale_after)
+        # Start observations while the budgets allow it
+        while (len(running) + 1) * need_cpus <= cpus and (len(running) + 1) * need_memory <= memory_gb \
+                and (max_observations is None or claimed < max_observations):
+            obs = _claim(campaign_dir)
+            if obs is None:
+                break
+            process = context.Process(target=_run_observation, args=(obs, definition['pipeline'],
+                                                                     definition.get('params', {})))
+            process.start()
+            running[obs['obsid']] = (process, obs)
+            claimed += 1
+            print(f"{obs['obsid']}: started (attempt {obs['attempts']}, log {obs['log']})")
+
+        if not running:
+            return results
+
+        # Wake up when an observation finishes, or after poll seconds to look at the queue again
+        wait([process.sentinel for process, obs in running.values()], timeout=poll)
+        for obsid, (process, obs) in list(running.items()):
+            if process.is_alive():
+                continue
+            process.join()
+            error = None if process.exitcode == 0 else f"exit code {process.exitcode}, see {obs['log']}"
+            results[obsid] = _finish(campaign_dir, obs, error)
+            del running[obsid]
+            print(f"{obsid}: {results[obsid]} ({time.time() - obs['started']:.0f} s)")
+
+        # Touch the running files so that other workers do not consider them stale
+        if time.time() - last_heartbeat >= HEARTBEAT_INTERVAL:
+            for obsid in running:
+                running_file = _queue_file(campaign_dir, 'running', obsid)
+                if os.path.exists(running_file):
+                    os.utime(running_file)
+            last_heartbeat = time.time()
+
+
+def _event_file(workdir):
+    event_files = sorted(glob.glob(os.path.join(workdir, '*EPN*TimingEvts.ds')))
+    if not event_files:
+        raise FileNotFoundError(f"No EPIC-pn timing mode event list in {workdir}.")
+    return event_files[0]
+
+
+def _step_epproc(obs, params):
+    from tools.sasrun import sas_wrapper
+
+    w = sas_wrapper()
+    # As in the notebook, epproc is not run again if the event list exists
+    if not glob.glob(os.path.join(obs['workdir'], '*EPN*TimingEvts.ds')):
+        w('epproc', params.get('epproc_args', EPPROC_ARGS)).run()
+    return [_event_file(obs['workdir'])]
+
+
+def _step_flares(obs, params):
+    from tools.flares import filter_flares
+
+    table = os.path.join(obs['workdir'], 'PN_clean_evt.fits')
+    rate_file = os.path.join(obs['workdir'], 'PN_bkg_rate.fits')
+    filter_flares(_event_file(obs['workdir']), table, rate_file=rate_file, method=params.get('flare_method', 'sigma'),
+                  pi_min=params.get('pi_min', 150))
+    # The uncorrected copy of a previous barycen step belongs to the previous clean event list
+    nobarycen = os.path.join(obs['workdir'], 'PN_clean_evt_nobarycen_cor.fits')
+    if os.path.exists(nobarycen):
+        os.remove(nobarycen)
+    return [table, rate_file]
+
+
+def _step_barycen(obs, params):
+    import shutil
+    from tools.sasrun import sas_wrapper
+
+    w = sas_wrapper()
+    table = os.path.join(obs['workdir'], 'PN_clean_evt.fits')
+    nobarycen = os.path.join(obs['workdir'], 'PN_clean_evt_nobarycen_cor.fits')
+    corrected = os.path.join(obs['workdir'], 'PN_clean_evt_barycen.tmp.fits')
+    # The table is only replaced once it is corrected, so an existing uncorrected copy is always the one
+    # to correct, also when a previous attempt was stopped during or right after barycen
+    if not os.path.exists(nobarycen):
+        shutil.copyfile(table, corrected)
+        os.replace(corrected, nobarycen)
+    # copyfile: the copy is writable even if the stored uncorrected table is read-only (tools/store.py)
+    shutil.copyfile(nobarycen, corrected)
+    w('barycen', ['withtable=true', f'table={corrected}:EVENTS']).run()
+    os.replace(corrected, table)
+    return [nobarycen]
+
+
+def _step_slim(obs, params):
+    from tools.events import SLIM_RAWX, slim_event_list
+
+    return [slim_event_list(os.path.join(obs['workdir'], 'PN_clean_evt.fits'),
+                            rawx_ranges=params.get('slim_rawx', SLIM_RAWX))]
+
+
+def _src_rawx(params):
+    from tools.phasespec import SOURCE_RAWX
+    return [tuple(rawx) for rawx in params.get('src_rawx', SOURCE_RAWX)]
+
+
+def _bkg_rawx(params):
+    from tools.extract import BACKGROUND_RAWX
+    return [tuple(rawx) for rawx in params.get('bkg_rawx', BACKGROUND_RAWX)]
+
+
+def _table(obs, params):
+    # Slim event list when it is up to date and covers the regions, full event list otherwise
+    from tools.events import slim_event_list_for
+    return slim_event_list_for(os.path.join(obs['workdir'], 'PN_clean_evt.fits'), _src_rawx(params) + _bkg_rawx(params))
+
+
+def _step_lightcurves(obs, params):
+    from tools.extract import ENERGY_RANGES, energy_resolved_lightcurves
+
+    return energy_resolved_lightcurves(_table(obs, params), obs['workdir'],
+                                       energy_ranges=params.get('energy_ranges', ENERGY_RANGES),
+                                       src_rawx=_src_rawx(params), bkg_rawx=_bkg_rawx(params))
+
+
+def _step_pulse_gtis(obs, params):
+    from tools.extract import PULSE_PERIOD, pulse_gtis
+
+    return pulse_gtis(_table(obs, params), os.path.join(obs['workdir'], 'gti_files'),
+                      period=params.get('period', PULSE_PERIOD), mode=params.get('gti_mode', 'fixed'),
+                      src_rawx=_src_rawx(params))
+
+
+def _step_pulse_spectra(obs, params):
+    from tools.extract import gti_spectra
+
+    gti_files = sorted(glob.glob(os.path.join(obs['workdir'], 'gti_files', '*.fits')))
+    return gti_spectra(_table(obs, params), gti_files,
+                       os.path.join(obs['workdir'], 'spectra'), src_rawx=_src_rawx(params))
+
+
+STEPS = {'epproc': _step_epproc, 'flares': _step_flares, 'barycen': _step_barycen, 'slim': _step_slim,
+         'lightcurves': _step_lightcurves, 'pulse_gtis': _step_pulse_gtis, 'pulse_spectra': _step_pulse_spectra}
+
+
+def reduce_observation(obs):
+    """
+    Default campaign pipeline: sets up SAS for the observation and runs the steps of params["steps"]
+    (default is STANDARD_STEPS), skipping the steps completed by a previous attempt.
+
+    Parameters:
+        obs (dict): "obsid", "odf" (ODF directory, or None to download the ODF with startsas), "workdir"
+                    and "params" (see create_campaign).
+    """
+    from tools.extract import CCF_PATHS, set_ccfpath
+    from tools.sasrun import sas_wrapper
+
+    w = sas_wrapper()
+    params = obs.get('params', {})
+    if not getattr(w, 'local', False):
+        set_ccfpath(params.get('ccf_paths', CCF_PATHS))
+    if obs['odf']:
+        # Local ODF: sas_odf is its SUM.SAS file (a directory that already went through startsas, as in
+        # start_sas of tools/extract.py) or the ODF directory itself
+        summaries = glob.glob(os.path.join(obs['odf'], '*SUM.SAS'))
+        inargs = [f"sas_odf={summaries[0] if summaries else obs['odf']}", f"workdir={obs['workdir']}"]
+        ccf = os.path.join(obs['odf'], 'ccf.cif')
+        if summaries and os.path.exists(ccf):
+            inargs.insert(0, f"sas_ccf={ccf}")
+    else:
+        inargs = [f"odfid={obs['obsid']}", f"workdir={obs['workdir']}"]
+    w('startsas', inargs).run()
+
+    steps_file = os.path.join(obs['workdir'], 'steps_done.json')
+    done = _read_json(steps_file) if os.path.exists(steps_file) else {}
+    rerun = False
+    for name in params.get('steps', STANDARD_STEPS):
+        # Once a step runs again, the steps after it have to run again as well
+        if not rerun and name in done and all(os.path.exists(product) for product in done[name]):
+            print(f"{name}: done by a previous attempt")
+            continue
+        rerun = True
+        t0 = time.perf_counter()
+        done[name] = STEPS[name](obs, params)
+        _write_json(steps_file, done)
+        print(f"{name}: {len(done[name])} products ({time.perf_counter() - t0:.0f} s)", flush=True)
@@ -0,0 +1,559 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides a column cache for XMM-Newton event lists, so that Python analysis steps can read the event columns without decoding the FITS table every time. It includes two main functions:
+
+cache_event_columns: Decodes the requested columns of the EVENTS extension once and stores each of them as a native-endian .npy file in a cache directory next to the event list. The cache is rebuilt automatically when the event list changes (size or modification time).
+
+load_event_columns: Returns the cached columns as read-only memory-mapped arrays. Several processes can open the same cache and share the pages through the operating system, so no worker has to hold its own decoded copy of the event list.
+
+shared_event_columns: Copies the cached columns once into a single multiprocessing.shared_memory block (in RAM, e.g. /dev/shm) and yields a small picklable descriptor of it, to be passed to worker processes. The block is released when the context exits.
+
+attach_event_columns: Returns the columns of a shared block as read-only arrays, without copying. Workers of a parallel loop call it (e.g. in the initializer of a process pool) instead of reopening the event list, so memory does not grow with the number of workers and the data volume is read only once.
+
+quality_mask: Computes the QMASK quality column, one bit per standard predicate (FLAG==0, #XMMEA_EP, PATTERN==0, PATTERN<=4) of each event. It is written into the slim event list and derived in the column cache of any event list, so that repeated selections over bands, GTIs and regions test one byte per event instead of re-evaluating FLAG and PATTERN.
+
+quality_columns, quality_expression: Columns needed by select_events, and evselect expression, of the FLAG and PATTERN cuts, using QMASK whenever it holds them.
+
+select_events: Builds the event mask of the standard source/background filter expressions (FLAG or #XMMEA_EP, PATTERN, RAWX and PI cuts) from the cached columns.
+
+slim_event_list: Writes a slim copy of the event list with only the events of the background and source RAWX ranges and the columns the analysis uses, in the narrowest lossless integer formats, plus the QMASK column. Every later evselect, spectrum and light curve reads it instead of the full event list.
+
+slim_event_list_for: Returns the slim event list if it is up to date with the full event list and covers the regions of an analysis, or the full event list otherwise.
+
+check_rawx_coverage: Raises ValueError when a slim event list is given for regions it does not cover, so that events outside its RAWX ranges are not silently missing from a product.
+"""
+
+import os
+import json
+import re
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+from astropy.io import fits
+
+# Columns used by the extraction scripts (filter expressions, spectra and light curves)
+EVENT_COLUMNS = ('TIME', 'PI', 'RAWX', 'PATTERN', 'FLAG')
+
+# FLAG bits rejected by the #XMMEA_EP selection of EPIC-pn events
+XMMEA_EP = 0xfa000c
+
+# Bits of the QMASK quality column, set when an event passes the standard predicate
+QMASK_FLAG_ZERO = 1      # FLAG==0
+QMASK_XMMEA_EP = 2       # #XMMEA_EP
+QMASK_SINGLE = 4         # PATTERN==0
+QMASK_PATTERN4 = 8       # PATTERN<=4
+
+# Number of rows copied from the FITS table to the cache at a time
+CHUNK_ROWS = 1 << 20
+
+# Byte alignment of the columns within a shared memory block
+SHARED_ALIGN = 64
+
+# Slim event list: file name, RAWX ranges (background and source, including the piled-up columns) and columns kept
+SLIM_EVENT_LIST = 'PN_slim_evt.fits'
+SLIM_RAWX = [(3, 5), (32, 44)]
+SLIM_COLUMNS = ('TIME', 'RAWX', 'RAWY', 'PI', 'PATTERN', 'FLAG')
+
+# Integer FITS formats, narrowest first, with their ranges and the numpy types of their stored values
+NARROW_FORMATS = {'B': (0, 255), 'I': (-2**15, 2**15 - 1), 'J': (-2**31, 2**31 - 1), 'K': (-2**63, 2**63 - 1)}
+NARROW_DTYPES = {'B': 'u1', 'I': '>i2', 'J': '>i4', 'K': '>i8'}
+
+COLUMN_KEYWORD = re.compile(r'^(T[A-Z]{3,5})(\d+)$')
+FITS_BLOCK = 2880
+
+# Shared memory blocks attached by this process, kept open while their arrays are in use
+_attached = {}
+
+
+def _cache_path(table, cache_dir=None):
+    if cache_dir is None:
+        cache_dir = f'{table}.cols'
+    return cache_dir
+
+
+def _source_stamp(table):
+    st = os.stat(table)
+    return {'source': os.path.abspath(table), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def cache_event_columns(table, columns=EVENT_COLUMNS, ext='EVENTS', cache_dir=None):
+    """
+    Decodes event list columns into a .npy column cache.
+
+    Parameters:
+        table (str): Path to the event list (e.g. PN_clean_evt.fits).
+        columns (sequence): Names of the columns to cache.
+        ext (str or int): Extension holding the events (default is "EVENTS").
+        cache_dir (str): Cache directory (default is "<table>.cols").
+
+    Returns:
+        str: Path to the cache directory.
+    """
+    cache_dir = _cache_path(table, cache_dir)
+    os.makedirs(cache_dir, exist_ok=True)
+    stamp_file = os.path.join(cache_dir, 'stamp.json')
+    stamp = _source_stamp(table)
+
+    # Invalidate the whole cache if the event list has changed (e.g. after barycen)
+    cached = {}
+    if os.path.exists(stamp_file):
+        with open(stamp_file, 'r') as file:
+            try:
+                cached = json.load(file)
+            except json.JSONDecodeError:
+                cached = {}
+    if {k: cached.get(k) for k in stamp} != stamp:
+        for name in cached.get('columns', []):
+            col_file = os.path.join(cache_dir, f'{name}.npy')
+            if os.path.exists(col_file):
+                os.remove(col_file)
+        cached = dict(stamp, columns=[])
+
+    missing = [name for name in columns if name not in cached['columns']]
+    if missing:
+        with fits.open(table, memmap=True) as hdul:
+            data = hdul[ext].data
+            nrows = len(data)
+            for name in missing:
+                tmp_file = os.path.join(cache_dir, f'{name}.tmp.npy')
+                if name in DERIVED_COLUMNS and name not in data.columns.names:
+                    # Computed from other columns, e.g. QMASK from FLAG and PATTERN
+                    sources, function = DERIVED_COLUMNS[name]
+                    fields = [data.field(source) for source in sources]
+                    out = np.lib.format.open_memmap(tmp_file, mode='w+', dtype=np.uint8, shape=(nrows,))
+                    for start in range(0, nrows, CHUNK_ROWS):
+                        out[start:start + CHUNK_ROWS] = function(*(f[start:start + CHUNK_ROWS] for f in fields))
+                else:
+                    field = data.field(name)
+                    dtype = field.dtype.newbyteorder('=')
+                    out = np.lib.format.open_memmap(tmp_file, mode='w+', dtype=dtype, shape=field.shape)
+                    # Copy in chunks so that large event lists are never fully decoded in memory
+                    for start in range(0, nrows, CHUNK_ROWS):
+                        out[start:start + CHUNK_ROWS] = field[start:start + CHUNK_ROWS]
+                out.flush()
+                del out
+                os.replace(tmp_file, os.path.join(cache_dir, f'{name}.npy'))
+                cached['columns'].append(name)
+        with open(stamp_file, 'w') as file:
+            json.dump(cached, file, indent=4)
+
+    return cache_dir
+
+
+def load_event_columns(table, columns=EVENT_COLUMNS, ext='EVENTS', cache_dir=None):
+    """
+    Returns event list columns as read-only memory-mapped arrays, building the cache if needed.
+
+    Parameters:
+        table (str): Path to the event list.
+        columns (sequence): Names of the columns to load.
+        ext (str or int): Extension holding the events (default is "EVENTS").
+        cache_dir (str): Cache directory (default is "<table>.cols").
+
+    Returns:
+        dict: Column name -> numpy.memmap.
+    """
+    cache_dir = cache_event_columns(table, columns, ext=ext, cache_dir=cache_dir)
+    return {name: np.load(os.path.join(cache_dir, f'{name}.npy'), mmap_mode='r') for name in columns}
+
+
+@contextmanager
+def share_columns(columns):
+    """
+    Copies arrays into one shared memory block and yields its descriptor.
+
+    Parameters:
+        columns (dict): Column name -> numpy array (e.g. from load_event_columns).
+
+    Yields:
+        dict: Picklable descriptor with the block name and the dtype, shape and offset of each column,
+              to be passed to attach_event_columns.
+    """
+    layout = {}
+    size = 0
+    for name, array in columns.items():
+        array = np.asarray(array)
+        layout[name] = (array.dtype.newbyteorder('=').str, array.shape, size)
+        size += -(-array.nbytes // SHARED_ALIGN) * SHARED_ALIGN
+
+    shm = shared_memory.SharedMemory(create=True, size=max(size, 1))
+    try:
+        for name, array in columns.items():
+            dtype, shape, offset = layout[name]
+            out = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=offset)
+            # Copy in chunks so that memory-mapped columns are streamed from the cache
+            for start in range(0, len(out), CHUNK_ROWS):
+                out[start:start + CHUNK_ROWS] = array[start:start + CHUNK_ROWS]
+            del out
+        yield {'name': shm.name, 'columns': layout}
+    finally:
+        _attached.pop(shm.name, None)
+        shm.close()
+        shm.unlink()
+
+
+@contextmanager
+def shared_event_columns(table, columns=EVENT_COLUMNS, ext='EVENTS', cache_dir=None):
+    """
+    Decodes event list columns once, through the column cache, into shared memory for worker processes.
+
+    Parameters:
+        table (str): Path to the event list.
+        columns (sequence): Names of the columns to share.
+        ext (str or int): Extension holding the events (default is "EVENTS").
+        cache_dir (str): Cache directory (default is "<table>.cols").
+
+    Yields:
+        dict: Descriptor of the shared block (see attach_event_columns).
+    """
+    with share_columns(load_event_columns(table, columns, ext=ext, cache_dir=cache_dir)) as descriptor:
+        yield descriptor
+
+
+def attach_event_columns(descriptor):
+    """
+    Returns the columns of a shared memory block as read-only arrays, without copying them.
+
+    Parameters:
+        descriptor (dict): Descriptor yielded by shared_event_columns or share_columns.
+
+    Returns:
+        dict: Column name -> numpy array backed by the shared block.
+    """
+    name = descriptor['name']
+    if name not in _attached:
+        _attached[name] = shared_memory.SharedMemory(name=name)
+    buffer = _attached[name].buf
+    columns = {}
+    for column, (dtype, shape, offset) in descriptor['columns'].items():
+        array = np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset)
+        array.flags.writeable = False
+        columns[column] = array
+    return columns
+
+
+def select_events(columns, rawx_ranges=None, pattern_max=4, flag_zero=True, pi_range=None, flag_mask=None):
+    """
+    Returns a boolean mask equivalent to the evselect expressions used in the scripts, e.g.
+    (FLAG==0) && (PATTERN<=4) && (RAWX in [32:36] || RAWX in [40:44]) && (PI in [500:3000]).
+
+    Parameters:
+        columns (dict): Event columns (see load_event_columns).
+        rawx_ranges (list): Inclusive (min, max) RAWX ranges, combined with OR (default is no cut).
+        pattern_max (int): Maximum PATTERN (default is 4, None for no cut).
+        flag_zero (bool): Whether to require FLAG==0.
+        pi_range (tuple): Inclusive (min, max) PI range in eV (default is no cut).
+        flag_mask (int): FLAG bits to reject, e.g. XMMEA_EP for #XMMEA_EP (used when flag_zero is False).
+
+    The FLAG and PATTERN cuts are a single test of the QMASK column when it is among the columns and
+    holds them (see quality_columns).
+    """
+    mask = np.ones(len(next(iter(columns.values()))), dtype=bool)
+    bits = _quality_bits(pattern_max, flag_zero, flag_mask)
+    if 'QMASK' in columns and bits is not None:
+        if bits:
+            mask &= (columns['QMASK'] & bits) == bits
+    else:
+        if flag_zero:
+            mask &= columns['FLAG'] == 0
+        elif flag_mask is not None:
+            mask &= (columns['FLAG'] & flag_mask) == 0
+        if pattern_max is not None:
+            mask &= columns['PATTERN'] <= pattern_max
+    if rawx_ranges:
+        rawx = columns['RAWX']
+        in_region = np.zeros_like(mask)
+        for rawx_min, rawx_max in rawx_ranges:
+            in_region |= (rawx >= rawx_min) & (rawx <= rawx_max)
+        mask &= in_region
+    if pi_range is not None:
+        mask &= (columns['PI'] >= pi_range[0]) & (columns['PI'] <= pi_range[1])
+    return mask
+
+
+def quality_mask(flag, pattern):
+    """
+    Returns the QMASK values (uint8) of events, with the QMASK_* bits of the predicates they pass.
+
+    Parameters:
+        flag (array): FLAG column.
+        pattern (array): PATTERN column.
+    """
+    qmask = np.where(flag == 0, QMASK_FLAG_ZERO, 0).astype(np.uint8)
+    qmask |= np.where((flag & XMMEA_EP) == 0, QMASK_XMMEA_EP, 0).astype(np.uint8)
+    qmask |= np.where(pattern == 0, QMASK_SINGLE, 0).astype(np.uint8)
+    qmask |= np.where(pattern <= 4, QMASK_PATTERN4, 0).astype(np.uint8)
+    return qmask
+
+
+# Columns of the cache computed from other columns: name -> (source columns, function)
+DERIVED_COLUMNS = {'QMASK': (('FLAG', 'PATTERN'), quality_mask)}
+
+
+def _quality_bits(pattern_max, flag_zero, flag_mask=None):
+    # QMASK bits equivalent to the FLAG and PATTERN cuts, or None if QMASK does not hold them
+    bits = 0
+    if flag_zero:
+        bits |= QMASK_FLAG_ZERO
+    elif flag_mask is not None:
+        if flag_mask != XMMEA_EP:
+            return None
+        bits |= QMASK_XMMEA_EP
+    if pattern_max is not None:
+        if pattern_max not in (0, 4):
+            return None
+        bits |= QMASK_SINGLE if pattern_max == 0 else QMASK_PATTERN4
+    return bits
+
+
+def quality_columns(pattern_max=4, flag_zero=True, flag_mask=None):
+    """
+    Returns the columns select_events needs for the given FLAG and PATTERN cuts: ['QMASK'] for the standard
+    cuts (FLAG==0 or #XMMEA_EP, PATTERN==0 or PATTERN<=4), ['PATTERN', 'FLAG'] otherwise.
+    """
+    bits = _quality_bits(pattern_max, flag_zero, flag_mask)
+    if bits is None:
+        return ['PATTERN', 'FLAG']
+    return ['QMASK'] if bits else []
+
+
+def quality_expression(table, pattern_max=4, flag_zero=True, flag_mask=None, ext='EVENTS'):
+    """
+    Returns the evselect expression of the FLAG and PATTERN cuts: a single test of the QMASK column,
+    e.g. "((QMASK & 9)==9)", when the event list has one (see slim_event_list), and the usual expression,
+    e.g. "(FLAG==0) && (PATTERN<=4)", otherwise.
+
+    Parameters:
+        table (str): Path to the event list.
+        pattern_max (int): Maximum PATTERN (None for no cut).
+        flag_zero (bool): Whether to require FLAG==0.
+        flag_mask (int): FLAG bits to reject when flag_zero is False; XMMEA_EP is written as #XMMEA_EP.
+        ext (str or int): Extension holding the events (default is "EVENTS").
+    """
+    bits = _quality_bits(pattern_max, flag_zero, flag_mask)
+    if bits and os.path.exists(table):
+        header = read_event_header(table, ext)
+        if 'QMASK' in [header.get(f'TTYPE{n}', '').strip() for n in range(1, header.get('TFIELDS', 0) + 1)]:
+            return f'((QMASK & {bits})=={bits})'
+    terms = []
+    if flag_zero:
+        terms.append('(FLAG==0)')
+    elif flag_mask is not None:
+        terms.append('#XMMEA_EP' if flag_mask == XMMEA_EP else f'((FLAG & {flag_mask:#x})==0)')
+    if pattern_max is not None:
+        terms.append(f'(PATTERN<={pattern_max})')
+    return ' && '.join(terms)
+
+
+def read_event_header(table, ext='EVENTS'):
+    """
+    Returns the header of the events extension (TSTART, TSTOP, MJDREF, ...).
+    """
+    with fits.open(table) as hdul:
+        return hdul[ext].header.copy()
+
+
+def _column_keywords(header):
+    # Column keywords (TTYPEn, TFORMn, TUNITn, TLMINn, ...) by column number
+    keywords = {}
+    for key in header:
+        match = COLUMN_KEYWORD.match(key)
+        if match and 1 <= int(match.group(2)) <= header['TFIELDS']:
+            keywords.setdefault(int(match.group(2)), []).append((match.group(1), key))
+    return keywords
+
+
+def _narrow_format(tform, lo, hi, keywords):
+    # Narrowest integer format holding [lo, hi], for unscaled integer columns without TNULL
+    letter = tform[1:] if tform.startswith('1') else tform
+    if letter not in NARROW_FORMATS or keywords & {'TSCAL', 'TZERO', 'TNULL'}:
+        return tform
+    for fmt, (fmt_lo, fmt_hi) in NARROW_FORMATS.items():
+        if fmt == letter:
+            break
+        if fmt_lo <= lo and hi <= fmt_hi:
+            return fmt
+    return tform
+
+
+def _rawx_mask(rawx, rawx_ranges):
+    mask = np.zeros(len(rawx), dtype=bool)
+    for rawx_min, rawx_max in rawx_ranges:
+        mask |= (rawx >= rawx_min) & (rawx <= rawx_max)
+    return mask
+
+
+def slim_event_list(table, outfile=None, rawx_ranges=SLIM_RAWX, columns=SLIM_COLUMNS, narrow=True, qmask=True,
+                    ext='EVENTS'):
+    """
+    Writes a slim copy of an event list with only the events of the given RAWX ranges and the given columns.
+    The other extensions (GTIs, bad pixels, ...) and the header keywords are copied unchanged, so that SAS tasks
+    (evselect, rmfgen, arfgen) can use it in place of the full event list. Integer columns are stored in the
+    narrowest FITS format that holds their values (e.g. RAWX as unsigned bytes), so no value is changed.
+    A QMASK column with the standard quality predicates of every event (see quality_mask) is added, so that
+    the FLAG and PATTERN cuts of evselect become a single test (see quality_expression).
+
+    Parameters:
+        table (str): Path to the event list (e.g. PN_clean_evt.fits).
+        outfile (str): Path to the slim event list (default is SLIM_EVENT_LIST next to the event list).
+        rawx_ranges (list): Inclusive (min, max) RAWX ranges to keep; they must cover every region used later.
+        columns (sequence): Columns to keep.
+        narrow (bool): Whether to narrow the integer columns.
+        qmask (bool): Whether to add the QMASK column.
+        ext (str or int): Extension holding the events (default is "EVENTS").
+
+    Returns:
+        str: Path to the slim event list.
+    """
+    if outfile is None:
+        outfile = os.path.join(os.path.dirname(table), SLIM_EVENT_LIST)
+    rawx_ranges = [tuple(map(int, rawx_range)) for rawx_range in rawx_ranges]
+
+    with fits.open(table, memmap=True) as hdul:
+        events = hdul.index_of(ext)
+        header = hdul[events].header
+        raw = hdul[events].data.view(np.ndarray)
+        nrows = len(raw)
+        names = [name.upper() for name in raw.dtype.names]
+        keywords = _column_keywords(header)
+        missing = [name for name in columns if name.upper() not in names]
+        if missing:
+            raise ValueError(f"Columns {missing} are not in {table}[{ext}].")
+        numbers = [names.index(name.upper()) + 1 for name in columns]
+
+        # First pass: number of events kept and range of every column, to choose the formats
+        nkept = 0
+        lo, hi = {}, {}
+        for start in range(0, nrows, CHUNK_ROWS):
+            chunk = raw[start:start + CHUNK_ROWS]
+            chunk = chunk[_rawx_mask(chunk['RAWX'], rawx_ranges)]
+            nkept += len(chunk)
+            for n in numbers:
+                if len(chunk) and chunk.dtype[n - 1].kind in 'iu':
+                    values = chunk[raw.dtype.names[n - 1]]
+                    lo[n] = min(lo.get(n, int(values.min())), int(values.min()))
+                    hi[n] = max(hi.get(n, int(values.max())), int(values.max()))
+
+        # Header of the slim table: original keywords, with the column keywords renumbered
+        out_header = header.copy()
+        for n, cards in keywords.items():
+            for prefix, key in cards:
+                del out_header[key]
+        for key in ('CHECKSUM', 'DATASUM'):
+            out_header.remove(key, ignore_missing=True)
+        dtypes, width = [], 0
+        for i, n in enumerate(numbers, start=1):
+            cards = dict(keywords.get(n, []))
+            tform = header[f'TFORM{n}'].strip()
+            if narrow and n in lo:
+                tform = _narrow_format(tform, lo[n], hi[n], set(cards))
+            for prefix, key in keywords.get(n, []):
+                value = tform if prefix == 'TFORM' else header[key]
+                out_header[f'{prefix}{i}'] = (value, header.comments[key])
+            dtype = NARROW_DTYPES.get(tform, raw.dtype[n - 1])
+            dtypes.append((raw.dtype.names[n - 1], dtype))
+            width += np.dtype(dtype).itemsize
+        copied = list(dtypes)
+        if qmask:
+            flag, pattern = (raw.dtype.names[names.index(name)] for name in ('FLAG', 'PATTERN'))
+            out_header[f'TTYPE{len(dtypes) + 1}'] = ('QMASK', 'Quality predicates passed (QMBIT* keywords)')
+            out_header[f'TFORM{len(dtypes) + 1}'] = 'B'
+            out_header['QMBITF0'] = (QMASK_FLAG_ZERO, 'QMASK bit of FLAG==0')
+            out_header['QMBITEP'] = (QMASK_XMMEA_EP, 'QMASK bit of #XMMEA_EP')
+            out_header['QMBITP0'] = (QMASK_SINGLE, 'QMASK bit of PATTERN==0')
+            out_header['QMBITP4'] = (QMASK_PATTERN4, 'QMASK bit of PATTERN<=4')
+            dtypes.append(('QMASK', 'u1'))
+            width += 1
+        out_header['TFIELDS'] = len(dtypes)
+        out_header['PCOUNT'] = 0
+        out_header['NAXIS1'] = width
+        out_header['NAXIS2'] = nkept
+        out_header['SLIMSRC'] = (os.path.basename(table), 'Event list this slim event list was made from')
+        out_header['SLIMSIZE'] = (os.path.getsize(table), '[byte] Size of the source event list')
+        out_header['SLIMMTIM'] = (os.stat(table).st_mtime_ns, '[ns] Modification time of the source event list')
+        out_header['SLIMRAWX'] = (','.join(f'{a}:{b}' for a, b in rawx_ranges), 'RAWX ranges kept')
+        out_dtype = np.dtype(dtypes)
+
+        # Second pass: the kept events are streamed to the output, the other HDUs are copied byte for byte
+        tmp_file = f'{outfile}.tmp'
+        with open(tmp_file, 'wb') as out, open(table, 'rb') as src:
+            for index in range(len(hdul)):
+                if index != events:
+                    info = hdul.fileinfo(index)
+                    src.seek(info['hdrLoc'])
+                    out.write(src.read(info['datLoc'] - info['hdrLoc'] + info['datSpan']))
+                    continue
+                out.write(out_header.tostring().encode('ascii'))
+                for start in range(0, nrows, CHUNK_ROWS):
+                    chunk = raw[start:start + CHUNK_ROWS]
+                    chunk = chunk[_rawx_mask(chunk['RAWX'], rawx_ranges)]
+                    rows = np.empty(len(chunk), dtype=out_dtype)
+                    for name, dtype in copied:
+                        rows[name] = chunk[name]
+                    if qmask:
+                        rows['QMASK'] = quality_mask(chunk[flag], chunk[pattern])
+                    out.write(rows.tobytes())
+                out.write(b'\0' * (-(width * nkept) % FITS_BLOCK))
+    os.replace(tmp_file, outfile)
+    return outfile
+
+
+def slim_event_list_for(table, rawx_ranges, slim_table=None):
+    """
+    Returns the slim event list of a table if it is up to date and covers the given RAWX ranges, or the table itself.
+
+    Parameters:
+        table (str): Path to the full event list.
+        rawx_ranges (list): Inclusive (min, max) RAWX ranges the analysis uses (source and background).
+        slim_table (str): Path to the slim event list (default is SLIM_EVENT_LIST next to the event list).
+    """
+    if slim_table is None:
+        slim_table = os.path.join(os.path.dirname(table), SLIM_EVENT_LIST)
+    if not os.path.exists(slim_table) or not os.path.exists(table):
+        return table
+    header = read_event_header(slim_table)
+    st = os.stat(table)
+    if header.get('SLIMSIZE') != st.st_size or header.get('SLIMMTIM') != st.st_mtime_ns:
+        return table
+    if _uncovered(_slim_rawx(header), rawx_ranges):
+        return table
+    return slim_table
+
+
+def _slim_rawx(header):
+    # RAWX ranges kept in a slim event list (SLIMRAWX = "3:5,32:44")
+    return [tuple(map(int, item.split(':'))) for item in header.get('SLIMRAWX', '').split(',') if item]
+
+
+def _uncovered(kept, rawx_ranges):
+    return [(rawx_min, rawx_max) for rawx_min, rawx_max in rawx_ranges
+            if not any(a <= rawx_min and rawx_max <= b for a, b in kept)]
+
+
+def check_rawx_coverage(table, rawx_ranges, ext='EVENTS'):
+    """
+    Raises ValueError if the table is a slim event list whose RAWX ranges do not cover all the given ranges.
+    Full event lists (and tables that do not exist yet) pass.
+
+    Parameters:
+        table (str): Path to the event list.
+        rawx_ranges (list): Inclusive (min, max) RAWX ranges of the regions of a product.
+        ext (str or int): Extension holding the events (default is "EVENTS").
+    """
+    if not os.path.exists(table):
+        return
+    header = read_event_header(table, ext)
+    if 'SLIMRAWX' not in header:
+        return
+    missing = _uncovered(_slim_rawx(header), rawx_ranges)
+    if missing:
+        raise ValueError(f"{table} only holds the events of RAWX {header['SLIMRAWX']}, not of "
+                         f"{', '.join(f'{a}:{b}' for a, b in missing)}; write the slim event list again with "
+                         f"these ranges (slim_rawx) or use the full event list.")
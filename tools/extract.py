@@ -0,0 +1,390 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides the SAS extraction loops of the scripts as importable functions with explicit parameters, so that the notebook can run them in-process, reuse the SAS session that is already set up and run independent extractions concurrently. The scripts in the scripts directory are thin command line wrappers around these functions. It includes the following functions:
+
+set_ccfpath: Sets SAS_CCFPATH to the first existing CCF directory.
+
+start_sas: Locates the CCFs and runs startsas, once per (working directory, ODF summary file) in a Python session.
+
+energy_resolved_lightcurves: Source and background light curves and epiclccorr corrected light curves per energy band (energy-resolvedLC.py).
+
+interval_spectra: Source spectrum, responses and grouped spectrum for each time interval between MJD boundaries (spectrum-extractor.py).
+
+pulse_gtis: GTI files for every pulse period, or adaptive GTIs reaching a target number of source counts (gtiloop.py).
+
+gti_spectra: Source spectrum, responses and grouped spectrum for each GTI file (loopgtispectra.py).
+
+Every function returns the list of the products it wrote. The energy_resolved_lightcurve_jobs, interval_spectra_jobs and gti_spectra_jobs functions return the same SAS steps as {product: [(task, inargs), ...]} instead of running them, so that they can be run concurrently with tools/sasrun.py. With scratch=True each job runs in its own scratch directory (tools/scratch.py) and its products are moved to the output directory when it succeeds; the in-process functions write their products in a scratch directory of their own, given as scratch=<directory>, and move them the same way.
+"""
+
+import os
+
+from tools.phasespec import SOURCE_RAWX
+
+# Background region of the light curves (RAWX in [3:5])
+BACKGROUND_RAWX = [(3, 5)]
+
+# Energy bands of the light curves (PI edges in eV)
+ENERGY_RANGES = [500, 3000, 6000, 8000, 10000]
+
+# Boundaries of the three observation phases of Diez et al. (2023), in MJD
+T_OBS = [58606.95, 58607.6, 58607.78, 58608.2]
+
+# Vela X-1 spin period (s), Diez et al. (2022)
+PULSE_PERIOD = 283.44
+
+# specgroup parameters of the grouped spectra
+GROUPING = {'mincounts': 25, 'oversample': 3}
+
+ODF_SUMMARY = '3553_0841890201_SCX00000SUM.SAS'
+CCF_PATHS = ['/data/user/pub', '/data/pub']
+
+# (workdir, ODF summary file) of the startsas run of this Python session
+_sas_session = None
+
+
+def set_ccfpath(ccf_paths=CCF_PATHS):
+    """
+    Sets SAS_CCFPATH to the first existing CCF directory and returns it.
+
+    Parameters:
+        ccf_paths (list): Candidate CCF directories, relative to the home directory.
+    """
+    home = os.path.expanduser('~')
+    for user_ccfpath in ccf_paths:
+        ccf_path = f'{home}{user_ccfpath}'
+        if os.path.isdir(ccf_path):
+            os.environ['SAS_CCFPATH'] = ccf_path
+            print("Path to the XMM-Newton CCFs: " + ccf_path + "\n")
+            return ccf_path
+    raise FileNotFoundError("Cannot locate the specified CCF paths, please check your data volume.")
+
+
+def start_sas(wdir, odf_summary=ODF_SUMMARY, ccf_paths=CCF_PATHS, force=False):
+    """
+    Sets SAS_CCFPATH and runs startsas, unless this session already did it for the same data.
+
+    Parameters:
+        wdir (str): Working directory with ccf.cif and the ODF summary file.
+        odf_summary (str): Name of the ODF summary file in wdir.
+        ccf_paths (list): Candidate CCF directories, relative to the home directory.
+        force (bool): Whether to run startsas again.
+    """
+    from tools.sasrun import sas_wrapper
+
+    global _sas_session
+    if _sas_session == (wdir, odf_summary) and not force:
+        return
+    w = sas_wrapper()
+    # A local stand-in (SAS_WRAPPER, see tools/sasrun.py) needs no CCFs
+    if not getattr(w, 'local', False):
+        set_ccfpath(ccf_paths)
+    inargs = [f'sas_ccf={wdir}/ccf.cif', f'sas_odf={wdir}/{odf_summary}', f'workdir={wdir}']
+    w('startsas', inargs).run()
+    _sas_session = (wdir, odf_summary)
+
+
+def rawx_expression(rawx_ranges):
+    """
+    Returns the evselect expression of RAWX ranges, e.g. "(RAWX in [32:36] || RAWX in [40:44])".
+    """
+    return '(' + ' || '.join(f'RAWX in [{rawx_min}:{rawx_max}]' for rawx_min, rawx_max in rawx_ranges) + ')'
+
+
+def _rawx_label(rawx_ranges):
+    # "32-36_40-44", as in the product names of the scripts
+    return '_'.join(f'{rawx_min}-{rawx_max}' for rawx_min, rawx_max in rawx_ranges)
+
+
+def spectrum_steps(table, expression, spectrumset, rmfset, arfset, groupedset, grouping=GROUPING):
+    """
+    Returns the evselect, backscale, rmfgen, arfgen and specgroup steps, as (task, inargs), of one
+    grouped spectrum (grouping holds the specgroup parameters).
+    """
+    return [('evselect', [f'table={table}', 'withspectrumset=yes', f'spectrumset={spectrumset}', 'energycolumn=PI', 'spectralbinsize=5', 'withspecranges=yes', 'specchannelmin=0', 'specchannelmax=20479', f'expression={expression}']),
+            ('backscale', [f'spectrumset={spectrumset}', f'badpixlocation={table}']),
+            ('rmfgen', [f'spectrumset={spectrumset}', f'rmfset={rmfset}']),
+            ('arfgen', [f'spectrumset={spectrumset}', f'arfset={arfset}', 'withrmfset=yes', f'rmfset={rmfset}', f'badpixlocation={table}', 'detmaptype=psf', 'applyabsfluxcorr=yes']),
+            ('specgroup', [f'spectrumset={spectrumset}', *[f'{key}={value}' for key, value in grouping.items()], f'rmfset={rmfset}', f'arfset={arfset}', f'groupedset={groupedset}'])]
+
+
+def run_steps(job):
+    """
+    Runs (task, inargs) steps in order with the pySAS Wrapper (or the SAS_WRAPPER class, see
+    tools/sasrun.py), in this process.
+
+    A job with declared outputs, as {"steps": [...], "outputs": {path in a scratch directory: product path}}
+    (the *_jobs functions with scratch=<directory>), has its outputs moved to their product paths, in the
+    declared order, when all the steps succeed (with the file names in their headers made relative, as in the
+    products of run_jobs). The working directory and the environment of the process
+    are left unchanged, so that jobs can run in several threads.
+    """
+    from tools.sasrun import sas_wrapper
+
+    w = sas_wrapper()
+    steps = job['steps'] if isinstance(job, dict) else job
+    for task, inargs in steps:
+        w(task, inargs).run()
+    if isinstance(job, dict):
+        from tools.scratch import promote
+
+        for output, product in job['outputs'].items():
+            _relative_references(output)
+            promote(output, product)
+
+
+# Header keywords of the spectra that name other products (e.g. RESPFILE and ANCRFILE, set by specgroup)
+FILE_KEYWORDS = ('RESPFILE', 'ANCRFILE', 'BACKFILE', 'CORRFILE')
+
+
+def _relative_references(filename):
+    # Products written with absolute paths in a scratch directory name each other by those paths; they are
+    # replaced with the base names, which resolve next to the promoted product as with run_jobs
+    from astropy.io import fits
+
+    if not filename.endswith('.fits'):
+        return
+    directory = os.path.dirname(filename) + os.sep
+    with fits.open(filename) as hdul:
+        stale = any(str(hdu.header.get(keyword, '')).startswith(directory)
+                    for hdu in hdul for keyword in FILE_KEYWORDS)
+    if not stale:
+        return
+    with fits.open(filename, mode='update') as hdul:
+        for hdu in hdul:
+            for keyword in FILE_KEYWORDS:
+                value = str(hdu.header.get(keyword, ''))
+                if value.startswith(directory):
+                    hdu.header[keyword] = os.path.basename(value)
+
+
+def _job(steps, products, scratch):
+    # With scratch, the steps write their products in a scratch directory and the products are declared
+    # to be moved to their final paths (see tools/sasrun.py and run_steps)
+    if not scratch:
+        return steps
+    out = _paths(scratch)
+    return {'steps': steps, 'outputs': {out(product): product for product in products}}
+
+
+def _paths(scratch):
+    # Output names of the steps: base names in the scratch directory of a job run by tools/sasrun.py
+    # (scratch=True), absolute paths in a given scratch directory, the product paths otherwise
+    if not scratch:
+        return lambda path: path
+    if scratch is True:
+        return os.path.basename
+    return lambda path: os.path.join(scratch, os.path.basename(path))
+
+
+def energy_resolved_lightcurve_jobs(table, outdir, energy_ranges=ENERGY_RANGES, src_rawx=SOURCE_RAWX,
+                                    bkg_rawx=BACKGROUND_RAWX, lc_bin=283, pattern_max=4, scratch=False):
+    """
+    Returns the SAS steps of energy_resolved_lightcurves, as {corrected light curve: steps} (see tools/sasrun.py).
+    With scratch=True every job runs in its own scratch directory and declares its light curves as outputs; with
+    scratch=<directory> the light curves are written in that directory instead (see run_steps).
+    """
+    from tools.events import XMMEA_EP, check_rawx_coverage, quality_expression
+
+    check_rawx_coverage(table, list(src_rawx) + list(bkg_rawx))
+    if scratch:
+        table, outdir = os.path.abspath(table), os.path.abspath(outdir)
+    out = _paths(scratch)
+    # Single QMASK test when the event list has the column (e.g. the slim event list)
+    quality = quality_expression(table, pattern_max, flag_zero=False, flag_mask=XMMEA_EP)
+    jobs = {}
+    for e_min, e_max in zip(energy_ranges[:-1], energy_ranges[1:]):
+        band = f'{e_min}to{e_max}eV_bin{lc_bin}sec'
+        steps = []
+
+        # Source and background region light curves
+        in_LCSRCFile = os.path.join(outdir, f'PN_source_lightcurve_raw_{band}.lc')
+        in_LCBKGFile = os.path.join(outdir, f'PN_lightcurve_background_raw_{band}.lc')
+        for rateset, rawx_ranges in ((in_LCSRCFile, src_rawx), (in_LCBKGFile, bkg_rawx)):
+            expression = f'{quality}&&{rawx_expression(rawx_ranges)}&&(PI in [{e_min}:{e_max}])'
+            steps.append(('evselect', [f'table={table}', 'energycolumn=PI', 'withrateset=yes', f'rateset={out(rateset)}',
+                                       f'timebinsize={lc_bin}', 'maketimecolumn=yes', 'makeratecolumn=yes', f'expression={expression}']))
+
+        # Background subtracted and corrected light curve
+        in_LCFile = os.path.join(outdir, f'PN_lccorr_{band}.lc')
+        steps.append(('epiclccorr', [f'eventlist={table}', f'srctslist={out(in_LCSRCFile)}', f'outset={out(in_LCFile)}',
+                                     f'bkgtslist={out(in_LCBKGFile)}', 'withbkgset=yes', 'applyabsolutecorrections=yes']))
+        jobs[in_LCFile] = _job(steps, [in_LCSRCFile, in_LCBKGFile, in_LCFile], scratch)
+    return jobs
+
+
+def energy_resolved_lightcurves(table, outdir, energy_ranges=ENERGY_RANGES, src_rawx=SOURCE_RAWX,
+                                bkg_rawx=BACKGROUND_RAWX, lc_bin=283, pattern_max=4):
+    """
+    Extracts the source, background and corrected light curves of each energy band.
+
+    Parameters:
+        table (str): Path to the event list (e.g. PN_clean_evt.fits).
+        outdir (str): Output directory.
+        energy_ranges (list): PI band edges in eV.
+        src_rawx (list): Inclusive RAWX ranges of the source region.
+        bkg_rawx (list): Inclusive RAWX ranges of the background region.
+        lc_bin (float): Light curve bin size in seconds.
+        pattern_max (int): Maximum PATTERN.
+
+    Returns:
+        list: Paths of the corrected light curves, one per band.
+    """
+    from tools.scratch import scratch_dir
+
+    with scratch_dir() as path:
+        jobs = energy_resolved_lightcurve_jobs(table, outdir, energy_ranges, src_rawx, bkg_rawx, lc_bin, pattern_max,
+                                               scratch=path)
+        for job in jobs.values():
+            run_steps(job)
+    return list(jobs)
+
+
+def interval_spectra_jobs(table, outdir, t_obs=T_OBS, src_rawx=SOURCE_RAWX, grouping=GROUPING, scratch=False):
+    """
+    Returns the SAS steps of interval_spectra, as {grouped spectrum: steps} (scratch as in
+    energy_resolved_lightcurve_jobs).
+    """
+    from tools.events import check_rawx_coverage, quality_expression
+    from tools.timeconv import mjd_to_met
+
+    check_rawx_coverage(table, src_rawx)
+    if scratch:
+        table, outdir = os.path.abspath(table), os.path.abspath(outdir)
+    out = _paths(scratch)
+    quality = quality_expression(table)
+    tt_times = [float(t) for t in mjd_to_met(t_obs)]
+    label = _rawx_label(src_rawx)
+    jobs = {}
+    for time_min, time_max in zip(tt_times[:-1], tt_times[1:]):
+        root = f'{time_min}_{label}'
+        expression = f'{quality} && {rawx_expression(src_rawx)} && (TIME >= {time_min}) && (TIME <= {time_max})'
+        products = [os.path.join(outdir, f'PN_source_spectrum_raw_{root}.fits'),
+                    os.path.join(outdir, f'PN_{root}.rmf'),
+                    os.path.join(outdir, f'PN_{root}.arf'),
+                    os.path.join(outdir, f'PN_spectrum_grp_{root}.fits')]
+        jobs[products[-1]] = _job(spectrum_steps(table, expression, *map(out, products), grouping), products, scratch)
+    return jobs
+
+
+def interval_spectra(table, outdir, t_obs=T_OBS, src_rawx=SOURCE_RAWX, grouping=GROUPING):
+    """
+    Extracts one grouped spectrum, with its RMF and ARF, for each interval between consecutive times.
+
+    Parameters:
+        table (str): Path to the event list.
+        outdir (str): Output directory.
+        t_obs (list): Interval boundaries in MJD.
+        src_rawx (list): Inclusive RAWX ranges of the source region.
+        grouping (dict): specgroup parameters (default is mincounts=25, oversample=3).
+
+    Returns:
+        list: Paths of the grouped spectra, one per interval.
+    """
+    from tools.scratch import scratch_dir
+
+    with scratch_dir() as path:
+        jobs = interval_spectra_jobs(table, outdir, t_obs, src_rawx, grouping, scratch=path)
+        for job in jobs.values():
+            run_steps(job)
+    return list(jobs)
+
+
+def pulse_gtis(table, gti_dir, period=PULSE_PERIOD, mode='fixed', method='counts', target_counts=20000,
+               src_rawx=SOURCE_RAWX, gti_ext='STDGTI04'):
+    """
+    Writes GTI files for every pulse period, or adaptive GTIs with a target number of source counts.
+
+    Parameters:
+        table (str): Path to the event list.
+        gti_dir (str): Output directory; files are named "gti_<start>_<stop>.fits".
+        period (float): Length of the fixed windows in seconds.
+        mode (str): "fixed" (one GTI per period) or "adaptive" (see tools/timeslice.py).
+        method (str): Adaptive method, "counts" or "bblocks".
+        target_counts (int): Source counts per adaptive slice.
+        src_rawx (list): Inclusive RAWX ranges of the source region (adaptive mode).
+        gti_ext (str): GTI extension of the event list the windows are intersected with.
+
+    Returns:
+        list: Paths of the GTI files, in time order.
+    """
+    from tools.events import read_event_header
+    from tools.gti import intersection, windows
+    from tools.ogip import read_gti, write_gti
+    from tools.timeconv import MJDREF_XMM
+
+    os.makedirs(gti_dir, exist_ok=True)
+    if mode == 'adaptive':
+        from tools.events import check_rawx_coverage
+        from tools.timeslice import adaptive_gtis
+        check_rawx_coverage(table, src_rawx)
+        return adaptive_gtis(table, gti_dir, method=method, target_counts=target_counts, rawx_ranges=src_rawx)
+
+    # Each window is intersected with the GTIs of the event list directly, without tabgtigen
+    header = read_event_header(table)
+    event_gti = read_gti(table, gti_ext)
+    gti_files = []
+    for start_time, stop_time in zip(*windows(header['TSTART'], header['TSTOP'], period)):
+        gti_start, gti_stop = intersection((start_time, stop_time), event_gti)
+        if len(gti_start) == 0:
+            continue
+        gti_file = os.path.join(gti_dir, f"gti_{start_time:.3f}_{stop_time:.3f}.fits")
+        write_gti(gti_file, gti_start, gti_stop, header={'MJDREF': header.get('MJDREF', MJDREF_XMM)})
+        gti_files.append(gti_file)
+    return gti_files
+
+
+def gti_spectra_jobs(table, gti_files, spectrum_dir, src_rawx=SOURCE_RAWX, grouping=GROUPING, scratch=False):
+    """
+    Returns the SAS steps of gti_spectra, as {grouped spectrum: steps} (scratch as in
+    energy_resolved_lightcurve_jobs).
+    """
+    from tools.events import check_rawx_coverage, quality_expression
+
+    check_rawx_coverage(table, src_rawx)
+    if scratch:
+        table, spectrum_dir = os.path.abspath(table), os.path.abspath(spectrum_dir)
+        gti_files = [os.path.abspath(gti_path) for gti_path in gti_files]
+    out = _paths(scratch)
+    quality = quality_expression(table)
+    jobs = {}
+    for gti_path in gti_files:
+        root = os.path.splitext(os.path.basename(gti_path))[0]
+        expression = f'{quality} && {rawx_expression(src_rawx)} && (gti({gti_path},TIME))'
+        products = [os.path.join(spectrum_dir, f"spectrum_{root}.fits"),
+                    os.path.join(spectrum_dir, f"PN_{root}.rmf"),
+                    os.path.join(spectrum_dir, f"PN_{root}.arf"),
+                    os.path.join(spectrum_dir, f"PN_spectrum_grp_{root}.fits")]
+        jobs[products[-1]] = _job(spectrum_steps(table, expression, *map(out, products), grouping), products, scratch)
+    return jobs
+
+
+def gti_spectra(table, gti_files, spectrum_dir, src_rawx=SOURCE_RAWX, grouping=GROUPING):
+    """
+    Extracts one grouped spectrum, with its RMF and ARF, for each GTI file.
+
+    Parameters:
+        table (str): Path to the event list.
+        gti_files (list): Paths of the GTI files (e.g. from pulse_gtis).
+        spectrum_dir (str): Output directory.
+        src_rawx (list): Inclusive RAWX ranges of the source region.
+        grouping (dict): specgroup parameters (default is mincounts=25, oversample=3).
+
+    Returns:
+        list: Paths of the grouped spectra, in the order of gti_files.
+    """
+    os.makedirs(spectrum_dir, exist_ok=True)
+    from tools.scratch import scratch_dir
+
+    with scratch_dir() as path:
+        jobs = gti_spectra_jobs(table, gti_files, spectrum_dir, src_rawx, grouping, scratch=path)
+        for gti_path, job in zip(gti_files, jobs.values()):
+            print(f"Processing {os.path.basename(gti_path)}...")
+            run_steps(job)
+    return list(jobs)
@@ -0,0 +1,160 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides the flaring particle background filter in one pass over the cached event columns, instead of an evselect light curve, a threshold chosen by eye and a second evselect. The threshold is chosen automatically, so that the cut is reproducible. It includes the following functions:
+
+background_rate: Bins the high-energy (10-12 keV, PATTERN==0, #XMMEA_EP) events into a rate curve, with the exposure of each bin taken from the GTIs.
+
+flare_threshold: Chooses the rate threshold by sigma-clipping or as a percentile of the rate curve.
+
+rate_gtis: Builds the GTIs of the bins below the threshold, merging consecutive bins.
+
+filter_flares: Runs the three steps above and writes the filtered event list (#XMMEA_EP, PI cut and flare GTIs applied, GTI extensions updated), together with the rate curve.
+"""
+
+import numpy as np
+from astropy.io import fits
+
+from tools.events import XMMEA_EP, load_event_columns, quality_columns, select_events
+from tools.gti import in_gti, intersection, normalize, overlap
+from tools.ogip import read_gti
+
+
+def background_rate(columns, gti_start, gti_stop, binsize=100.0, pi_range=(10000, 12000), pattern_max=0,
+                    flag_mask=XMMEA_EP):
+    """
+    Returns the rate curve of the high-energy particle background.
+
+    Parameters:
+        columns (dict): Event columns TIME, PI, PATTERN and FLAG (see load_event_columns).
+        gti_start, gti_stop (array): GTIs of the event list in seconds.
+        binsize (float): Bin size in seconds (default is 100 s, as in the notebook).
+        pi_range (tuple): Inclusive PI range in eV (default is 10-12 keV).
+        pattern_max (int): Maximum PATTERN (default is 0, single events).
+        flag_mask (int): FLAG bits to reject (default is #XMMEA_EP).
+
+    Returns:
+        tuple: (bin_edges, rate, error, exposure); bins without exposure have a NaN rate.
+    """
+    mask = select_events(columns, pattern_max=pattern_max, flag_zero=False, pi_range=pi_range, flag_mask=flag_mask)
+    times = columns['TIME'][mask]
+    bin_edges = np.append(np.arange(gti_start[0], gti_stop[-1], binsize), gti_stop[-1])
+    counts, _ = np.histogram(times, bins=bin_edges)
+    exposure = overlap((gti_start, gti_stop), bin_edges[:-1], bin_edges[1:])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = np.where(exposure > 0, counts / exposure, np.nan)
+        error = np.where(exposure > 0, np.sqrt(counts) / exposure, np.nan)
+    return bin_edges, rate, error, exposure
+
+
+def flare_threshold(rate, method='sigma', nsigma=3.0, percentile=99.0):
+    """
+    Chooses the background rate threshold.
+
+    Parameters:
+        rate (array): Background rate curve (NaN bins are ignored).
+        method (str): "sigma" (median + nsigma x standard deviation after sigma-clipping the flares)
+                      or "percentile".
+        nsigma (float): Number of standard deviations above the clipped median ("sigma").
+        percentile (float): Percentile of the rate distribution ("percentile").
+    """
+    rate = np.asarray(rate)[np.isfinite(rate)]
+    if method == 'sigma':
+        from astropy.stats import sigma_clipped_stats
+        mean, median, std = sigma_clipped_stats(rate, sigma=nsigma)
+        return float(median + nsigma * std)
+    if method == 'percentile':
+        return float(np.percentile(rate, percentile))
+    raise ValueError(f"Unknown method '{method}'. Expected 'sigma' or 'percentile'.")
+
+
+def rate_gtis(bin_edges, rate, threshold):
+    """
+    Returns the (start, stop) GTIs of the consecutive bins with rate <= threshold.
+    """
+    bin_edges = np.asarray(bin_edges)
+    good = np.isfinite(rate) & (rate <= threshold)
+    # Consecutive good bins are merged into one interval
+    return normalize((bin_edges[:-1][good], bin_edges[1:][good]))
+
+
+def filter_flares(table, outfile, rate_file=None, threshold=None, method='sigma', pi_min=150, binsize=100.0,
+                  flag_mask=XMMEA_EP, gti_ext='STDGTI04', **kwargs):
+    """
+    Removes flaring particle background intervals and bad events from an event list in one pass.
+
+    Parameters:
+        table (str): Path to the event list (e.g. the epproc timing mode event list).
+        outfile (str): Path to the filtered event list (e.g. PN_clean_evt.fits).
+        rate_file (str): Path to save the background rate curve, with the threshold as CUTVAL so that
+                         plotLC displays it (default is not saved).
+        threshold (float): Background rate threshold in counts/s (default is chosen with flare_threshold).
+        method (str): Threshold method of flare_threshold ("sigma" or "percentile").
+        pi_min (float): Minimum PI of the filtered events in eV, as "(PI>=150)" in the notebook.
+        binsize (float): Bin size of the background rate curve in seconds.
+        flag_mask (int): FLAG bits to reject (default is #XMMEA_EP).
+        gti_ext (str): GTI extension of the event list used for the rate curve.
+        **kwargs: Passed to flare_threshold (nsigma, percentile).
+
+    Returns:
+        dict: "threshold", "gti_start", "gti_stop" (flare GTIs) and "nevents" (events kept).
+    """
+    # QMASK holds both selections below when flag_mask is #XMMEA_EP
+    quality = dict.fromkeys(quality_columns(0, False, flag_mask) + quality_columns(None, False, flag_mask))
+    cols = load_event_columns(table, ['TIME', 'PI'] + list(quality))
+    gti_start, gti_stop = read_gti(table, gti_ext)
+    bin_edges, rate, error, exposure = background_rate(cols, gti_start, gti_stop, binsize=binsize,
+                                                       flag_mask=flag_mask)
+    if threshold is None:
+        threshold = flare_threshold(rate, method=method, **kwargs)
+    flare_start, flare_stop = rate_gtis(bin_edges, rate, threshold)
+
+    # Event selection, e.g. #XMMEA_EP&&(PI>=150)&&gti(...), in the same pass
+    times = cols['TIME']
+    mask = select_events(cols, pattern_max=None, flag_zero=False, pi_range=(pi_min, np.inf), flag_mask=flag_mask)
+    mask &= in_gti(times, (flare_start, flare_stop))
+
+    with fits.open(table) as hdul:
+        hdus = []
+        ontimes = {}
+        for hdu in hdul:
+            if hdu.name == 'EVENTS':
+                events = fits.BinTableHDU(data=hdu.data[mask], header=hdu.header)
+                events.header['CUTVAL'] = (threshold, '[count/s] Background flare threshold')
+                hdus.append(events)
+            elif hdu.name.startswith('STDGTI'):
+                # Good times of every CCD restricted to the flare GTIs
+                start, stop = intersection((hdu.data.field('START'), hdu.data.field('STOP')),
+                                           (flare_start, flare_stop))
+                columns = [fits.Column(name='START', format='D', unit='s', array=start),
+                           fits.Column(name='STOP', format='D', unit='s', array=stop)]
+                hdus.append(fits.BinTableHDU.from_columns(columns, header=hdu.header))
+                ontimes[hdu.name[-2:]] = float(np.sum(stop - start))
+            else:
+                hdus.append(hdu.copy())
+
+        # Keep the exposure keywords of the event list consistent with the new GTIs
+        header = events.header
+        for ccd, ontime in ontimes.items():
+            if header.get(f'ONTIME{ccd}'):
+                if f'LIVETI{ccd}' in header:
+                    header[f'LIVETI{ccd}'] = header[f'LIVETI{ccd}'] * ontime / header[f'ONTIME{ccd}']
+                header[f'ONTIME{ccd}'] = ontime
+        fits.HDUList(hdus).writeto(outfile, overwrite=True)
+
+    if rate_file is not None:
+        columns = [fits.Column(name='TIME', format='D', unit='s', array=0.5 * (bin_edges[1:] + bin_edges[:-1])),
+                   fits.Column(name='RATE', format='E', unit='count/s', array=rate),
+                   fits.Column(name='ERROR', format='E', unit='count/s', array=error),
+                   fits.Column(name='FRACEXP', format='E', array=exposure / np.diff(bin_edges))]
+        rate_hdu = fits.BinTableHDU.from_columns(columns, name='RATE')
+        rate_hdu.header['TIMEDEL'] = binsize
+        rate_hdu.header['CUTVAL'] = (threshold, '[count/s] Background flare threshold')
+        fits.HDUList([fits.PrimaryHDU(), rate_hdu]).writeto(rate_file, overwrite=True)
+
+    return {'threshold': threshold, 'gti_start': flare_start, 'gti_stop': flare_stop, 'nevents': int(mask.sum())}
@@ -0,0 +1,148 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides vectorized Good Time Interval (GTI) algebra, so that flare, pulse and orbital GTIs can be combined and applied to events without a round trip through SAS. A GTI set is a (start, stop) tuple of numpy arrays, as returned by read_gti in ogip.py (write_gti writes them back as OGIP GTI files). Every operation sorts the interval edges once, so it runs in O(n log n) for thousands of intervals. It includes the following functions:
+
+normalize: Sorts a GTI set and merges overlapping or adjacent intervals.
+
+union, intersection, complement: Set operations on GTI sets.
+
+duration: Total good time of a GTI set.
+
+overlap: Good time of a GTI set within each of a list of windows (e.g. light curve bins).
+
+in_gti: Event mask of the times within a GTI set, with a single searchsorted, equivalent to gti(<file>,TIME).
+
+windows: Consecutive fixed-length windows, such as the pulse-period windows of gtiloop.py.
+"""
+
+import numpy as np
+
+
+def _as_arrays(gti):
+    start, stop = gti
+    return np.atleast_1d(np.asarray(start, dtype=np.float64)), np.atleast_1d(np.asarray(stop, dtype=np.float64))
+
+
+def _runs(edges, good):
+    # Intervals made of the consecutive good segments between the given edges
+    change = np.diff(np.concatenate([[0], good.astype(np.int8), [0]]))
+    return edges[:-1][change[:-1] == 1], edges[1:][change[1:] == -1]
+
+
+def normalize(gti):
+    """
+    Returns a GTI set sorted by start time, with empty intervals dropped and overlapping or
+    adjacent intervals merged.
+    """
+    start, stop = _as_arrays(gti)
+    keep = stop > start
+    start, stop = start[keep], stop[keep]
+    order = np.argsort(start, kind='stable')
+    start, stop = start[order], stop[order]
+    if len(start) == 0:
+        return start, stop
+    # A new interval begins where the start is after every previous stop
+    reach = np.maximum.accumulate(stop)
+    first = np.concatenate([[True], start[1:] > reach[:-1]])
+    last = np.concatenate([first[1:], [True]])
+    return start[first], reach[last]
+
+
+def in_gti(times, gti):
+    """
+    Returns the boolean mask of the times within a GTI set (start <= time < stop).
+
+    Parameters:
+        times (array): Event times in seconds.
+        gti (tuple): Normalized (start, stop) GTI set.
+    """
+    start, stop = _as_arrays(gti)
+    times = np.asarray(times)
+    if len(start) == 0:
+        return np.zeros(times.shape, dtype=bool)
+    index = np.searchsorted(start, times, side='right') - 1
+    return (index >= 0) & (times < stop[np.maximum(index, 0)])
+
+
+def union(*gtis):
+    """
+    Returns the union of GTI sets.
+    """
+    starts, stops = zip(*(_as_arrays(gti) for gti in gtis))
+    return normalize((np.concatenate(starts), np.concatenate(stops)))
+
+
+def intersection(*gtis):
+    """
+    Returns the intersection of GTI sets (the times that are good in all of them).
+    """
+    gtis = [normalize(gti) for gti in gtis]
+    edges = np.unique(np.concatenate([np.concatenate(gti) for gti in gtis]))
+    if len(edges) < 2:
+        return np.array([]), np.array([])
+    mid = 0.5 * (edges[1:] + edges[:-1])
+    good = np.ones(len(mid), dtype=bool)
+    for gti in gtis:
+        good &= in_gti(mid, gti)
+    return _runs(edges, good)
+
+
+def complement(gti, tstart, tstop):
+    """
+    Returns the bad time intervals of a GTI set within [tstart, tstop].
+    """
+    start, stop = normalize(gti)
+    edges = np.unique(np.concatenate([[tstart, tstop], np.clip(start, tstart, tstop), np.clip(stop, tstart, tstop)]))
+    if len(edges) < 2:
+        return np.array([]), np.array([])
+    mid = 0.5 * (edges[1:] + edges[:-1])
+    return _runs(edges, ~in_gti(mid, (start, stop)))
+
+
+def duration(gti):
+    """
+    Returns the total good time (in seconds) of a GTI set.
+    """
+    start, stop = normalize(gti)
+    return float(np.sum(stop - start))
+
+
+def _good_time_before(times, gti):
+    # Good time elapsed between the first GTI and each time
+    start, stop = gti
+    length = stop - start
+    index = np.maximum(np.searchsorted(start, times, side='right') - 1, 0)
+    cumulative = np.concatenate([[0.0], np.cumsum(length)])
+    inside = np.clip(times - start[index], 0.0, length[index])
+    return np.where(times >= start[0], cumulative[index] + inside, 0.0)
+
+
+def overlap(gti, window_start, window_stop):
+    """
+    Returns the good time (in seconds) of a GTI set within each window.
+
+    Parameters:
+        gti (tuple): (start, stop) GTI set.
+        window_start, window_stop (array): Windows, e.g. the edges of light curve bins.
+    """
+    gti = normalize(gti)
+    window_start = np.asarray(window_start, dtype=np.float64)
+    window_stop = np.asarray(window_stop, dtype=np.float64)
+    if len(gti[0]) == 0:
+        return np.zeros(np.broadcast(window_start, window_stop).shape)
+    return _good_time_before(window_stop, gti) - _good_time_before(window_start, gti)
+
+
+def windows(tstart, tstop, length):
+    """
+    Returns consecutive windows of the given length covering [tstart, tstop], the last one
+    truncated at tstop.
+    """
+    start = np.arange(tstart, tstop, length)
+    return start, np.minimum(start + length, tstop)
@@ -13,7 +13,6 @@ visualise: This function displays a FITS image in the JS9 interface, allowing us
 getRegions: This function retrieves and processes region data from the JS9 interface. It identifies and distinguishes between "source" and "background" regions, extracting coordinates and region details (like radius, RA/Dec) for various coordinate systems (e.g., FK5, physical, image, ecliptic, galactic). The results are returned in a dictionary, with values such as the coordinates and sizes of the identified regions. It saves the region coordinate file.
 """
 
-import jpyjs9
 from astropy.io import fits
 import numpy as np
 import json
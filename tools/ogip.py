@@ -0,0 +1,144 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides readers and writers for the OGIP products used by the scripts (PI spectra and GTI tables), so that spectra can be written directly from Python and still be used by backscale, rmfgen, arfgen, specgroup and XSPEC. It includes the following functions:
+
+read_spectrum: Reads the CHANNEL/COUNTS columns and the header of a PI spectrum.
+
+write_spectrum: Writes a PI spectrum. When a template spectrum produced by evselect is given, its headers (including the SAS data subspace keywords used by backscale and arfgen) are kept and only the counts and the exposure are replaced.
+
+read_gti: Reads the START/STOP columns of a GTI extension.
+
+write_gti: Writes a GTI file equivalent to the output of tabgtigen, usable in gti(<file>,TIME) filter expressions.
+"""
+
+import numpy as np
+from astropy.io import fits
+
+
+def read_spectrum(filename, ext='SPECTRUM'):
+    """
+    Reads a PI spectrum.
+
+    Parameters:
+        filename (str): Path to the spectrum.
+        ext (str or int): Spectrum extension (default is "SPECTRUM").
+
+    Returns:
+        tuple: (channel, counts, header) with channel and counts as numpy arrays.
+    """
+    with fits.open(filename) as hdul:
+        hdu = hdul[ext]
+        channel = np.array(hdu.data.field('CHANNEL'))
+        if 'COUNTS' in hdu.columns.names:
+            counts = np.array(hdu.data.field('COUNTS'))
+        else:
+            counts = np.array(hdu.data.field('RATE')) * hdu.header['EXPOSURE']
+        return channel, counts, hdu.header.copy()
+
+
+def write_spectrum(filename, counts, exposure, template=None, channel=None, header=None, overwrite=True):
+    """
+    Writes a PI spectrum in OGIP format.
+
+    Parameters:
+        filename (str): Path to the output spectrum.
+        counts (array): Counts per channel.
+        exposure (float): Exposure time in seconds (EXPOSURE keyword).
+        template (str): Spectrum whose headers and extensions are copied (e.g. an evselect spectrum).
+        channel (array): Channel numbers (default is taken from the template, or 0..N-1).
+        header (dict): Additional keywords for the SPECTRUM extension (e.g. RESPFILE, ANCRFILE).
+        overwrite (bool): Whether to overwrite an existing file.
+    """
+    counts = np.asarray(counts)
+    if template is not None:
+        with fits.open(template) as hdul:
+            hdus = [hdu.copy() for hdu in hdul]
+        index = [i for i, hdu in enumerate(hdus) if hdu.name == 'SPECTRUM'][0]
+        spec_header = hdus[index].header
+        if channel is None:
+            channel = hdus[index].data.field('CHANNEL')
+    else:
+        hdus = [fits.PrimaryHDU(), None]
+        index = 1
+        spec_header = fits.Header()
+        spec_header['EXTNAME'] = 'SPECTRUM'
+        spec_header['HDUCLASS'] = 'OGIP'
+        spec_header['HDUCLAS1'] = 'SPECTRUM'
+        spec_header['HDUVERS'] = '1.2.1'
+        spec_header['HDUCLAS2'] = 'TOTAL'
+        spec_header['HDUCLAS3'] = 'COUNT'
+        spec_header['CHANTYPE'] = 'PI'
+        spec_header['POISSERR'] = True
+        for key in ('BACKSCAL', 'AREASCAL', 'CORRSCAL'):
+            spec_header[key] = 1.0
+        for key in ('BACKFILE', 'CORRFILE', 'RESPFILE', 'ANCRFILE'):
+            spec_header[key] = 'none'
+        if channel is None:
+            channel = np.arange(len(counts))
+
+    if len(channel) != len(counts):
+        raise ValueError(f"Got {len(counts)} counts for {len(channel)} channels.")
+
+    columns = [fits.Column(name='CHANNEL', format='J', array=channel),
+               fits.Column(name='COUNTS', format='J', unit='count', array=np.rint(counts).astype(np.int32))]
+    hdu = fits.BinTableHDU.from_columns(columns, header=spec_header)
+    hdu.header['EXPOSURE'] = (float(exposure), '[s] Exposure time')
+    hdu.header['DETCHANS'] = len(channel)
+    if header:
+        for key, value in header.items():
+            hdu.header[key] = value
+    hdus[index] = hdu
+    fits.HDUList(hdus).writeto(filename, overwrite=overwrite)
+
+
+def read_gti(filename, ext='STDGTI04'):
+    """
+    Reads a GTI extension.
+
+    Parameters:
+        filename (str): Path to a FITS file with a GTI extension (event list or GTI file).
+        ext (str or int): GTI extension (default is "STDGTI04", the EPIC-pn timing mode CCD).
+
+    Returns:
+        tuple: (start, stop) numpy arrays in seconds.
+    """
+    with fits.open(filename) as hdul:
+        data = hdul[ext].data
+        return np.array(data.field('START'), dtype=np.float64), np.array(data.field('STOP'), dtype=np.float64)
+
+
+def write_gti(filename, start, stop, ext='STDGTI', header=None, overwrite=True):
+    """
+    Writes a GTI file in OGIP format (as tabgtigen does).
+
+    Parameters:
+        filename (str): Path to the output GTI file.
+        start, stop (array): GTI start and stop times in seconds.
+        ext (str): Name of the GTI extension (default is "STDGTI").
+        header (dict): Additional keywords for the GTI extension (e.g. MJDREF, TIMESYS).
+        overwrite (bool): Whether to overwrite an existing file.
+    """
+    start = np.atleast_1d(np.asarray(start, dtype=np.float64))
+    stop = np.atleast_1d(np.asarray(stop, dtype=np.float64))
+    if len(start) != len(stop):
+        raise ValueError(f"Got {len(start)} GTI starts for {len(stop)} stops.")
+    columns = [fits.Column(name='START', format='D', unit='s', array=start),
+               fits.Column(name='STOP', format='D', unit='s', array=stop)]
+    hdu = fits.BinTableHDU.from_columns(columns, name=ext)
+    hdu.header['HDUCLASS'] = 'OGIP'
+    hdu.header['HDUCLAS1'] = 'GTI'
+    hdu.header['HDUCLAS2'] = 'STANDARD'
+    hdu.header['ONTIME'] = (float(np.sum(stop - start)), '[s] Sum of the GTIs')
+    if len(start):
+        hdu.header['TSTART'] = float(start.min())
+        hdu.header['TSTOP'] = float(stop.max())
+    if header:
+        for key, value in header.items():
+            hdu.header[key] = value
+    fits.HDUList([fits.PrimaryHDU(), hdu]).writeto(filename, overwrite=overwrite)
@@ -0,0 +1,274 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code runs the products declared in a TOML pipeline file (see pipeline.toml in the top directory), so that the regions, bands, bin sizes and grouping settings are written once instead of being repeated in the scripts and the notebook. The file has a [params] table, an optional [setup] function (e.g. start_sas) and one [products.<name>] table per product with the "module:function" that makes it and its arguments. Arguments refer to parameters and to other products with "${name}" (a whole-string reference is replaced by the value itself, e.g. a list of GTI files, otherwise it is formatted into the string), which defines the dependency graph. Arguments that only matter in some configurations are listed in an optional "when" table, e.g. when = { src_rawx = { mode = "adaptive" } }: they are only passed to the function, and only part of the fingerprint, when the other arguments have the given values. Every product has a fingerprint made of its function, its resolved arguments, the size and modification time of its declared input files (inputs = [argument names]) and the fingerprints of the products it uses. Only the products whose fingerprint changed, or whose outputs are missing, are run again, together with the products downstream of them. It includes the following functions:
+
+load_pipeline: Reads a pipeline file, with optional parameter overrides.
+
+dependencies: Returns the products each product uses.
+
+plan: Returns the products to run, in order, with the reason why each of them is out of date.
+
+run_pipeline: Runs the out of date products needed by the requested targets and records their fingerprints and outputs.
+"""
+
+import hashlib
+import importlib
+import json
+import os
+import re
+
+try:
+    import tomllib
+except ImportError:
+    # Python < 3.11
+    import tomli as tomllib
+
+REFERENCE = re.compile(r'\$\{([A-Za-z_][A-Za-z0-9_]*)\}')
+
+
+def load_pipeline(filename, overrides=None):
+    """
+    Reads a TOML pipeline file.
+
+    Parameters:
+        filename (str): Path to the pipeline file.
+        overrides (dict): Parameters replacing those of the file (e.g. from the command line).
+
+    Returns:
+        dict: "params", "setup", "products" and "state" (path to the file recording the products that were run,
+              which may refer to parameters, default is "<pipeline file without extension>.state.json").
+    """
+    with open(filename, 'rb') as file:
+        spec = tomllib.load(file)
+    spec.setdefault('params', {}).update(overrides or {})
+    spec.setdefault('products', {})
+    spec.setdefault('setup', None)
+    spec['state'] = _resolve(spec.get('state', os.path.splitext(filename)[0] + '.state.json'), _param_lookup(spec, {}))
+    for name, product in spec['products'].items():
+        if 'function' not in product:
+            raise ValueError(f"Product '{name}' has no function.")
+        if name in spec['params']:
+            raise ValueError(f"'{name}' is both a parameter and a product.")
+        for arg, condition in product.get('when', {}).items():
+            unknown = [key for key in [arg, *condition] if key not in product.get('args', {})]
+            if unknown:
+                raise ValueError(f"Product '{name}' has a condition on unknown arguments {unknown}.")
+    return spec
+
+
+def _references(value):
+    if isinstance(value, str):
+        return set(REFERENCE.findall(value))
+    if isinstance(value, list):
+        return set().union(*map(_references, value)) if value else set()
+    if isinstance(value, dict):
+        return set().union(*map(_references, value.values())) if value else set()
+    return set()
+
+
+def _resolve(value, lookup):
+    if isinstance(value, str):
+        match = REFERENCE.fullmatch(value)
+        if match:
+            return lookup(match.group(1))
+        value = REFERENCE.sub(lambda m: str(lookup(m.group(1))), value)
+        return os.path.expanduser(value) if value.startswith('~') else value
+    if isinstance(value, list):
+        return [_resolve(item, lookup) for item in value]
+    if isinstance(value, dict):
+        return {key: _resolve(item, lookup) for key, item in value.items()}
+    return value
+
+
+def _param_lookup(spec, products, seen=()):
+    # Parameters may refer to other parameters; products are looked up in the given mapping
+    def lookup(name):
+        if name in products:
+            return products[name]
+        if name not in spec['params']:
+            raise KeyError(f"Unknown parameter or product '{name}'.")
+        if name in seen:
+            raise ValueError(f"Circular reference to parameter '{name}'.")
+        return _resolve(spec['params'][name], _param_lookup(spec, products, seen + (name,)))
+    return lookup
+
+
+def dependencies(spec):
+    """
+    Returns {product: set of the products it uses}, following the references of its arguments and of the
+    parameters they use.
+    """
+    def expand(names, seen):
+        used = set()
+        for name in names - seen:
+            if name in spec['products']:
+                used.add(name)
+            elif name in spec['params']:
+                used |= expand(_references(spec['params'][name]), seen | {name})
+        return used
+
+    return {name: expand(_references(product.get('args', {})), set()) for name, product in spec['products'].items()}
+
+
+def _order(spec, targets=None):
+    # Topological order of the targets and of everything upstream of them
+    graph = dependencies(spec)
+    order, visiting = [], set()
+
+    def visit(name):
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Circular dependency involving product '{name}'.")
+        if name not in graph:
+            raise KeyError(f"Unknown product '{name}'.")
+        visiting.add(name)
+        for upstream in sorted(graph[name]):
+            visit(upstream)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in (targets or spec['products']):
+        visit(name)
+    return order
+
+
+def _file_stamps(value):
+    # Size and modification time of the existing files among the resolved arguments
+    if isinstance(value, str):
+        if os.path.isfile(value):
+            st = os.stat(value)
+            return {value: [st.st_size, st.st_mtime_ns]}
+        return {}
+    items = value.values() if isinstance(value, dict) else value if isinstance(value, list) else []
+    stamps = {}
+    for item in items:
+        stamps.update(_file_stamps(item))
+    return stamps
+
+
+def _args(spec, name, lookup):
+    # Resolved arguments of a product, without the conditional arguments whose condition does not hold
+    product = spec['products'][name]
+    args = _resolve(product.get('args', {}), lookup)
+    for arg, condition in product.get('when', {}).items():
+        if any(args[key] != value for key, value in condition.items()):
+            del args[arg]
+    return args
+
+
+def _fingerprint(spec, name, fingerprints):
+    product = spec['products'][name]
+    args = _args(spec, name, _param_lookup(spec, {k: {'product': k, 'fingerprint': fp}
+                                                  for k, fp in fingerprints.items()}))
+    # Input files are declared by the names of the arguments holding them, e.g. inputs = ["table"]
+    files = _file_stamps([args[arg] for arg in product.get('inputs', []) if arg in args])
+    text = json.dumps({'function': product['function'], 'args': args, 'files': files}, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def _outputs(value):
+    # Paths returned by a product function (a path, or a list of paths)
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, (list, tuple)):
+        return [item for item in value if isinstance(item, str)]
+    return []
+
+
+def _load_state(spec):
+    if os.path.exists(spec['state']):
+        with open(spec['state'], 'r') as file:
+            return json.load(file)
+    return {}
+
+
+def plan(spec, targets=None, force=(), state=None):
+    """
+    Returns the products to run for the targets, in order.
+
+    Parameters:
+        spec (dict): Pipeline (see load_pipeline).
+        targets (list): Products wanted (default is all).
+        force (list): Products to run even if they are up to date (their downstream products follow).
+        state (dict): Recorded products (default is read from the state file).
+
+    Returns:
+        dict: Product -> reason ("new", "parameters or inputs changed", "outputs missing", "upstream changed"
+              or "forced"), for the products to run, in execution order.
+    """
+    state = _load_state(spec) if state is None else state
+    graph = dependencies(spec)
+    fingerprints, stale = {}, {}
+    for name in _order(spec, targets):
+        fingerprints[name] = _fingerprint(spec, name, fingerprints)
+        recorded = state.get(name)
+        if name in force:
+            stale[name] = 'forced'
+        elif recorded is None:
+            stale[name] = 'new'
+        elif any(upstream in stale for upstream in graph[name]):
+            stale[name] = 'upstream changed'
+        elif recorded['fingerprint'] != fingerprints[name]:
+            stale[name] = 'parameters or inputs changed'
+        elif not all(os.path.exists(path) for path in recorded['outputs']):
+            stale[name] = 'outputs missing'
+    return stale
+
+
+def run_pipeline(filename, targets=None, force=(), overrides=None, dry_run=False):
+    """
+    Runs the out of date products needed by the targets.
+
+    Parameters:
+        filename (str): Path to the pipeline file.
+        targets (list): Products wanted (default is all).
+        force (list): Products to run even if they are up to date.
+        overrides (dict): Parameters replacing those of the file.
+        dry_run (bool): Whether to only print the plan.
+
+    Returns:
+        dict: Product -> value returned by its function (from the state file for the products not run).
+    """
+    spec = load_pipeline(filename, overrides)
+    state = _load_state(spec)
+    stale = plan(spec, targets, force, state)
+    for name, reason in stale.items():
+        print(f"{name}: {reason}")
+    if dry_run:
+        return {}
+    if not stale:
+        print("All products are up to date.")
+
+    values = {name: state[name]['value'] for name in _order(spec, targets) if name not in stale}
+    if stale and spec['setup']:
+        setup = spec['setup']
+        _function(setup['function'])(**_resolve(setup.get('args', {}), _param_lookup(spec, values)))
+
+    fingerprints = {}
+    for name in _order(spec, targets):
+        fingerprints[name] = _fingerprint(spec, name, fingerprints)
+        if name in stale:
+            product = spec['products'][name]
+            args = _args(spec, name, _param_lookup(spec, values))
+            print(f"Running {name} ({product['function']})")
+            value = _function(product['function'])(**args)
+            values[name] = value
+            # Recorded after every product, so that an interrupted run resumes after the last completed one
+            state[name] = {'fingerprint': fingerprints[name], 'outputs': _outputs(value), 'value': value}
+            tmp_file = f"{spec['state']}.tmp"
+            with open(tmp_file, 'w') as file:
+                json.dump(state, file, indent=4, default=str)
+            os.replace(tmp_file, spec['state'])
+    return values
+
+
+def _function(path):
+    module, function = path.split(':')
+    return getattr(importlib.import_module(module), function)
@@ -29,37 +29,41 @@ Features include:
 
 Additional Features:
 - Interactive plotting using Plotly.
+- The plotting libraries are imported on the first call of the function that needs them.
 - Error handling for missing data and units.
 - Metadata extraction from FITS headers to enrich analysis.
 - Ensures compatibility with XMM-Newton data conventions.
 """
 import os.path
-from os import path
-import subprocess
-import numpy as np
-import matplotlib.pyplot as plt
-from astropy.io import fits
-from astropy.table import Table
-from matplotlib.colors import LogNorm
-from matplotlib.ticker import ScalarFormatter
-import plotly.express as px
-import plotly.graph_objects as go
-import plotly.io as pio
-pio.renderers.default = 'notebook'
-import plotly.offline as pyo
-pyo.init_notebook_mode(connected=True)
-from lcviz import *
-from lightkurve import * 
-import lightkurve 
-import logging
 import warnings
 from copy import deepcopy
-from astropy.time import Time
-from astropy.units import UnitsWarning
+import numpy as np
+from astropy.io import fits
+
+from tools.timeconv import met_to_mjd, orbital_phase
+
+# Matplotlib, Plotly, lightkurve and LCviz (jdaviz) are imported by the functions that use them,
+# so that importing this module stays fast.
+
+# Origin of the time axis of the Vela X-1 light curves (MJD)
+MJD_ORIGIN = 58607
+
+_plotly_initialised = False
+
+
+def _init_plotly():
+    # Notebook rendering of Plotly figures, set up once on first use
+    global _plotly_initialised
+    import plotly.io as pio
+    import plotly.offline as pyo
+    if not _plotly_initialised:
+        pio.renderers.default = 'notebook'
+        pyo.init_notebook_mode(connected=True)
+        _plotly_initialised = True
 
 
 def plotVelaX1LC(fileNames, names, threshold=None, figname="lightcurve.png", yLog=False, connect_points=False):
-    seconds_in_day = 86400  # Number of seconds in a day
+    import matplotlib.pyplot as plt
 
     # Create the main plot and axis
     fig, ax1 = plt.subplots(figsize=(12, 6))
@@ -87,23 +91,10 @@ def plotVelaX1LC(fileNames, names, threshold=None, figname="lightcurve.png", yLo
             data = fitsFile[1].data
             xdata = data.field('TIME')  # Extract the time column
             ydata = data.field(colName)
-            
-            mjd_reference = 50814  # Reference MJD
-            mjd_target = 58607  # Target MJD
-            seconds_in_day = 86400
-            # Calculate the reference time difference in seconds
-            time_difference = (mjd_target - mjd_reference) * seconds_in_day
-            # Convert TT times to relative MJD
-            relative_seconds = xdata - time_difference
-            relative_mjd = mjd_target + (relative_seconds / seconds_in_day)
-
-            # Convert time from seconds to days since MJD reference
-            xdata_days = relative_mjd-58607
-            
-            
-
-            # Calculate orbital phase with respect to T90
-            orbital_phase = ((relative_mjd - 52974.001) / 8.964357) % 1
+
+            # Convert TT times to days since MJD_ORIGIN, with the MJDREF/TIMEZERO of the file
+            xdata_days = met_to_mjd(xdata, header=prihdu)
+            xdata_days -= MJD_ORIGIN
 
             xmax = np.amax(xdata_days)
             xmin = np.amin(xdata_days)
@@ -116,11 +107,11 @@ def plotVelaX1LC(fileNames, names, threshold=None, figname="lightcurve.png", yLo
             # Set plot labels and titles
             if colName == 'RATE':
                 ax1.set_title("XMM EPIC-pn (0.5-10 keV)")
-                ax1.set_xlabel(f"Time (days since MJD 58607)")
+                ax1.set_xlabel(f"Time (days since MJD {MJD_ORIGIN})")
                 ax1.set_ylabel("Cts/s")
             else:
                 ax1.set_title("XMM EPIC-pn (0.5-10 keV)")
-                ax1.set_xlabel(f"Time (days since MJD 58607)")
+                ax1.set_xlabel(f"Time (days since MJD {MJD_ORIGIN})")
                 ax1.set_ylabel("Counts")
 
             # Add a threshold line if specified
@@ -145,8 +136,9 @@ def plotVelaX1LC(fileNames, names, threshold=None, figname="lightcurve.png", yLo
     ax2.set_xlabel("Orbital Phase")
 
     # Set the secondary x-axis tick labels as orbital phases
-    ax2.set_xticks(ax1.get_xticks())  # Use the same x-ticks as the main axis
-    ax2.set_xticklabels([f"{((x +58607 - 52974.001) / 8.964357) % 1:.2f}" for x in ax1.get_xticks()])
+    ticks = ax1.get_xticks()
+    ax2.set_xticks(ticks)  # Use the same x-ticks as the main axis
+    ax2.set_xticklabels([f"{phase:.2f}" for phase in orbital_phase(ticks + MJD_ORIGIN)])
     
     
     plt.legend()
@@ -171,6 +163,9 @@ def plotLC(fileNames, names, threshold=None):
     - None
     """
 
+    import plotly.graph_objects as go
+    _init_plotly()
+
     # Create an empty Plotly figure
     fig = go.Figure()
     
@@ -260,6 +255,9 @@ def read_lightcurve(
         """Generic helper function to convert XMM-Newton light curve file
         into a generic `LightCurve` object.
         """
+        from astropy.table import Table
+        from astropy.units import UnitsWarning
+        from lightkurve import LightCurve
 
         # Open the FITS file
         if isinstance(fileName, fits.HDUList):
@@ -270,6 +268,7 @@ def read_lightcurve(
 
         # Check if the requested extension exists
         if isinstance(ext, str):
+            from lightkurve.utils import validate_method
             validate_method(ext, supported_methods=[hdu.name.lower() for hdu in hdulist])
 
         # Read the data table
@@ -307,17 +306,6 @@ def read_lightcurve(
         if time_unit != "s":
             raise ValueError(f"Unexpected time unit '{time_unit}'. Expected 's'.")
 
-        # Prepare the time column as MET (Unix format)
-        if time_format == "MET":
-            # Use 'unix' format, suitable for Mission Elapsed Time (MET)
-            time = Time(tab["time"].data, scale=hdulist[ext].header.get("TIMESYS", "tdb").lower(), format="unix")
-        else:
-            time = Time(
-                tab["time"].data,
-                scale=hdulist[ext].header.get("TIMESYS", "tdb").lower(),
-                format="unix",  # If another time format is desired
-            )
-
         # For backwards compatibility, ensure standard columns exist
         if flux_column not in tab.columns:
             alt_flux_column = f"{flux_column}_alt"
@@ -366,6 +354,9 @@ def lcviz(xmm_lightcurves, labels=None, threshold = None):
         labels (list): Optional list of labels for each light curve. 
                        If None, generic labels will be generated.
     """
+    from lcviz import LCviz
+    from lightkurve import LightCurve
+
     # Create LCviz viewer
     lcviz = LCviz()
     
@@ -0,0 +1,251 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides a live preview of the source and background light curves and spectra while the regions are drawn in JS9, so that the RAWX ranges of a timing mode observation can be chosen interactively instead of copying the region coordinates into the notebook and running evselect for every attempt. The event list is read once from the column cache (tools/events.py) into per-RAWX light curves and spectra; any region made of RAWX columns is then a sum of rows, so an update takes milliseconds whatever the size of the event list. It includes the following functions and class:
+
+regions_to_rawx: Converts the regions returned by JS9 (GetRegions) into the RAWX ranges of the source and background regions, using their tags as getRegions in tools/js9helper.py.
+
+rawx_cubes: Builds the per-RAWX light curves and spectra of an event list in one pass.
+
+RegionPreview: Holds the per-RAWX products, computes the light curves (source, scaled background and net) and spectra of given RAWX ranges, and updates a Plotly figure in place. Its watch coroutine polls JS9 and updates the figure whenever the regions change.
+"""
+
+import asyncio
+import math
+import time
+
+import numpy as np
+
+from tools.events import CHUNK_ROWS, XMMEA_EP, load_event_columns, quality_columns, read_event_header, select_events
+
+# Region tags, as in tools/js9helper.py
+SOURCE_TAGS = ('source', 'src')
+BACKGROUND_TAGS = ('back', 'background', 'bkg', 'bg')
+
+# Seconds between two reads of the JS9 regions
+POLL_INTERVAL = 0.5
+
+
+def _merge(ranges):
+    merged = []
+    for rawx_min, rawx_max in sorted(ranges):
+        if merged and rawx_min <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], rawx_max))
+        else:
+            merged.append((rawx_min, rawx_max))
+    return merged
+
+
+def regions_to_rawx(regions, header=None):
+    """
+    Returns the RAWX ranges of the source and background regions drawn in JS9 on a RAWX-RAWY image.
+
+    Parameters:
+        regions (list): Regions returned by GetRegions; boxes and circles are used, tagged "source"/"src" or
+                        "back"/"background"/"bkg"/"bg".
+        header (dict): Header of the image, whose LTV1 and LTM1_1 keywords convert image x to RAWX
+                       (default is image x = RAWX, as for the image of the notebook binned by 1).
+
+    Returns:
+        tuple: (source, background), lists of inclusive (min, max) RAWX ranges; overlapping regions are merged.
+    """
+    ltv, ltm = (header.get('LTV1', 0.0), header.get('LTM1_1', 1.0)) if header is not None else (0.0, 1.0)
+    source, background = [], []
+    for region in regions:
+        tags = [tag.lower() for tag in region.get('tags', [])]
+        if any(tag in SOURCE_TAGS for tag in tags):
+            ranges = source
+        elif any(tag in BACKGROUND_TAGS for tag in tags):
+            ranges = background
+        else:
+            continue
+        if region.get('shape') == 'box':
+            half_width = region['width'] / 2
+        elif region.get('shape') == 'circle':
+            half_width = region['radius']
+        else:
+            continue
+        x = (region['x'] - ltv) / ltm
+        half_width /= abs(ltm)
+        # Columns whose centre is inside the region
+        rawx_min, rawx_max = math.ceil(x - half_width), math.floor(x + half_width)
+        if rawx_min <= rawx_max:
+            ranges.append((rawx_min, rawx_max))
+    return _merge(source), _merge(background)
+
+
+def rawx_cubes(table, lc_bin=283.0, pi_range=(500, 10000), spectralbinsize=5, specchannelmax=20479, pattern_max=4,
+               flag_zero=False, flag_mask=XMMEA_EP):
+    """
+    Returns the light curve and spectrum of every RAWX column of an event list.
+
+    Parameters:
+        table (str): Path to the event list.
+        lc_bin (float): Light curve bin size in seconds.
+        pi_range (tuple): Inclusive PI range of the light curves in eV.
+        spectralbinsize (int): PI bin size of the spectral channels (as in evselect).
+        specchannelmax (int): Maximum PI value.
+        pattern_max (int): Maximum PATTERN.
+        flag_zero (bool): Whether to require FLAG==0.
+        flag_mask (int): FLAG bits to reject when flag_zero is False (default is #XMMEA_EP, as in the notebook).
+
+    Returns:
+        dict: "time_edges", "lc" (counts, RAWX x time bin), "channel_edges" (eV) and "spectrum" (counts, RAWX x channel).
+    """
+    header = read_event_header(table)
+    time_edges = np.append(np.arange(header['TSTART'], header['TSTOP'], lc_bin), header['TSTOP'])
+    ntime, nchan = len(time_edges) - 1, specchannelmax // spectralbinsize + 1
+    cols = load_event_columns(table, ['TIME', 'PI', 'RAWX'] + quality_columns(pattern_max, flag_zero, flag_mask))
+    nrawx = int(cols['RAWX'].max()) + 1 if len(cols['RAWX']) else 1
+    lc = np.zeros(nrawx * ntime, dtype=np.int64)
+    spectrum = np.zeros(nrawx * nchan, dtype=np.int64)
+    for start in range(0, len(cols['TIME']), CHUNK_ROWS):
+        chunk = {name: col[start:start + CHUNK_ROWS] for name, col in cols.items()}
+        mask = select_events(chunk, pattern_max=pattern_max, flag_zero=flag_zero, flag_mask=flag_mask,
+                             pi_range=(0, specchannelmax))
+        rawx = chunk['RAWX'][mask].astype(np.int64)
+        pi = chunk['PI'][mask]
+        spectrum += np.bincount(rawx * nchan + pi.astype(np.int64) // spectralbinsize, minlength=nrawx * nchan)
+        band = (pi >= pi_range[0]) & (pi <= pi_range[1])
+        time_bin = np.searchsorted(time_edges, chunk['TIME'][mask][band], side='right') - 1
+        valid = (time_bin >= 0) & (time_bin < ntime)
+        lc += np.bincount(rawx[band][valid] * ntime + time_bin[valid], minlength=nrawx * ntime)
+    return {'time_edges': time_edges, 'lc': lc.reshape(nrawx, ntime),
+            'channel_edges': np.arange(nchan + 1) * spectralbinsize, 'spectrum': spectrum.reshape(nrawx, nchan)}
+
+
+class RegionPreview:
+    """
+    Live light curves and spectra of RAWX regions, from the per-RAWX products of an event list (see rawx_cubes).
+
+    Parameters:
+        table (str): Path to the event list, e.g. PN_clean_evt.fits (its column cache is built if needed).
+        image_header (dict): Header of the image shown in JS9 (see regions_to_rawx).
+        **kwargs: Passed to rawx_cubes (lc_bin, pi_range, spectralbinsize, pattern_max, ...).
+    """
+
+    def __init__(self, table, image_header=None, **kwargs):
+        self.table = table
+        self.image_header = image_header
+        self.cubes = rawx_cubes(table, **kwargs)
+        self.lc_bin = np.diff(self.cubes['time_edges'])
+        self.src_rawx, self.bkg_rawx = [], []
+        self.fig = None
+        self.latency = None
+        self._task = None
+
+    def _sum(self, cube, rawx_ranges):
+        nrawx = cube.shape[0]
+        total = np.zeros(cube.shape[1], dtype=np.int64)
+        ncolumns = 0
+        for rawx_min, rawx_max in rawx_ranges:
+            rawx_min, rawx_max = max(rawx_min, 0), min(rawx_max, nrawx - 1)
+            if rawx_min <= rawx_max:
+                total += cube[rawx_min:rawx_max + 1].sum(axis=0)
+                ncolumns += rawx_max - rawx_min + 1
+        return total, ncolumns
+
+    def products(self, src_rawx, bkg_rawx=()):
+        """
+        Returns the light curves and spectra of the source and background RAWX ranges.
+
+        Returns:
+            dict: "time" (bin centres, s from the start), "src_rate", "bkg_rate" (scaled to the number of source
+                  columns), "net_rate", "energy" (channel centres, keV), "src_spectrum" and "bkg_spectrum" (counts,
+                  background scaled), and "src_columns", "bkg_columns".
+        """
+        src_lc, nsrc = self._sum(self.cubes['lc'], src_rawx)
+        bkg_lc, nbkg = self._sum(self.cubes['lc'], bkg_rawx)
+        src_spectrum, _ = self._sum(self.cubes['spectrum'], src_rawx)
+        bkg_spectrum, _ = self._sum(self.cubes['spectrum'], bkg_rawx)
+        # Background scaled by the ratio of the number of columns (BACKSCAL of timing mode)
+        scale = nsrc / nbkg if nbkg else 0.0
+        edges, channels = self.cubes['time_edges'], self.cubes['channel_edges']
+        return {'time': (edges[:-1] + edges[1:]) / 2 - edges[0],
+                'src_rate': src_lc / self.lc_bin, 'bkg_rate': bkg_lc * scale / self.lc_bin,
+                'net_rate': (src_lc - bkg_lc * scale) / self.lc_bin,
+                'energy': (channels[:-1] + channels[1:]) / 2000.,
+                'src_spectrum': src_spectrum, 'bkg_spectrum': bkg_spectrum * scale,
+                'src_columns': nsrc, 'bkg_columns': nbkg}
+
+    def figure(self):
+        """
+        Returns the Plotly FigureWidget (light curves and spectra) updated by update(); display it in the notebook.
+        """
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+
+        fig = make_subplots(rows=2, cols=1, vertical_spacing=0.12,
+                            subplot_titles=('Light curve', 'Spectrum'))
+        for name in ('Source', 'Background (scaled)', 'Net'):
+            fig.add_trace(go.Scatter(x=[], y=[], mode='lines', name=f'{name} rate'), row=1, col=1)
+        for name in ('Source', 'Background (scaled)'):
+            fig.add_trace(go.Scatter(x=[], y=[], mode='lines', line_shape='hv', name=f'{name} spectrum'), row=2, col=1)
+        fig.update_xaxes(title_text='Time (s)', row=1, col=1)
+        fig.update_yaxes(title_text='Cts/s', row=1, col=1)
+        fig.update_xaxes(title_text='Energy (keV)', type='log', row=2, col=1)
+        fig.update_yaxes(title_text='Counts', type='log', row=2, col=1)
+        fig.update_layout(height=700, title='Draw "source" and "background" regions in JS9')
+        self.fig = go.FigureWidget(fig)
+        if self.src_rawx:
+            self._draw()
+        return self.fig
+
+    def _draw(self):
+        products = self.products(self.src_rawx, self.bkg_rawx)
+        label = ' + '.join(f'[{a}:{b}]' for a, b in self.src_rawx)
+        if self.bkg_rawx:
+            label += ', background ' + ' + '.join(f'[{a}:{b}]' for a, b in self.bkg_rawx)
+        with self.fig.batch_update():
+            for trace, key in zip(self.fig.data[:3], ('src_rate', 'bkg_rate', 'net_rate')):
+                trace.x, trace.y = products['time'], products[key]
+            for trace, key in zip(self.fig.data[3:], ('src_spectrum', 'bkg_spectrum')):
+                trace.x, trace.y = products['energy'], products[key]
+            self.fig.layout.title = f'Source RAWX {label}'
+
+    def update(self, regions):
+        """
+        Updates the figure for the regions returned by JS9 (GetRegions).
+
+        Returns:
+            bool: Whether the RAWX ranges changed (the figure is only redrawn then).
+        """
+        started = time.perf_counter()
+        src_rawx, bkg_rawx = regions_to_rawx(regions, self.image_header)
+        if (src_rawx, bkg_rawx) == (self.src_rawx, self.bkg_rawx):
+            return False
+        self.src_rawx, self.bkg_rawx = src_rawx, bkg_rawx
+        if self.fig is not None and src_rawx:
+            self._draw()
+        self.latency = time.perf_counter() - started
+        return True
+
+    async def watch(self, js9, interval=POLL_INTERVAL):
+        """
+        Reads the regions of a JS9 display every interval seconds and updates the figure when they change,
+        until stop() is called.
+        """
+        while True:
+            self.update(js9.GetRegions())
+            await asyncio.sleep(interval)
+
+    def start(self, js9, interval=POLL_INTERVAL):
+        """
+        Runs watch in the background of the notebook kernel and returns its task.
+        """
+        self.stop()
+        self._task = asyncio.ensure_future(self.watch(js9, interval))
+        return self._task
+
+    def stop(self):
+        """
+        Stops watching JS9; the last RAWX ranges stay in src_rawx and bkg_rawx.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
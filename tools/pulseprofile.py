@@ -0,0 +1,144 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides energy-resolved pulse profiles and dynamic profile maps. The event list is histogrammed into a (time segment x pulse phase x energy band) cube in a single vectorized pass, streaming over the events in chunks, and the cube is saved so that plots and fits can slice it without reading the event file again. It includes the following functions:
+
+profile_cube: Builds the counts cube and the matching (time segment x pulse phase) exposure.
+
+pulsed_fraction: Derives min-max and rms pulsed fractions, with their errors, for every time segment and energy band.
+
+save_profile_cube, load_profile_cube: Persist the cube as a .npz file.
+"""
+
+import numpy as np
+
+from tools.events import load_event_columns, quality_columns, read_event_header, select_events
+from tools.ogip import read_gti
+from tools.phasespec import SOURCE_RAWX, phase_exposure
+from tools.timing import pulse_cycles
+
+# Number of events histogrammed at a time
+CHUNK_ROWS = 1 << 22
+
+
+def profile_cube(table, t0, period, nphase, energy_edges, segment_length=None, pdot=0.0,
+                 rawx_ranges=SOURCE_RAWX, pattern_max=4, flag_zero=True, gti_ext='STDGTI04'):
+    """
+    Histograms an event list into a (time segment x pulse phase x energy band) cube.
+
+    Parameters:
+        table (str): Path to the barycentred event list.
+        t0 (float): Reference epoch of phase zero (in seconds).
+        period (float): Pulse period in seconds.
+        nphase (int): Number of phase bins.
+        energy_edges (list): PI band edges in eV, e.g. [500, 3000, 6000, 8000, 10000].
+        segment_length (float): Length of the time segments in seconds (default is the whole observation).
+        pdot (float): First period derivative.
+        rawx_ranges (list): Inclusive RAWX ranges of the extraction region.
+        pattern_max (int): Maximum PATTERN.
+        flag_zero (bool): Whether to require FLAG==0.
+        gti_ext (str): GTI extension used for the exposure.
+
+    Returns:
+        dict: "counts" (nseg, nphase, nband), "exposure" (nseg, nphase), "segment_edges",
+              "energy_edges", "t0", "period" and "pdot".
+    """
+    header = read_event_header(table)
+    tstart, tstop = header['TSTART'], header['TSTOP']
+    if segment_length is None:
+        segment_edges = np.array([tstart, tstop])
+    else:
+        segment_edges = np.append(np.arange(tstart, tstop, segment_length), tstop)
+    energy_edges = np.asarray(energy_edges)
+    nseg, nband = len(segment_edges) - 1, len(energy_edges) - 1
+    counts = np.zeros(nseg * nphase * nband, dtype=np.int64)
+
+    cols = load_event_columns(table, ['TIME', 'PI', 'RAWX'] + quality_columns(pattern_max, flag_zero))
+    nevents = len(cols['TIME'])
+    for start in range(0, nevents, CHUNK_ROWS):
+        chunk = {name: col[start:start + CHUNK_ROWS] for name, col in cols.items()}
+        mask = select_events(chunk, rawx_ranges=rawx_ranges, pattern_max=pattern_max, flag_zero=flag_zero,
+                             pi_range=(energy_edges[0], energy_edges[-1]))
+        times = chunk['TIME'][mask]
+        segment = np.searchsorted(segment_edges, times, side='right') - 1
+        band = np.searchsorted(energy_edges, chunk['PI'][mask], side='right') - 1
+        # The upper edge of the last band is inclusive, as in "PI in [e_min:e_max]"
+        band[band == nband] = nband - 1
+        cycles = pulse_cycles(times, t0, period, pdot)
+        phase = np.minimum(((cycles - np.floor(cycles)) * nphase).astype(np.int64), nphase - 1)
+        valid = (segment >= 0) & (segment < nseg)
+        index = (segment[valid] * nphase + phase[valid]) * nband + band[valid]
+        counts += np.bincount(index, minlength=nseg * nphase * nband)
+
+    # Exposure of each phase bin within each segment
+    gti_start, gti_stop = read_gti(table, gti_ext)
+    exposure = np.zeros((nseg, nphase))
+    for i in range(nseg):
+        seg_start = np.clip(gti_start, segment_edges[i], segment_edges[i + 1])
+        seg_stop = np.clip(gti_stop, segment_edges[i], segment_edges[i + 1])
+        exposure[i] = phase_exposure(seg_start, seg_stop, t0, period, nphase, pdot)
+
+    return {'counts': counts.reshape(nseg, nphase, nband), 'exposure': exposure,
+            'segment_edges': segment_edges, 'energy_edges': energy_edges,
+            't0': t0, 'period': period, 'pdot': pdot}
+
+
+def pulsed_fraction(cube):
+    """
+    Returns the pulsed fractions of every time segment and energy band of a profile cube.
+
+    Parameters:
+        cube (dict): Profile cube (see profile_cube or load_profile_cube).
+
+    Returns:
+        dict: "minmax", "minmax_err", "rms" and "rms_err", each of shape (nseg, nband).
+              The rms pulsed fraction is corrected for Poisson noise.
+    """
+    counts = cube['counts'].astype(np.float64)
+    exposure = cube['exposure'][:, :, None]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rate = counts / exposure
+        rate_err2 = counts / exposure**2
+        nphase = counts.shape[1]
+
+        # Min-max pulsed fraction (max - min) / (max + min)
+        imax = np.argmax(rate, axis=1)[:, None, :]
+        imin = np.argmin(rate, axis=1)[:, None, :]
+        rmax = np.take_along_axis(rate, imax, axis=1)[:, 0, :]
+        rmin = np.take_along_axis(rate, imin, axis=1)[:, 0, :]
+        emax = np.take_along_axis(rate_err2, imax, axis=1)[:, 0, :]
+        emin = np.take_along_axis(rate_err2, imin, axis=1)[:, 0, :]
+        minmax = (rmax - rmin) / (rmax + rmin)
+        minmax_err = 2.0 / (rmax + rmin)**2 * np.sqrt(rmin**2 * emax + rmax**2 * emin)
+
+        # RMS pulsed fraction with the Poisson variance of each phase bin subtracted
+        mean = rate.mean(axis=1)
+        variance = np.sum((rate - mean[:, None, :])**2 - rate_err2, axis=1) / nphase
+        rms = np.sqrt(np.clip(variance, 0.0, None)) / mean
+        # Error propagation, d(rms)/d(rate_j) = (rate_j - mean) / (N rms mean^2) - rms / (N mean)
+        derivative = ((rate - mean[:, None, :]) / (rms * mean**2)[:, None, :] - (rms / mean)[:, None, :]) / nphase
+        rms_err = np.sqrt(np.sum(rate_err2 * derivative**2, axis=1))
+    return {'minmax': minmax, 'minmax_err': minmax_err, 'rms': rms, 'rms_err': rms_err}
+
+
+def save_profile_cube(filename, cube):
+    """
+    Saves a profile cube to a .npz file.
+    """
+    np.savez(filename, **cube)
+
+
+def load_profile_cube(filename):
+    """
+    Loads a profile cube saved with save_profile_cube.
+    """
+    with np.load(filename) as data:
+        cube = {name: data[name] for name in data.files}
+    for name in ('t0', 'period', 'pdot'):
+        cube[name] = float(cube[name])
+    return cube
@@ -0,0 +1,269 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides an asyncio runner for SAS tasks, as an alternative to Wrapper(task, inargs).run() which blocks the notebook and whose output is hidden with %%capture. Each SAS task is launched as a subprocess with the environment set by startsas, the number of tasks running at the same time is bounded by a semaphore, and the stdout/stderr lines are streamed to one log file per job while a short progress line is printed for every started and finished job. A job is either a single (task, inargs) step or a list of steps run in order, such as the evselect, backscale, rmfgen, arfgen and specgroup chain of a spectrum. A job that declares its outputs runs in its own scratch directory and its outputs are moved into the product area when it succeeds (tools/scratch.py). It includes the following functions:
+
+sas_wrapper: Returns the Wrapper class selected with the SAS_WRAPPER environment variable (default is the pySAS Wrapper).
+
+sas_command: Returns the command line of a SAS task.
+
+run_job: Coroutine running the steps of one job under a semaphore, with a timeout, and killing the running task on cancellation.
+
+run_jobs: Coroutine running many jobs concurrently, e.g. "results = await run_jobs(jobs, max_concurrent=4)" in the notebook.
+
+run_jobs_sync: Runs run_jobs from a script, where no event loop is running.
+"""
+
+import asyncio
+import contextlib
+import importlib
+import os
+import re
+import shutil
+import signal
+import time
+
+# Seconds given to a SAS task (and the processes it started) to exit after SIGTERM before they are killed
+TERMINATE_GRACE = 5.0
+
+# Environment variable selecting the Wrapper class as "module:Class", e.g. "tools.sasstub:Wrapper"
+SAS_WRAPPER_ENV = 'SAS_WRAPPER'
+DEFAULT_WRAPPER = 'pysas.wrapper:Wrapper'
+
+
+def _wrapper_spec():
+    module, _, name = os.environ.get(SAS_WRAPPER_ENV, DEFAULT_WRAPPER).partition(':')
+    return module, name or 'Wrapper'
+
+
+def sas_wrapper():
+    """
+    Returns the class running SAS tasks in-process, used as Wrapper(task, inargs).run(): pysas.wrapper.Wrapper,
+    or the class named by the SAS_WRAPPER environment variable (e.g. SAS_WRAPPER=tools.sasstub:Wrapper to run
+    the scripts on synthetic data without SAS).
+    """
+    module, name = _wrapper_spec()
+    return getattr(importlib.import_module(module), name)
+
+
+def sas_command(task, inargs):
+    """
+    Returns the command line (argument list) of a SAS task, e.g. ["evselect", "table=...", ...]. When
+    SAS_WRAPPER selects a module with its own sas_command (e.g. tools/sasstub.py), that command line is used.
+    """
+    if SAS_WRAPPER_ENV in os.environ:
+        module = importlib.import_module(_wrapper_spec()[0])
+        if hasattr(module, 'sas_command'):
+            return module.sas_command(task, inargs)
+    return [task] + [str(arg) for arg in inargs]
+
+
+def _steps(job):
+    # A job is one (task, inargs) step, a list of them, or {"steps": [...], "outputs": {...}}
+    if isinstance(job, dict):
+        return _steps(job['steps'])
+    if isinstance(job, tuple) and isinstance(job[0], str):
+        return [job]
+    return list(job)
+
+
+def _outputs(job):
+    return job.get('outputs', {}) if isinstance(job, dict) else {}
+
+
+def _failed(result):
+    return result['returncode'] != 0 or result['error'] is not None
+
+
+def _label(name):
+    # Jobs may be named after their product, e.g. "spectra/PN_spectrum_grp_gti_....fits"
+    return os.path.splitext(os.path.basename(name))[0] or name
+
+
+def _log_name(name):
+    return re.sub(r'[^A-Za-z0-9_.-]+', '_', _label(name)) + '.log'
+
+
+async def _stream(stream, label, log, echo):
+    # Copies the lines of a pipe to the log file as they arrive
+    while True:
+        line = await stream.readline()
+        if not line:
+            break
+        text = line.decode(errors='replace').rstrip()
+        log.write(f'[{label}] {text}\n')
+        log.flush()
+        if echo:
+            print(f'{label}: {text}')
+
+
+async def _terminate(process):
+    # The task runs in its own session, so its whole process group is signalled
+    for sig in (signal.SIGTERM, signal.SIGKILL):
+        try:
+            os.killpg(process.pid, sig)
+        except ProcessLookupError:
+            return
+        try:
+            await asyncio.wait_for(process.wait(), TERMINATE_GRACE)
+            return
+        except asyncio.TimeoutError:
+            pass
+
+
+async def _run_step(task, inargs, log, label, echo, cwd, env):
+    log.write(f'# {" ".join(sas_command(task, inargs))}\n')
+    creation = asyncio.ensure_future(asyncio.create_subprocess_exec(*sas_command(task, inargs), cwd=cwd, env=env,
+                                                                    start_new_session=True,
+                                                                    stdout=asyncio.subprocess.PIPE,
+                                                                    stderr=asyncio.subprocess.PIPE))
+    try:
+        process = await asyncio.shield(creation)
+    except asyncio.CancelledError:
+        # Cancelled while the task was being launched
+        await _terminate(await creation)
+        raise
+    try:
+        await asyncio.gather(_stream(process.stdout, f'{label} {task}', log, echo),
+                             _stream(process.stderr, f'{label} {task} stderr', log, echo))
+        return await process.wait()
+    except BaseException:
+        # Cancellation (including timeouts) must not leave the SAS task running
+        await asyncio.shield(_terminate(process))
+        raise
+
+
+async def run_job(name, job, semaphore=None, log_dir='sas_logs', timeout=None, echo=False, cwd=None, env=None,
+                  scratch_root=None, keep_scratch=False):
+    """
+    Runs the steps of a job in order, stopping at the first step that fails.
+
+    A job that declares its outputs, as {"steps": [...], "outputs": {name in the scratch directory: product path}},
+    runs in its own scratch directory (see tools/scratch.py), with TMPDIR pointing to it. When all the steps
+    succeed, the outputs are moved to their product paths in the declared order, so the last one should be the
+    product that marks the job as done.
+
+    Parameters:
+        name (str): Name of the job (e.g. the path of its product); its base name is used for the log file.
+        job (tuple, list or dict): (task, inargs) step, list of steps, or steps with declared outputs.
+        semaphore (asyncio.Semaphore): Bounds the number of jobs running at the same time.
+        log_dir (str): Directory of the log file, named after the base name of the job.
+        timeout (float): Maximum run time of the job in seconds (default is no limit).
+        echo (bool): Whether to print every output line as well.
+        cwd (str): Working directory of the tasks of jobs without declared outputs (default is the current directory).
+        env (dict): Environment of the tasks (default is os.environ, with the variables set by startsas).
+        scratch_root (str): Parent of the scratch directories (default is scratch_root() of tools/scratch.py).
+        keep_scratch (bool): Whether to keep the scratch directory of a failed job.
+
+    Returns:
+        dict: "name", "task" (last step run), "returncode" (None after a timeout), "error" (missing output),
+              "products" (promoted outputs), "elapsed" and "log".
+    """
+    from tools.scratch import make_scratch_dir, promote
+
+    os.makedirs(log_dir, exist_ok=True)
+    log_file = os.path.join(log_dir, _log_name(name))
+    result = {'name': name, 'task': None, 'returncode': None, 'error': None, 'products': [], 'elapsed': 0.0,
+              'log': log_file}
+    outputs = _outputs(job)
+    async with semaphore or contextlib.nullcontext():
+        t0 = time.perf_counter()
+        task_cwd, task_env = cwd, env
+        if outputs:
+            task_cwd = make_scratch_dir(prefix=f'{_label(name)}_', root=scratch_root)
+            task_env = dict(os.environ if env is None else env, TMPDIR=task_cwd)
+        with open(log_file, 'w') as log:
+            if outputs:
+                log.write(f'# scratch directory {task_cwd}\n')
+            try:
+                for task, inargs in _steps(job):
+                    result['task'] = task
+                    result['returncode'] = await asyncio.wait_for(
+                        _run_step(task, inargs, log, _label(name), echo, task_cwd, task_env),
+                        None if timeout is None else max(timeout - (time.perf_counter() - t0), 0.0))
+                    if result['returncode'] != 0:
+                        break
+                else:
+                    for output, product in outputs.items():
+                        promote(os.path.join(task_cwd, output), product)
+                        result['products'].append(product)
+            except asyncio.TimeoutError:
+                log.write(f'# {result["task"]} timed out after {timeout} s\n')
+                result['returncode'] = None
+            except FileNotFoundError as e:
+                log.write(f'# missing output: {e}\n')
+                result['error'] = f'missing output {e.filename}'
+            finally:
+                result['elapsed'] = time.perf_counter() - t0
+                # The intermediate files of a failed job can be kept for inspection
+                if outputs and not (keep_scratch and _failed(result)):
+                    shutil.rmtree(task_cwd, ignore_errors=True)
+    return result
+
+
+async def run_jobs(jobs, max_concurrent=None, log_dir='sas_logs', timeout=None, progress=True, echo=False,
+                   fail_fast=False, check=True, cwd=None, env=None, scratch_root=None, keep_scratch=False):
+    """
+    Runs SAS jobs concurrently, with at most max_concurrent of them at the same time.
+
+    Parameters:
+        jobs (dict): Job name -> (task, inargs) step or list of steps, e.g. from gti_spectra_jobs in
+                     tools/extract.py.
+        max_concurrent (int): Maximum number of jobs running at the same time (default is os.cpu_count()).
+        log_dir (str): Directory of the log files, one per job.
+        timeout (float): Maximum run time of each job in seconds (default is no limit).
+        progress (bool): Whether to print a line when a job starts and finishes.
+        echo (bool): Whether to print every output line as well.
+        fail_fast (bool): Whether to cancel the remaining jobs after the first failure.
+        check (bool): Whether to raise RuntimeError if any job failed or timed out.
+        cwd (str), env (dict): Working directory and environment of the tasks.
+        scratch_root (str), keep_scratch (bool): Scratch directories of the jobs with declared outputs (see run_job).
+
+    Returns:
+        dict: Job name -> result of run_job, in the order of jobs.
+    """
+    semaphore = asyncio.Semaphore(max_concurrent or os.cpu_count())
+    total = len(jobs)
+    results = {}
+
+    async def _job(name, job):
+        async with semaphore:
+            if progress:
+                print(f'[{len(results)}/{total}] {_label(name)}: started')
+            result = await run_job(name, job, log_dir=log_dir, timeout=timeout, echo=echo, cwd=cwd, env=env,
+                                   scratch_root=scratch_root, keep_scratch=keep_scratch)
+        results[name] = result
+        if progress:
+            status = result['error'] or ('timed out' if result['returncode'] is None else f'exit code {result["returncode"]}')
+            print(f'[{len(results)}/{total}] {_label(name)}: {result["task"]} {status} ({result["elapsed"]:.1f} s)')
+        if fail_fast and _failed(result):
+            raise RuntimeError(f"SAS job '{name}' failed, see {result['log']}")
+        return result
+
+    tasks = [asyncio.ensure_future(_job(name, job)) for name, job in jobs.items()]
+    try:
+        await asyncio.gather(*tasks)
+    except BaseException:
+        # Cancelled by the caller, or by the first failure with fail_fast
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+    results = {name: results[name] for name in jobs}
+    failed = [name for name, result in results.items() if _failed(result)]
+    if check and failed:
+        raise RuntimeError(f"{len(failed)} SAS job(s) failed: {', '.join(failed)} (logs in {log_dir})")
+    return results
+
+
+def run_jobs_sync(jobs, **kwargs):
+    """
+    Runs run_jobs in a new event loop, for scripts (in the notebook, use "await run_jobs(...)").
+    """
+    return asyncio.run(run_jobs(jobs, **kwargs))
@@ -0,0 +1,483 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides a local stand-in for the pySAS Wrapper, implementing in Python the SAS tasks used by the scripts, so that the extraction scripts, the campaign and pipeline runners and their benchmarks can run on synthetic event lists (tools/synthetic.py) without SAS or the CCFs. It is selected with the SAS_WRAPPER environment variable (SAS_WRAPPER=tools.sasstub:Wrapper, see sas_wrapper in tools/sasrun.py), both for in-process runs and for the tasks that tools/sasrun.py starts as subprocesses. The products have the layout of the SAS products, but the responses are placeholders: rmfgen writes a diagonal RMF and arfgen a constant effective area, so spectral fits of these products have no physical meaning. It includes the following functions:
+
+evaluate_expression: Evaluates an evselect filter expression (&&, ||, !, comparisons, "in [a:b]" ranges, bit operators, #XMMEA_EP and gti(<file>,TIME)) on event columns.
+
+Wrapper: Drop-in replacement of pysas.wrapper.Wrapper for evselect (spectrum, rate, filtered and image sets), backscale, rmfgen, arfgen, specgroup and epiclccorr. startsas, cifbuild, odfingest, sasver, barycen and epatplot only print a message; other tasks raise NotImplementedError.
+
+sas_command: Command line running a task with this module, used by tools/sasrun.py.
+"""
+
+import os
+import re
+import sys
+
+import numpy as np
+from astropy.io import fits
+
+# Selection expressions of the # syntax, as FLAG bits that must be zero
+FLAG_SELECTIONS = {'XMMEA_EP': 0xfa000c}
+
+# Effective area of the arfgen placeholder (cm^2)
+ARF_AREA = 100.0
+
+# Tasks that have nothing to do without SAS
+NO_OP_TASKS = ('startsas', 'cifbuild', 'odfingest', 'sasver', 'barycen', 'epatplot')
+
+TOKEN = re.compile(r'\s*(?:(0[xX][0-9a-fA-F]+|\d+\.?\d*(?:[eE][-+]?\d+)?|\.\d+)|'
+                   r'(&&|\|\||==|!=|<=|>=|<|>|!|&|\||\(|\)|\[|\]|:|,|#|-)|([A-Za-z_]\w*))')
+GTI_CALL = re.compile(r'gti\(\s*([^,()]+?)\s*,\s*(\w+)\s*\)')
+
+
+class _Parser:
+    # Recursive descent evaluation of an expression, with numpy arrays as values
+    def __init__(self, text, column, gti_calls):
+        self.tokens = self._tokenize(text)
+        self.pos = 0
+        self.column = column
+        self.gti_calls = gti_calls
+        self.last_name = None
+        self.rawx_ranges = []
+        self.time_range = [-np.inf, np.inf]
+
+    @staticmethod
+    def _tokenize(text):
+        tokens, pos = [], 0
+        text = text.strip()
+        while pos < len(text):
+            match = TOKEN.match(text, pos)
+            if not match or match.end() == pos:
+                raise ValueError(f"Cannot parse the expression at '{text[pos:]}'.")
+            number, operator, name = match.groups()
+            if number is not None:
+                tokens.append(('num', int(number, 16) if number[:2].lower() == '0x' else float(number)))
+            elif operator is not None:
+                tokens.append(('op', operator))
+            else:
+                tokens.append(('name', name))
+            pos = match.end()
+        return tokens
+
+    def _peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def _accept(self, *values):
+        kind, value = self._peek()
+        if kind in ('op', 'name') and value in values:
+            self.pos += 1
+            return value
+        return None
+
+    def _expect(self, value):
+        if self._accept(value) is None:
+            raise ValueError(f"Expected '{value}' in the expression, got '{self._peek()[1]}'.")
+
+    def _number(self):
+        sign = -1 if self._accept('-') else 1
+        kind, value = self._peek()
+        if kind != 'num':
+            raise ValueError(f"Expected a number in the expression, got '{value}'.")
+        self.pos += 1
+        return sign * value
+
+    def parse(self):
+        value = self._or() if self.tokens else True
+        if self.pos != len(self.tokens):
+            raise ValueError(f"Unexpected '{self._peek()[1]}' in the expression.")
+        return value
+
+    def _or(self):
+        value = self._and()
+        while self._accept('||'):
+            value = np.logical_or(value, self._and())
+        return value
+
+    def _and(self):
+        value = self._not()
+        while self._accept('&&'):
+            value = np.logical_and(value, self._not())
+        return value
+
+    def _not(self):
+        if self._accept('!'):
+            return np.logical_not(self._not())
+        return self._compare()
+
+    def _compare(self):
+        self.last_name = None
+        value = self._bit_or()
+        name = self.last_name
+        if self._accept('in'):
+            # "X in [a:b]", with ( or ) for open bounds, and several ranges separated by commas
+            selected = False
+            while True:
+                closed_low = self._accept('[', '(') == '['
+                low = self._number()
+                self._expect(':')
+                high = self._number()
+                closed_high = self._accept(']', ')') == ']'
+                if name == 'RAWX':
+                    self.rawx_ranges.append((int(low), int(high)))
+                in_range = ((value >= low) if closed_low else (value > low)) & \
+                           ((value <= high) if closed_high else (value < high))
+                selected = np.logical_or(selected, in_range)
+                if not self._accept(','):
+                    return selected
+        operator = self._accept('==', '!=', '<=', '>=', '<', '>')
+        if operator is None:
+            return value
+        other = self._bit_or()
+        if name == 'TIME' and np.isscalar(other):
+            # Time limits of the expression, for the exposure of the spectra
+            if operator in ('>=', '>'):
+                self.time_range[0] = max(self.time_range[0], other)
+            elif operator in ('<=', '<'):
+                self.time_range[1] = min(self.time_range[1], other)
+        return {'==': np.equal, '!=': np.not_equal, '<=': np.less_equal, '>=': np.greater_equal,
+                '<': np.less, '>': np.greater}[operator](value, other)
+
+    def _bit_or(self):
+        value = self._bit_and()
+        while self._accept('|'):
+            value = np.bitwise_or(value, self._bit_and())
+        return value
+
+    def _bit_and(self):
+        value = self._atom()
+        while self._accept('&'):
+            value = np.bitwise_and(value, self._atom())
+        return value
+
+    def _atom(self):
+        if self._accept('('):
+            value = self._or()
+            self._expect(')')
+            return value
+        if self._accept('#'):
+            kind, name = self._peek()
+            if name not in FLAG_SELECTIONS:
+                raise ValueError(f"Unknown selection #{name}.")
+            self.pos += 1
+            return (self.column('FLAG') & FLAG_SELECTIONS[name]) == 0
+        kind, value = self._peek()
+        if kind == 'num' or value == '-':
+            number = self._number()
+            return int(number) if float(number).is_integer() else number
+        if kind == 'name':
+            self.pos += 1
+            if value in self.gti_calls:
+                return self.gti_calls[value]()
+            self.last_name = value
+            return self.column(value)
+        raise ValueError(f"Unexpected '{value}' in the expression.")
+
+
+def _table(table):
+    # "file.fits:EVENTS" -> ("file.fits", "EVENTS")
+    if not os.path.exists(table) and ':' in table:
+        path, ext = table.rsplit(':', 1)
+        return path, ext
+    return table, 'EVENTS'
+
+
+def _event_gti(path, header):
+    from tools.ogip import read_gti
+
+    with fits.open(path) as hdul:
+        names = [hdu.name for hdu in hdul]
+    gti_ext = 'STDGTI04' if 'STDGTI04' in names else next((name for name in names if 'GTI' in name), None)
+    if gti_ext is None:
+        return np.array([header['TSTART']]), np.array([header['TSTOP']])
+    return read_gti(path, gti_ext)
+
+
+def evaluate_expression(expression, table, ext='EVENTS'):
+    """
+    Returns the mask of the events of an event list selected by an evselect expression.
+
+    Parameters:
+        expression (str): Filter expression, e.g. "#XMMEA_EP && (PATTERN<=4) && (RAWX in [32:44])".
+        table (str): Path to the event list.
+        ext (str): Extension holding the events.
+
+    Returns:
+        tuple: (mask, info) with info holding "rawx_ranges" (the RAWX ranges of the expression), "time_range"
+               (the limits of its TIME comparisons) and "gti_files" (the files of its gti() terms).
+    """
+    from tools.events import load_event_columns
+    from tools.gti import in_gti
+    from tools.ogip import read_gti
+
+    columns = {}
+
+    def column(name):
+        if name not in columns:
+            columns[name] = load_event_columns(table, [name], ext=ext)[name]
+        return columns[name]
+
+    gti_calls, gti_files = {}, []
+
+    def _gti_call(match):
+        placeholder = f'__gti{len(gti_calls)}__'
+        gti_file, time_column = match.group(1), match.group(2)
+        gti_files.append(gti_file)
+        gti_calls[placeholder] = lambda: in_gti(column(time_column), read_gti(gti_file, 1))
+        return placeholder
+
+    parser = _Parser(GTI_CALL.sub(_gti_call, expression or ''), column, gti_calls)
+    mask = parser.parse()
+    nrows = fits.getval(table, 'NAXIS2', ext)
+    info = {'rawx_ranges': parser.rawx_ranges, 'time_range': tuple(parser.time_range), 'gti_files': gti_files}
+    return np.broadcast_to(np.asarray(mask, dtype=bool), (nrows,)), info
+
+
+def _yes(value):
+    return str(value).strip().lower() in ('yes', 'y', 'true', 't')
+
+
+def _header_keywords(header, keys=('TELESCOP', 'INSTRUME', 'DATAMODE', 'OBS_ID', 'MJDREF', 'TIMESYS', 'TIMEUNIT',
+                                   'TIMEREF', 'TSTART', 'TSTOP', 'SYNTHETI')):
+    return {key: header[key] for key in keys if key in header}
+
+
+class Wrapper:
+    """
+    Local stand-in for pysas.wrapper.Wrapper: Wrapper(task, inargs).run() runs the Python implementation
+    of the task (see the module docstring).
+    """
+
+    # The tasks do not need SAS_CCFPATH or startsas (see start_sas in tools/extract.py)
+    local = True
+
+    def __init__(self, task, inargs):
+        self.task = task
+        self.inargs = [str(arg) for arg in inargs]
+        self.args = {}
+        for arg in self.inargs:
+            key, _, value = arg.partition('=')
+            self.args[key.strip()] = value.strip().strip("'\"")
+
+    def run(self):
+        if self.task in NO_OP_TASKS:
+            print(f"{self.task}: nothing to do without SAS (tools/sasstub.py).")
+            return
+        method = getattr(self, f'_{self.task}', None)
+        if method is None:
+            supported = ['evselect', 'backscale', 'rmfgen', 'arfgen', 'specgroup', 'epiclccorr', *NO_OP_TASKS]
+            raise NotImplementedError(f"{self.task} is not available in tools/sasstub.py "
+                                      f"(supported tasks: {', '.join(supported)}).")
+        method()
+
+    def _evselect(self):
+        args = self.args
+        path, ext = _table(args['table'])
+        header = fits.getheader(path, ext)
+        mask, info = evaluate_expression(args.get('expression', ''), path, ext)
+        if _yes(args.get('withspectrumset', 'no')):
+            self._spectrum(path, ext, header, mask, info)
+        if _yes(args.get('withrateset', 'no')):
+            self._rate(path, ext, header, mask, info)
+        if _yes(args.get('withfilteredset', 'no')):
+            with fits.open(path) as hdul:
+                hdus = [hdu.copy() for hdu in hdul]
+                index = hdul.index_of(ext)
+                hdus[index] = fits.BinTableHDU(data=hdul[ext].data[mask], header=hdul[ext].header)
+                fits.HDUList(hdus).writeto(args['filteredset'], overwrite=True)
+        if _yes(args.get('withimageset', 'no')):
+            self._image(path, ext, header, mask)
+
+    def _backscal(self, info):
+        # Region area in RAWX columns, as the ratios of backscale for timing mode strips
+        return float(sum(high - low + 1 for low, high in info['rawx_ranges'])) if info['rawx_ranges'] else 1.0
+
+    def _spectrum(self, path, ext, header, mask, info):
+        from tools.events import load_event_columns
+        from tools.gti import duration, intersection
+        from tools.ogip import read_gti, write_spectrum
+
+        args = self.args
+        energy_column = args.get('energycolumn', 'PI')
+        binsize = int(args.get('spectralbinsize', 5))
+        channel_min, channel_max = int(args.get('specchannelmin', 0)), int(args.get('specchannelmax', 20479))
+        nchannels = (channel_max - channel_min) // binsize + 1
+        energy = np.asarray(load_event_columns(path, [energy_column], ext=ext)[energy_column])[mask]
+        energy = energy[(energy >= channel_min) & (energy <= channel_max)]
+        counts = np.bincount((energy - channel_min) // binsize, minlength=nchannels)[:nchannels]
+
+        # Good time of the event list, within the gti() files and the TIME limits of the expression
+        time_min, time_max = info['time_range']
+        gtis = [_event_gti(path, header), ([max(time_min, header['TSTART'])], [min(time_max, header['TSTOP'])])]
+        gtis += [read_gti(gti_file, 1) for gti_file in info['gti_files']]
+        exposure = duration(intersection(*gtis))
+        keywords = _header_keywords(header)
+        keywords.update({'BACKSCAL': self._backscal(info), 'SPECDELT': binsize, 'TLMIN1': 0, 'TLMAX1': nchannels - 1,
+                         'RAWXSEL': ','.join(f'{low}:{high}' for low, high in info['rawx_ranges'])})
+        write_spectrum(args['spectrumset'], counts, exposure, header=keywords)
+
+    def _rate(self, path, ext, header, mask, info):
+        from tools.events import load_event_columns
+        from tools.gti import overlap
+
+        args = self.args
+        binsize = float(args.get('timebinsize', 1.0))
+        tstart, tstop = float(header['TSTART']), float(header['TSTOP'])
+        edges = np.append(np.arange(tstart, tstop, binsize), tstop)
+        times = np.asarray(load_event_columns(path, ['TIME'], ext=ext)['TIME'])[mask]
+        counts = np.histogram(times, bins=edges)[0]
+        width = np.diff(edges)
+        columns = [fits.Column(name='TIME', format='D', unit='s', array=0.5 * (edges[1:] + edges[:-1])),
+                   fits.Column(name='RATE', format='E', unit='count/s', array=counts / width),
+                   fits.Column(name='ERROR', format='E', unit='count/s', array=np.sqrt(counts) / width),
+                   fits.Column(name='FRACEXP', format='E',
+                               array=overlap(_event_gti(path, header), edges[:-1], edges[1:]) / width)]
+        rate_hdu = fits.BinTableHDU.from_columns(columns, name='RATE')
+        for key, value in _header_keywords(header).items():
+            rate_hdu.header[key] = value
+        rate_hdu.header['TIMEDEL'] = (binsize, '[s] Bin size')
+        rate_hdu.header['TIMEPIXR'] = (0.5, 'TIME is the bin centre')
+        rate_hdu.header['TIMEZERO'] = 0.0
+        rate_hdu.header['BACKSCAL'] = self._backscal(info)
+        fits.HDUList([fits.PrimaryHDU(), rate_hdu]).writeto(args['rateset'], overwrite=True)
+
+    def _image(self, path, ext, header, mask):
+        from tools.events import load_event_columns
+
+        args = self.args
+        axes = []
+        for axis in ('x', 'y'):
+            name = args[f'{axis}column']
+            index = [header.get(f'TTYPE{n}', '').strip() for n in range(1, header['TFIELDS'] + 1)].index(name) + 1
+            low, high = header.get(f'TLMIN{index}'), header.get(f'TLMAX{index}')
+            values = np.asarray(load_event_columns(path, [name], ext=ext)[name])[mask]
+            if low is None or high is None:
+                low, high = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+            axes.append((values, float(low), float(high), float(args.get(f'{axis}imagebinsize', 1))))
+        (x, x_low, x_high, x_bin), (y, y_low, y_high, y_bin) = axes
+        x_edges = np.arange(x_low, x_high + x_bin, x_bin) - 0.5
+        y_edges = np.arange(y_low, y_high + y_bin, y_bin) - 0.5
+        image = np.histogram2d(y, x, bins=[y_edges, x_edges])[0].astype(np.int32)
+        hdu = fits.PrimaryHDU(image)
+        for key, value in _header_keywords(header).items():
+            hdu.header[key] = value
+        # Physical (column) coordinates: pixel = LTM * value + LTV
+        for n, (low, binsize) in ((1, (x_low, x_bin)), (2, (y_low, y_bin))):
+            hdu.header[f'LTM{n}_{n}'] = 1.0 / binsize
+            hdu.header[f'LTV{n}'] = 1.0 - low / binsize
+        hdu.writeto(args['imageset'], overwrite=True)
+
+    def _backscale(self):
+        with fits.open(self.args['spectrumset'], mode='update') as hdul:
+            if 'BACKSCAL' not in hdul['SPECTRUM'].header:
+                hdul['SPECTRUM'].header['BACKSCAL'] = 1.0
+
+    def _energies(self):
+        # Channel energy bounds (keV) of the spectrum
+        header = fits.getheader(self.args['spectrumset'], 'SPECTRUM')
+        binsize = header.get('SPECDELT', 5)
+        channel = np.arange(header['DETCHANS'])
+        e_min = channel * binsize / 1000.
+        return np.maximum(e_min, 1e-3), (channel + 1) * binsize / 1000.
+
+    def _rmfgen(self):
+        e_min, e_max = self._energies()
+        channel = np.arange(len(e_min))
+        matrix = fits.BinTableHDU.from_columns([fits.Column(name='ENERG_LO', format='E', unit='keV', array=e_min),
+                                                fits.Column(name='ENERG_HI', format='E', unit='keV', array=e_max),
+                                                fits.Column(name='N_GRP', format='I', array=np.ones(len(channel))),
+                                                fits.Column(name='F_CHAN', format='J', array=channel),
+                                                fits.Column(name='N_CHAN', format='J', array=np.ones(len(channel))),
+                                                fits.Column(name='MATRIX', format='E', array=np.ones(len(channel)))],
+                                               name='MATRIX')
+        ebounds = fits.BinTableHDU.from_columns([fits.Column(name='CHANNEL', format='J', array=channel),
+                                                 fits.Column(name='E_MIN', format='E', unit='keV', array=e_min),
+                                                 fits.Column(name='E_MAX', format='E', unit='keV', array=e_max)],
+                                                name='EBOUNDS')
+        for hdu, hduclas in ((matrix, 'RSP_MATRIX'), (ebounds, 'EBOUNDS')):
+            hdu.header['HDUCLASS'] = 'OGIP'
+            hdu.header['HDUCLAS1'] = 'RESPONSE'
+            hdu.header['HDUCLAS2'] = hduclas
+            hdu.header['CHANTYPE'] = 'PI'
+            hdu.header['DETCHANS'] = len(channel)
+            hdu.header['TLMIN4' if hdu is matrix else 'TLMIN1'] = 0
+            hdu.header['PLACEHOL'] = (True, 'Diagonal response of tools/sasstub.py')
+        fits.HDUList([fits.PrimaryHDU(), matrix, ebounds]).writeto(self.args['rmfset'], overwrite=True)
+
+    def _arfgen(self):
+        e_min, e_max = self._energies()
+        hdu = fits.BinTableHDU.from_columns([fits.Column(name='ENERG_LO', format='E', unit='keV', array=e_min),
+                                             fits.Column(name='ENERG_HI', format='E', unit='keV', array=e_max),
+                                             fits.Column(name='SPECRESP', format='E', unit='cm**2',
+                                                         array=np.full(len(e_min), ARF_AREA))], name='SPECRESP')
+        hdu.header['HDUCLASS'] = 'OGIP'
+        hdu.header['HDUCLAS1'] = 'RESPONSE'
+        hdu.header['HDUCLAS2'] = 'SPECRESP'
+        hdu.header['PLACEHOL'] = (True, 'Constant effective area of tools/sasstub.py')
+        fits.HDUList([fits.PrimaryHDU(), hdu]).writeto(self.args['arfset'], overwrite=True)
+
+    def _specgroup(self):
+        # Groups of at least mincounts counts; an incomplete last group is merged into the previous one
+        args = self.args
+        mincounts = int(args.get('mincounts', 1))
+        with fits.open(args['spectrumset']) as hdul:
+            hdus = [hdu.copy() for hdu in hdul]
+        index = [i for i, hdu in enumerate(hdus) if hdu.name == 'SPECTRUM'][0]
+        spectrum = hdus[index]
+        counts = np.asarray(spectrum.data.field('COUNTS'))
+        grouping = -np.ones(len(counts), dtype=np.int16)
+        total = 0
+        group_start = None
+        for channel, count in enumerate(counts):
+            if group_start is None:
+                group_start = channel
+                grouping[channel] = 1
+            total += count
+            if total >= mincounts:
+                total, group_start = 0, None
+        if group_start is not None and group_start > 0:
+            grouping[group_start] = -1
+        columns = spectrum.columns + fits.ColDefs([fits.Column(name='GROUPING', format='I', array=grouping),
+                                                   fits.Column(name='QUALITY', format='I',
+                                                               array=np.zeros(len(counts), dtype=np.int16))])
+        hdus[index] = fits.BinTableHDU.from_columns(columns, header=spectrum.header)
+        hdus[index].header['RESPFILE'] = args.get('rmfset', 'none')
+        hdus[index].header['ANCRFILE'] = args.get('arfset', 'none')
+        hdus[index].header['GROUPING'] = (1, f'Grouped with mincounts={mincounts}')
+        fits.HDUList(hdus).writeto(args['groupedset'], overwrite=True)
+
+    def _epiclccorr(self):
+        # Background subtraction scaled by the BACKSCAL ratio; no absolute corrections
+        args = self.args
+        with fits.open(args['srctslist']) as src:
+            hdus = [hdu.copy() for hdu in src]
+        rate_hdu = hdus[1]
+        rate = np.array(rate_hdu.data.field('RATE'), dtype=np.float64)
+        error = np.array(rate_hdu.data.field('ERROR'), dtype=np.float64)
+        if _yes(args.get('withbkgset', 'no')) and args.get('bkgtslist'):
+            with fits.open(args['bkgtslist']) as bkg:
+                ratio = rate_hdu.header.get('BACKSCAL', 1.0) / bkg[1].header.get('BACKSCAL', 1.0)
+                rate -= ratio * bkg[1].data.field('RATE')
+                error = np.hypot(error, ratio * bkg[1].data.field('ERROR'))
+        rate_hdu.data['RATE'] = rate
+        rate_hdu.data['ERROR'] = error
+        rate_hdu.header['HDUCLAS2'] = 'NET'
+        fits.HDUList(hdus).writeto(args['outset'], overwrite=True)
+
+
+def sas_command(task, inargs):
+    """
+    Returns the command line running a task with this module instead of the SAS executable.
+    """
+    return [sys.executable, os.path.abspath(__file__), task] + [str(arg) for arg in inargs]
+
+
+if __name__ == '__main__':
+    # Run as a task: python tools/sasstub.py <task> <arg=value> ...
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    Wrapper(sys.argv[1], sys.argv[2:]).run()
@@ -0,0 +1,106 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides isolated scratch directories for SAS tasks, so that tasks running at the same time do not share a working directory and their intermediate files are written to tmpfs or local disk instead of the network storage of the working directory. The declared outputs of a task are then moved into the product area with a rename, so that a product is either complete or absent. It includes the following functions:
+
+scratch_root: Chooses the scratch location, the first of /dev/shm (tmpfs) and the local temporary directory with enough free space.
+
+make_scratch_dir, scratch_dir: Create a private scratch directory; the context manager removes it afterwards.
+
+promote: Moves a file from a scratch directory to its final path atomically, with a copy to a temporary file next to the destination when they are on different file systems.
+"""
+
+import contextlib
+import errno
+import os
+import shutil
+import tempfile
+
+# Candidate scratch locations, in order of preference (tmpfs first)
+SCRATCH_ROOTS = ['/dev/shm']
+
+# Free space (bytes) a scratch location must have to be used
+SCRATCH_MIN_FREE = 2 * 1024**3
+
+
+def scratch_root(roots=None, min_free=SCRATCH_MIN_FREE):
+    """
+    Returns the first writable scratch location with at least min_free bytes available, or the
+    local temporary directory (tempfile.gettempdir()).
+
+    Parameters:
+        roots (list): Candidate directories (default is SCRATCH_ROOTS).
+        min_free (int): Required free space in bytes.
+    """
+    for root in (SCRATCH_ROOTS if roots is None else roots):
+        if os.path.isdir(root) and os.access(root, os.W_OK) and shutil.disk_usage(root).free >= min_free:
+            return root
+    return tempfile.gettempdir()
+
+
+def make_scratch_dir(prefix='sas_', root=None):
+    """
+    Creates a private scratch directory and returns its path.
+
+    Parameters:
+        prefix (str): Prefix of the directory name.
+        root (str): Parent directory (default is scratch_root()).
+    """
+    return tempfile.mkdtemp(prefix=prefix, dir=root or scratch_root())
+
+
+@contextlib.contextmanager
+def scratch_dir(prefix='sas_', root=None, keep=False):
+    """
+    Creates a private scratch directory (see make_scratch_dir) and removes it, with everything left in it, on exit.
+
+    Parameters:
+        prefix (str): Prefix of the directory name.
+        root (str): Parent directory (default is scratch_root()).
+        keep (bool): Whether to keep the directory.
+
+    Yields:
+        str: Path to the scratch directory.
+    """
+    path = make_scratch_dir(prefix, root)
+    try:
+        yield path
+    finally:
+        if not keep:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def promote(source, destination):
+    """
+    Moves a file to its final path atomically, replacing any previous version.
+
+    Parameters:
+        source (str): Path to the file in the scratch directory.
+        destination (str): Final path of the product.
+    """
+    destination_dir = os.path.dirname(os.path.abspath(destination))
+    os.makedirs(destination_dir, exist_ok=True)
+    try:
+        os.replace(source, destination)
+        return
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+
+    # Different file systems: copy next to the destination first, so that the final rename is atomic
+    fd, tmp_file = tempfile.mkstemp(prefix=f'.{os.path.basename(destination)}.', suffix='.part', dir=destination_dir)
+    try:
+        with os.fdopen(fd, 'wb') as out, open(source, 'rb') as src:
+            shutil.copyfileobj(src, out, 1 << 24)
+        shutil.copymode(source, tmp_file)
+        os.replace(tmp_file, destination)
+    except BaseException:
+        if os.path.exists(tmp_file):
+            os.remove(tmp_file)
+        raise
+    os.remove(source)
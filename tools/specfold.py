@@ -0,0 +1,295 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides a fast first-pass spectral fitter for the products made by the scripts, without going through XSPEC. The RMF (from rmfgen) and the ARF (from arfgen) are loaded once into a cached sparse CSR response, vectorized model fluxes are folded through it onto the grouped channels of specgroup, and the fit statistic is minimised with SciPy. XSPEC stays the reference for the final fits. It includes the following functions:
+
+load_response: Reads an RMF and an ARF into a sparse (channel x energy) response, cached per file.
+
+fold_model: Folds a model photon flux through the response and the grouping of a spectrum.
+
+fit_grouped_spectrum: Fits one grouped spectrum with a simple continuum ("powerlaw", "cutoffpl", optionally absorbed with "wabs*").
+
+fit_spectra_fast: Fits a list of grouped spectra and collects the results into one astropy Table.
+
+Models (photon flux integrated over each energy bin, photons/cm^2/s):
+- powerlaw: norm * E^-PhoIndex
+- cutoffpl: norm * E^-PhoIndex * exp(-E / HighECut)
+- wabs: photoelectric absorption with the Morrison & McCammon (1983) cross sections, nH in 10^22 cm^-2
+"""
+
+import os
+import functools
+import numpy as np
+from astropy.io import fits
+from scipy import sparse
+
+from tools.xspecbatch import rows_to_table
+
+# Morrison & McCammon (1983) coefficients: upper energy (keV), c0, c1, c2 with
+# sigma(E) = (c0 + c1 E + c2 E^2) E^-3 x 10^-24 cm^2 per hydrogen atom
+WABS_COEFFS = np.array([
+    [0.100, 17.3, 608.1, -2150.0],
+    [0.284, 34.6, 267.9, -476.1],
+    [0.400, 78.1, 18.8, 4.3],
+    [0.532, 71.4, 66.8, -51.4],
+    [0.707, 95.5, 145.8, -61.1],
+    [0.867, 308.9, -380.6, 294.0],
+    [1.303, 120.6, 169.3, -47.7],
+    [1.840, 141.3, 146.8, -31.5],
+    [2.471, 202.7, 104.7, -17.0],
+    [3.210, 342.7, 18.7, 0.0],
+    [4.038, 352.2, 18.7, 0.0],
+    [7.111, 433.9, -2.4, 0.75],
+    [8.331, 629.0, 30.9, 0.0],
+    [np.inf, 701.2, 25.2, 0.0],
+])
+
+
+def _wabs(e_lo, e_hi, nH):
+    energy = 0.5 * (e_lo + e_hi)
+    c = WABS_COEFFS[np.searchsorted(WABS_COEFFS[:, 0], energy)]
+    sigma = (c[:, 1] + c[:, 2] * energy + c[:, 3] * energy**2) / energy**3 * 1e-24
+    return np.exp(-nH * 1e22 * sigma)
+
+
+def _powerlaw(e_lo, e_hi, index, norm):
+    # (E_hi^a - E_lo^a) / a with a = 1 - PhoIndex, written with expm1 to stay exact near PhoIndex = 1
+    a = 1.0 - index
+    log_lo, log_width = np.log(e_lo), np.log(e_hi / e_lo)
+    if a == 0.0:
+        return norm * log_width
+    return norm * np.exp(a * log_lo) * np.expm1(a * log_width) / a
+
+
+def _cutoffpl(e_lo, e_hi, index, ecut, norm):
+    # Simpson's rule over each energy bin
+    e_mid = 0.5 * (e_lo + e_hi)
+    f = lambda e: e**(-index) * np.exp(-e / ecut)
+    return norm * (e_hi - e_lo) * (f(e_lo) + 4 * f(e_mid) + f(e_hi)) / 6.0
+
+
+# Model name -> (function, parameter names, default values, lower bounds, upper bounds)
+MODELS = {
+    'powerlaw': (_powerlaw, ['PhoIndex', 'norm'], [1.5, 0.1], [-3.0, 0.0], [10.0, np.inf]),
+    'cutoffpl': (_cutoffpl, ['PhoIndex', 'HighECut', 'norm'], [1.5, 15.0, 0.1], [-3.0, 0.01, 0.0], [10.0, 500.0, np.inf]),
+}
+ABSORPTION = ('wabs', ['nH'], [1.0], [0.0], [1e5])
+
+
+def _model_definition(model):
+    # "wabs*powerlaw" -> (absorbed, continuum function, names, defaults, lower, upper)
+    parts = [part.strip() for part in model.split('*')]
+    absorbed = parts[0] == ABSORPTION[0]
+    continuum = parts[-1]
+    if continuum not in MODELS or len(parts) > 2 or (len(parts) == 2 and not absorbed):
+        raise ValueError(f"Unsupported model '{model}'. Use [wabs*]powerlaw or [wabs*]cutoffpl.")
+    func, names, defaults, lower, upper = MODELS[continuum]
+    if absorbed:
+        names, defaults = ABSORPTION[1] + names, ABSORPTION[2] + defaults
+        lower, upper = ABSORPTION[3] + lower, ABSORPTION[4] + upper
+    return absorbed, func, names, defaults, lower, upper
+
+
+def model_flux(model, params, e_lo, e_hi):
+    """
+    Returns the photon flux (photons/cm^2/s) of a model in each energy bin.
+
+    Parameters:
+        model (str): "powerlaw", "cutoffpl", "wabs*powerlaw" or "wabs*cutoffpl".
+        params (sequence): Parameter values in the order of the model parameters (nH first if absorbed).
+        e_lo, e_hi (array): Energy bin edges in keV.
+    """
+    absorbed, func, names, defaults, lower, upper = _model_definition(model)
+    if absorbed:
+        return _wabs(e_lo, e_hi, params[0]) * func(e_lo, e_hi, *params[1:])
+    return func(e_lo, e_hi, *params)
+
+
+def _mtime(filename):
+    return os.stat(filename).st_mtime_ns if filename else None
+
+
+@functools.lru_cache(maxsize=32)
+def _load_response(rmf, arf, rmf_mtime, arf_mtime):
+    with fits.open(rmf) as hdul:
+        matrix_ext = 'MATRIX' if 'MATRIX' in hdul else 'SPECRESP MATRIX'
+        data = hdul[matrix_ext].data
+        fchan_index = hdul[matrix_ext].columns.names.index('F_CHAN') + 1
+        first_channel = hdul[matrix_ext].header.get(f'TLMIN{fchan_index}', 0)
+        energ_lo = np.array(data.field('ENERG_LO'), dtype=np.float64)
+        energ_hi = np.array(data.field('ENERG_HI'), dtype=np.float64)
+        ebounds = hdul['EBOUNDS'].data
+        e_min = np.array(ebounds.field('E_MIN'), dtype=np.float64)
+        e_max = np.array(ebounds.field('E_MAX'), dtype=np.float64)
+
+        rows, cols, values = [], [], []
+        for i, (ngrp, fchan, nchan, row) in enumerate(zip(data.field('N_GRP'), data.field('F_CHAN'),
+                                                          data.field('N_CHAN'), data.field('MATRIX'))):
+            fchan = np.atleast_1d(fchan)[:ngrp]
+            nchan = np.atleast_1d(nchan)[:ngrp]
+            if ngrp == 0 or nchan.sum() == 0:
+                continue
+            channels = np.concatenate([np.arange(f, f + n) for f, n in zip(fchan, nchan)]) - first_channel
+            rows.append(channels)
+            cols.append(np.full(len(channels), i))
+            values.append(np.atleast_1d(np.asarray(row, dtype=np.float64))[:len(channels)])
+
+    response = sparse.csr_matrix((np.concatenate(values), (np.concatenate(rows), np.concatenate(cols))),
+                                 shape=(len(e_min), len(energ_lo)))
+    if arf is not None:
+        with fits.open(arf) as hdul:
+            specresp = np.array(hdul['SPECRESP'].data.field('SPECRESP'), dtype=np.float64)
+        response = response @ sparse.diags(specresp)
+    return {'matrix': response.tocsr(), 'energ_lo': energ_lo, 'energ_hi': energ_hi,
+            'e_min': e_min, 'e_max': e_max}
+
+
+def load_response(rmf, arf=None):
+    """
+    Returns the sparse CSR response (channel x energy, ARF included) of an RMF and an ARF.
+
+    Parameters:
+        rmf (str): Path to the RMF (from rmfgen).
+        arf (str): Path to the ARF (from arfgen).
+
+    Returns:
+        dict: "matrix" (scipy.sparse.csr_matrix), "energ_lo", "energ_hi" (model energy grid, keV),
+              "e_min", "e_max" (channel energy bounds, keV).
+    """
+    return _load_response(rmf, arf, _mtime(rmf), _mtime(arf))
+
+
+def _header_file(spectrum, header, key):
+    value = header.get(key, 'none')
+    if not value or value.strip().lower() == 'none':
+        return None
+    value = value.strip()
+    return value if os.path.isabs(value) else os.path.join(os.path.dirname(spectrum), value)
+
+
+def read_grouped_spectrum(spectrum, erange=(0.5, 10.0), rmf=None, arf=None):
+    """
+    Reads a grouped spectrum (from specgroup) and its response, keeping the good groups within erange.
+
+    Returns:
+        dict: "counts", "background" (scaled background counts per group), "background_variance"
+              (variance of the scaled background counts per group), "exposure",
+              "grouping" (sparse group x channel matrix), "response" (see load_response) and
+              "group_response" (sparse group x energy matrix).
+    """
+    with fits.open(spectrum) as hdul:
+        hdu = hdul['SPECTRUM']
+        header = hdu.header
+        counts = np.array(hdu.data.field('COUNTS'), dtype=np.float64)
+        names = hdu.columns.names
+        grouping = np.array(hdu.data.field('GROUPING')) if 'GROUPING' in names else np.ones(len(counts), int)
+        quality = np.array(hdu.data.field('QUALITY')) if 'QUALITY' in names else np.zeros(len(counts), int)
+        exposure = float(header['EXPOSURE'])
+        backscal = float(header.get('BACKSCAL', 1.0))
+
+    response = load_response(rmf or _header_file(spectrum, header, 'RESPFILE'),
+                             arf or _header_file(spectrum, header, 'ANCRFILE'))
+
+    # Channels of each group; bad channels and channels outside erange are dropped
+    group_id = np.cumsum(grouping == 1) - 1
+    good = (quality == 0) & (response['e_min'] >= erange[0]) & (response['e_max'] <= erange[1])
+    channels = np.nonzero(good)[0]
+    groups, group_index = np.unique(group_id[channels], return_inverse=True)
+    grouping_matrix = sparse.csr_matrix((np.ones(len(channels)), (group_index, channels)),
+                                        shape=(len(groups), len(counts)))
+
+    background = np.zeros(len(groups))
+    background_variance = np.zeros(len(groups))
+    backfile = _header_file(spectrum, header, 'BACKFILE')
+    if backfile is not None:
+        with fits.open(backfile) as hdul:
+            bkg_header = hdul['SPECTRUM'].header
+            bkg_counts = np.array(hdul['SPECTRUM'].data.field('COUNTS'), dtype=np.float64)
+        scale = exposure * backscal / (float(bkg_header['EXPOSURE']) * float(bkg_header.get('BACKSCAL', 1.0)))
+        background = grouping_matrix @ bkg_counts * scale
+        background_variance = background * scale
+
+    return {'counts': grouping_matrix @ counts, 'background': background,
+            'background_variance': background_variance, 'exposure': exposure,
+            'grouping': grouping_matrix, 'response': response,
+            'group_response': (grouping_matrix @ response['matrix']).tocsr()}
+
+
+def fold_model(spec, model, params):
+    """
+    Returns the predicted source counts in each group of a spectrum read with read_grouped_spectrum.
+    """
+    response = spec['response']
+    flux = model_flux(model, params, response['energ_lo'], response['energ_hi'])
+    return spec['group_response'] @ flux * spec['exposure']
+
+
+def fit_grouped_spectrum(spectrum, model='wabs*powerlaw', params=None, erange=(0.5, 10.0), statistic='chi'):
+    """
+    Fits one grouped spectrum with a simple continuum model.
+
+    Parameters:
+        spectrum (str): Path to the grouped spectrum (from specgroup), with RESPFILE/ANCRFILE in its header.
+        model (str): "powerlaw", "cutoffpl", "wabs*powerlaw" or "wabs*cutoffpl".
+        params (dict): Initial parameter values by name (e.g. {"nH": 1.0, "PhoIndex": 1.2}).
+        erange (tuple): Energy range in keV (default is 0.5-10 keV).
+        statistic (str): "chi" (data and scaled background variance) or "cstat".
+
+    Returns:
+        dict: "SPECTRUM", "STATISTIC", "DOF", "STATUS" and, for every parameter, its best-fit value and
+              1-sigma error ("<name>", "<name>_err").
+    """
+    from scipy.optimize import least_squares
+
+    absorbed, func, names, defaults, lower, upper = _model_definition(model)
+    row = {'SPECTRUM': os.path.basename(spectrum)}
+    try:
+        spec = read_grouped_spectrum(spectrum, erange=erange)
+        data = spec['counts']
+        background = spec['background']
+        x0 = [dict(zip(names, defaults), **(params or {}))[name] for name in names]
+
+        if statistic == 'chi':
+            # Variance of the data and of the subtracted background, as in XSPEC
+            sigma = np.sqrt(np.maximum(data + spec['background_variance'], 1.0))
+            residuals = lambda p: (data - background - fold_model(spec, model, p)) / sigma
+        elif statistic == 'cstat':
+            def residuals(p):
+                # Signed deviance residuals: their sum of squares is the Cash statistic
+                m = np.maximum(fold_model(spec, model, p) + background, 1e-30)
+                d = np.where(data > 0, data * np.log(np.where(data > 0, data, 1.0) / m), 0.0)
+                return np.sign(data - m) * np.sqrt(np.maximum(2.0 * (m - data + d), 0.0))
+        else:
+            raise ValueError(f"Unknown statistic '{statistic}'. Expected 'chi' or 'cstat'.")
+
+        result = least_squares(residuals, np.clip(x0, lower, upper), bounds=(lower, upper), x_scale='jac')
+        try:
+            covariance = np.linalg.inv(result.jac.T @ result.jac)
+            errors = np.sqrt(np.diag(covariance))
+        except np.linalg.LinAlgError:
+            errors = np.full(len(names), np.nan)
+        row['STATISTIC'] = float(np.sum(result.fun**2))
+        row['DOF'] = len(data) - len(names)
+        row['STATUS'] = 'ok' if result.success else f'failed: {result.message}'
+        for name, value, error in zip(names, result.x, errors):
+            row[name] = value
+            row[f'{name}_err'] = error
+    except Exception as e:
+        row['STATUS'] = f'failed: {e}'
+    return row
+
+
+def fit_spectra_fast(spectra, model='wabs*powerlaw', params=None, **kwargs):
+    """
+    Fits a list of grouped spectra with fit_grouped_spectrum and returns one astropy Table.
+
+    The response of every RMF/ARF pair is loaded only once, so slices sharing the same response
+    are folded with the cached matrix.
+    """
+    return rows_to_table([fit_grouped_spectrum(spectrum, model=model, params=params, **kwargs)
+                          for spectrum in spectra])
@@ -0,0 +1,149 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides stacking of the per-GTI spectra written by loopgtispectra.py into longer intervals or phase groups, without running evselect and arfgen again for every new grouping. The input spectra are read one at a time, so that thousands of inputs can be stacked with the memory of a single spectrum. It includes the following functions:
+
+stack_spectra: Sums the counts and the exposures of a list of spectra, combines their ARFs weighted by exposure, reuses the shared RMF and writes one OGIP spectrum, ARF and RMF triplet.
+
+group_by_time: Splits a list of spectra into consecutive groups covering a given time interval.
+"""
+
+import os
+import numpy as np
+from astropy.io import fits
+
+from tools.ogip import write_spectrum
+from tools.xspecbatch import spectrum_start_time
+
+
+def _header_file(spectrum, header, key):
+    # RESPFILE/ANCRFILE paths are relative to the directory of the spectrum
+    value = str(header.get(key, 'none')).strip()
+    if not value or value.lower() == 'none':
+        return None
+    return value if os.path.isabs(value) else os.path.join(os.path.dirname(spectrum), value)
+
+
+def _gti_extensions(hdul):
+    return [hdu.name for hdu in hdul if hdu.name.startswith('STDGTI') or hdu.header.get('HDUCLAS1') == 'GTI']
+
+
+def stack_spectra(spectra, outroot, arfs=None, rmf=None, overwrite=True):
+    """
+    Stacks PI spectra extracted from the same region in different time intervals.
+
+    Parameters:
+        spectra (list): Paths to the (ungrouped) spectra, e.g. "spectra/spectrum_gti_*.fits".
+        outroot (str): Output file root; "<outroot>.fits" and "<outroot>.arf" are written.
+        arfs (list): ARF of every spectrum (default is the ANCRFILE keyword of each spectrum).
+        rmf (str): RMF shared by all the spectra (default is the RESPFILE keyword of the first spectrum).
+        overwrite (bool): Whether to overwrite existing outputs.
+
+    Returns:
+        tuple: (spectrum, rmf, arf) paths of the stacked triplet.
+    """
+    if not spectra:
+        raise ValueError("No spectra to stack.")
+    if arfs is not None and len(arfs) != len(spectra):
+        raise ValueError(f"Got {len(arfs)} ARFs for {len(spectra)} spectra.")
+
+    counts = None
+    exposure = 0.0
+    backscal = 0.0
+    specresp = None
+    arf_template = None
+    tstart, tstop = np.inf, -np.inf
+    gtis = {}
+    for i, spectrum in enumerate(spectra):
+        with fits.open(spectrum, memmap=True) as hdul:
+            hdu = hdul['SPECTRUM']
+            header = hdu.header
+            spec_exposure = float(header['EXPOSURE'])
+            spec_counts = np.asarray(hdu.data.field('COUNTS'), dtype=np.int64)
+            if counts is None:
+                counts = np.zeros(len(spec_counts), dtype=np.int64)
+                if rmf is None:
+                    rmf = _header_file(spectrum, header, 'RESPFILE')
+            elif len(spec_counts) != len(counts):
+                raise ValueError(f"{spectrum} has {len(spec_counts)} channels, expected {len(counts)}.")
+            counts += spec_counts
+            exposure += spec_exposure
+            backscal += float(header.get('BACKSCAL', 1.0)) * spec_exposure
+            tstart = min(tstart, float(header.get('TSTART', np.inf)))
+            tstop = max(tstop, float(header.get('TSTOP', -np.inf)))
+            for name in _gti_extensions(hdul):
+                data = hdul[name].data
+                gtis.setdefault(name, []).append(np.column_stack([data.field('START'), data.field('STOP')]))
+            arf = arfs[i] if arfs is not None else _header_file(spectrum, header, 'ANCRFILE')
+
+        # Exposure-weighted ARF: sum of EXPOSURE_i * SPECRESP_i, normalised at the end
+        if arf is None:
+            raise ValueError(f"No ARF for {spectrum}; pass arfs or set ANCRFILE.")
+        with fits.open(arf, memmap=True) as hdul:
+            arf_specresp = np.asarray(hdul['SPECRESP'].data.field('SPECRESP'), dtype=np.float64)
+        if specresp is None:
+            specresp = np.zeros(len(arf_specresp))
+            arf_template = arf
+        elif len(arf_specresp) != len(specresp):
+            raise ValueError(f"{arf} has {len(arf_specresp)} energy bins, expected {len(specresp)}.")
+        specresp += arf_specresp * spec_exposure
+
+    out_spectrum = f'{outroot}.fits'
+    out_arf = f'{outroot}.arf'
+    with fits.open(arf_template) as hdul:
+        hdus = [hdu.copy() for hdu in hdul]
+    for hdu in hdus:
+        if hdu.name == 'SPECRESP':
+            hdu.data['SPECRESP'] = specresp / exposure if exposure > 0 else specresp
+            hdu.header['EXPOSURE'] = (exposure, '[s] Total exposure of the stacked spectra')
+            hdu.header['NSTACK'] = (len(spectra), 'Number of stacked ARFs')
+    fits.HDUList(hdus).writeto(out_arf, overwrite=overwrite)
+
+    outdir = os.path.dirname(os.path.abspath(out_spectrum))
+    keywords = {'BACKSCAL': backscal / exposure if exposure > 0 else 1.0,
+                'ANCRFILE': os.path.relpath(os.path.abspath(out_arf), outdir),
+                'RESPFILE': os.path.relpath(os.path.abspath(rmf), outdir) if rmf else 'none',
+                'NSTACK': (len(spectra), 'Number of stacked spectra')}
+    if np.isfinite(tstart) and np.isfinite(tstop):
+        keywords['TSTART'], keywords['TSTOP'] = tstart, tstop
+    write_spectrum(out_spectrum, counts, exposure, template=spectra[0], header=keywords, overwrite=overwrite)
+
+    # The GTIs of the stacked spectrum are those of all the inputs
+    if gtis:
+        with fits.open(out_spectrum, mode='update') as hdul:
+            for name, intervals in gtis.items():
+                intervals = np.concatenate(intervals)
+                intervals = intervals[np.argsort(intervals[:, 0], kind='stable')]
+                columns = [fits.Column(name='START', format='D', unit='s', array=intervals[:, 0]),
+                           fits.Column(name='STOP', format='D', unit='s', array=intervals[:, 1])]
+                hdul[name] = fits.BinTableHDU.from_columns(columns, header=hdul[name].header)
+    return out_spectrum, rmf, out_arf
+
+
+def group_by_time(spectra, interval):
+    """
+    Splits spectra into consecutive groups, each covering at most the given time interval.
+
+    Parameters:
+        spectra (list): Paths to the spectra (the start time is read from the "gti_<start>_<stop>"
+                        file name or from the TSTART keyword).
+        interval (float): Length of each group in seconds.
+
+    Returns:
+        list: Lists of spectrum paths, in time order.
+    """
+    times = [spectrum_start_time(spectrum) for spectrum in spectra]
+    timed = sorted((t, spectrum) for t, spectrum in zip(times, spectra) if t is not None)
+    groups = []
+    group_start = None
+    for t, spectrum in timed:
+        if group_start is None or t >= group_start + interval:
+            groups.append([])
+            group_start = t
+        groups[-1].append(spectrum)
+    return groups
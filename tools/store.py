@@ -0,0 +1,260 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides a content-addressed store for the products of the working directory. A product is stored once under the SHA-256 digest of its content (objects/<2 digits>/<digest>), FITS products are gzip-compressed, and the product path is replaced by a symbolic link to the object. astropy, cfitsio (SAS, XSPEC) and JS9 recognise gzip-compressed FITS files by their content, so the products keep being read through their usual paths. Identical products, e.g. the RMFs of the per-GTI spectra or light curves extracted again, share one object. With ignore_keywords, products that only differ in header keywords such as DATE, CHECKSUM or HISTORY (near-identical products) share an object too. Objects are read-only: a task that modifies a product in place (e.g. barycen) must check it out first. It includes the following functions:
+
+file_digest: SHA-256 digest of a file, or of the data and the other header keywords of a FITS file.
+
+checkin: Moves products into the store and replaces them with links.
+
+checkout: Replaces a link with a private, uncompressed copy of the product.
+
+resolve: Returns the object a product path points to.
+
+collect_garbage: Deletes the objects no longer linked from the given directories.
+
+store_usage: Number and size of the objects, and the size of the products they stand for.
+"""
+
+import gzip
+import hashlib
+import os
+import shutil
+
+# Default store location within a working directory
+STORE_DIR = '.store'
+
+# Header keywords that may differ between near-identical products (see checkin)
+VOLATILE_KEYWORDS = ('DATE', 'CHECKSUM', 'DATASUM', 'HISTORY', 'COMMENT')
+
+# FITS products smaller than this are stored uncompressed
+COMPRESS_MIN_BYTES = 64 * 1024
+COMPRESS_LEVEL = 6
+
+BLOCK_SIZE = 1 << 24
+
+FITS_SIGNATURE = b'SIMPLE  ='
+GZIP_SIGNATURE = b'\x1f\x8b'
+
+
+def _is_fits(path):
+    with open(path, 'rb') as file:
+        return file.read(len(FITS_SIGNATURE)) == FITS_SIGNATURE
+
+
+def _is_gzip(path):
+    with open(path, 'rb') as file:
+        return file.read(len(GZIP_SIGNATURE)) == GZIP_SIGNATURE
+
+
+def _open_content(path):
+    # Uncompressed content of a product or object
+    return gzip.open(path, 'rb') if _is_gzip(path) else open(path, 'rb')
+
+
+def file_digest(path, ignore_keywords=()):
+    """
+    Returns the SHA-256 digest (hex) of a file.
+
+    Parameters:
+        path (str): Path to the file (gzip-compressed files are digested uncompressed).
+        ignore_keywords (sequence): Header keywords left out of the digest of a FITS file, whose
+                                    other header cards and data are digested HDU by HDU.
+    """
+    digest = hashlib.sha256()
+    if not ignore_keywords or not _is_fits(path):
+        with _open_content(path) as file:
+            for block in iter(lambda: file.read(BLOCK_SIZE), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    from astropy.io import fits
+
+    ignore = set(ignore_keywords)
+    with fits.open(path, memmap=False, lazy_load_hdus=False) as hdul, _open_content(path) as file:
+        for index, hdu in enumerate(hdul):
+            for card in hdu.header.cards:
+                if card.keyword not in ignore:
+                    digest.update(card.image.encode())
+            # Data section read as stored, without decoding it
+            info = hdul.fileinfo(index)
+            file.seek(info['datLoc'])
+            remaining = info['datSpan']
+            while remaining > 0:
+                block = file.read(min(BLOCK_SIZE, remaining))
+                if not block:
+                    break
+                digest.update(block)
+                remaining -= len(block)
+    return digest.hexdigest()
+
+
+def _object_path(store_dir, digest):
+    return os.path.join(store_dir, 'objects', digest[:2], digest)
+
+
+def _add_object(path, object_path, compress):
+    # Written next to the object and renamed, so that a concurrent checkin sees a complete object or none
+    os.makedirs(os.path.dirname(object_path), exist_ok=True)
+    tmp_file = f'{object_path}.{os.getpid()}.tmp'
+    with _open_content(path) as src:
+        if compress:
+            with gzip.open(tmp_file, 'wb', compresslevel=COMPRESS_LEVEL) as out:
+                shutil.copyfileobj(src, out, BLOCK_SIZE)
+        else:
+            with open(tmp_file, 'wb') as out:
+                shutil.copyfileobj(src, out, BLOCK_SIZE)
+    os.chmod(tmp_file, 0o444)
+    os.replace(tmp_file, object_path)
+
+
+def _link(object_path, path):
+    # Relative link, so that the working directory can be moved with its store
+    tmp_link = f'{path}.{os.getpid()}.link'
+    os.symlink(os.path.relpath(object_path, os.path.dirname(os.path.abspath(path))), tmp_link)
+    os.replace(tmp_link, path)
+
+
+def _products(paths, store_dir):
+    for path in paths:
+        if os.path.isdir(path) and not os.path.islink(path):
+            for root, dirs, files in os.walk(path):
+                # Never descend into the store
+                dirs[:] = [d for d in dirs if os.path.realpath(os.path.join(root, d)) != store_dir]
+                for name in sorted(files):
+                    yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def checkin(paths, store_dir=STORE_DIR, compress=True, ignore_keywords=(), min_size=0):
+    """
+    Moves products into the store and replaces each of them with a link to its object.
+
+    Parameters:
+        paths (list): Products, or directories whose files are all checked in (e.g. "./spectra").
+        store_dir (str): Store directory, on the same volume as the products (default is ".store").
+        compress (bool): Whether to gzip-compress FITS products larger than COMPRESS_MIN_BYTES.
+        ignore_keywords (sequence): Header keywords ignored when comparing FITS products, e.g.
+                                    VOLATILE_KEYWORDS to share one object between near-identical products.
+        min_size (int): Products smaller than this (bytes) are left as they are.
+
+    Returns:
+        dict: "products", "new_objects", "bytes_in" (size of the products) and "bytes_stored" (size of the new objects).
+    """
+    store_dir = os.path.realpath(store_dir)
+    stats = {'products': 0, 'new_objects': 0, 'bytes_in': 0, 'bytes_stored': 0}
+    for path in _products(paths, store_dir):
+        if os.path.islink(path) or not os.path.isfile(path) or os.path.getsize(path) < min_size:
+            continue
+        size = os.path.getsize(path)
+        is_fits = _is_fits(path)
+        digest = file_digest(path, ignore_keywords if is_fits else ())
+        object_path = _object_path(store_dir, digest)
+        if not os.path.exists(object_path):
+            _add_object(path, object_path, compress and is_fits and size >= COMPRESS_MIN_BYTES)
+            stats['new_objects'] += 1
+            stats['bytes_stored'] += os.path.getsize(object_path)
+        _link(object_path, path)
+        stats['products'] += 1
+        stats['bytes_in'] += size
+    return stats
+
+
+def resolve(path):
+    """
+    Returns the path of the object a product links to, or the path itself if it is not in a store.
+    """
+    return os.path.realpath(path) if os.path.islink(path) else path
+
+
+def checkout(path):
+    """
+    Replaces the link of a product with a private, uncompressed and writable copy, e.g. before barycen.
+
+    Returns:
+        str: The product path.
+    """
+    if not os.path.islink(path):
+        return path
+    tmp_file = f'{path}.{os.getpid()}.tmp'
+    with _open_content(resolve(path)) as src, open(tmp_file, 'wb') as out:
+        shutil.copyfileobj(src, out, BLOCK_SIZE)
+    os.replace(tmp_file, path)
+    return path
+
+
+def _linked_objects(roots, store_dir):
+    linked = set()
+    for path in _products(roots, store_dir):
+        if os.path.islink(path):
+            target = os.path.realpath(path)
+            if target.startswith(store_dir + os.sep):
+                linked.add(target)
+    return linked
+
+
+def collect_garbage(roots, store_dir=STORE_DIR, dry_run=False):
+    """
+    Deletes the objects that are not linked from any product under the given directories.
+
+    Parameters:
+        roots (list): Directories holding all the products that use the store.
+        store_dir (str): Store directory.
+        dry_run (bool): Whether to only return the objects that would be deleted.
+
+    Returns:
+        list: Paths of the unreferenced objects.
+    """
+    store_dir = os.path.realpath(store_dir)
+    linked = _linked_objects(roots, store_dir)
+    unreferenced = []
+    for root, dirs, files in os.walk(os.path.join(store_dir, 'objects')):
+        for name in files:
+            object_path = os.path.join(root, name)
+            if object_path not in linked:
+                unreferenced.append(object_path)
+                if not dry_run:
+                    os.remove(object_path)
+    return unreferenced
+
+
+def store_usage(roots, store_dir=STORE_DIR):
+    """
+    Returns the space used by the store and the space the linked products would take without it.
+
+    Parameters:
+        roots (list): Directories holding the products that use the store.
+        store_dir (str): Store directory.
+
+    Returns:
+        dict: "objects", "bytes_stored", "links" and "bytes_linked" (uncompressed size of all the linked products).
+    """
+    store_dir = os.path.realpath(store_dir)
+    usage = {'objects': 0, 'bytes_stored': 0, 'links': 0, 'bytes_linked': 0}
+    sizes = {}
+    for root, dirs, files in os.walk(os.path.join(store_dir, 'objects')):
+        for name in files:
+            object_path = os.path.join(root, name)
+            usage['objects'] += 1
+            usage['bytes_stored'] += os.path.getsize(object_path)
+    for path in _products(roots, store_dir):
+        if os.path.islink(path):
+            target = os.path.realpath(path)
+            if target.startswith(store_dir + os.sep) and os.path.exists(target):
+                if target not in sizes:
+                    # Uncompressed size, from the gzip trailer for compressed objects
+                    with open(target, 'rb') as file:
+                        if file.read(2) == GZIP_SIGNATURE:
+                            file.seek(-4, os.SEEK_END)
+                            sizes[target] = int.from_bytes(file.read(4), 'little')
+                        else:
+                            sizes[target] = os.path.getsize(target)
+                usage['links'] += 1
+                usage['bytes_linked'] += sizes[target]
+    return usage
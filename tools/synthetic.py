@@ -0,0 +1,217 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code writes synthetic EPIC-pn timing mode event lists, so that the scripts and tools can be run and timed without the Vela X-1 ODF, the CCFs or a SAS installation (together with the local SAS stand-in of tools/sasstub.py). The events have the columns and keywords of PN_clean_evt.fits and the same time range as observation 0841890201 by default: a pulsating source with an absorbed power law spectrum and an iron line, spread over the RAWX columns around the source position, a uniform particle background with optional flares, and optional pile-up in the central columns (higher PATTERN values and summed energies). Events are generated and written in chunks, so lists of 1e8 events need little memory. It includes the following functions:
+
+source_spectrum: Photon spectrum of the synthetic source on an energy grid.
+
+synthetic_event_list: Writes a synthetic event list with the given number of events (or source rate), pulsation, flares and pile-up.
+"""
+
+import os
+
+import numpy as np
+from astropy.io import fits
+
+from tools.events import CHUNK_ROWS, FITS_BLOCK
+from tools.timeconv import MJDREF_XMM, SECONDS_PER_DAY
+
+# Default time range: the Vela X-1 observation 0841890201 (MJD)
+MJD_START = 58606.9
+MJD_STOP = 58608.25
+
+# Source: RAWX centre and PSF widths (core and wings, in columns), spin period (s)
+SOURCE_RAWX = 38
+PSF_SIGMA = 1.5
+PSF_WINGS = 6.0
+WINGS_FRACTION = 0.1
+PERIOD = 283.44
+
+# Columns of the CCD, RAWY range and PI range (eV)
+RAWX_MAX = 64
+RAWY_MAX = 200
+PI_MAX = 20479
+
+# Fractions of events per PATTERN group (singles, doubles, invalid) and FLAG values
+PATTERN_FRACTIONS = (0.65, 0.30, 0.05)
+FLAG_VALUES = (0, 0x4, 0x10000)
+FLAG_FRACTIONS = (0.97, 0.02, 0.01)
+
+# Energy grid of the spectra (eV)
+ENERGY_GRID = np.arange(200.0, 15000.0, 5.0)
+
+EVENT_DTYPE = np.dtype([('TIME', '>f8'), ('RAWX', '>i2'), ('RAWY', '>i2'), ('PI', '>i2'), ('PATTERN', 'u1'),
+                        ('FLAG', '>i4')])
+
+
+def source_spectrum(energy, photon_index=1.0, tau_1kev=1.0, line_energy=6400.0, line_sigma=50.0, line_fraction=0.02):
+    """
+    Returns the relative photon spectrum of the source: an absorbed power law (optical depth tau_1kev * E^-2.5,
+    E in keV) and a Gaussian iron line holding line_fraction of the photons.
+
+    Parameters:
+        energy (array): Energies in eV.
+    """
+    e_kev = energy / 1000.
+    continuum = e_kev ** -photon_index * np.exp(-tau_1kev * e_kev ** -2.5)
+    continuum /= continuum.sum()
+    line = np.exp(-0.5 * ((energy - line_energy) / line_sigma) ** 2)
+    return (1 - line_fraction) * continuum + line_fraction * line / line.sum()
+
+
+def _sample_energy(rng, cdf, n):
+    return ENERGY_GRID[np.minimum(np.searchsorted(cdf, rng.random(n)), len(ENERGY_GRID) - 1)]
+
+
+def _pi(rng, energy):
+    # Energy resolution of about 150 eV FWHM at 6 keV
+    sigma = 25.0 * np.sqrt(energy / 1000.) + 20.0
+    return np.clip(np.rint(energy + rng.normal(0.0, 1.0, len(energy)) * sigma), 0, PI_MAX)
+
+
+def _thinned_times(rng, t0, t1, rate_max, rate):
+    # Poisson process of rate(t) <= rate_max on [t0, t1), by thinning
+    n = rng.poisson(rate_max * (t1 - t0))
+    times = np.sort(rng.uniform(t0, t1, n))
+    return times[rng.random(n) * rate_max < rate(times)]
+
+
+def _events(rng, times, rawx, energy, pileup_mask=None):
+    events = np.empty(len(times), dtype=EVENT_DTYPE)
+    events['TIME'] = times
+    events['RAWX'] = rawx
+    events['RAWY'] = rng.integers(1, RAWY_MAX + 1, len(times))
+    group = rng.choice(3, len(times), p=PATTERN_FRACTIONS)
+    events['PATTERN'] = np.where(group == 0, 0, np.where(group == 1, rng.integers(1, 5, len(times)),
+                                                         rng.integers(5, 13, len(times))))
+    if pileup_mask is not None:
+        events['PATTERN'][pileup_mask] = rng.integers(5, 13, pileup_mask.sum())
+    events['PI'] = _pi(rng, energy)
+    events['FLAG'] = rng.choice(FLAG_VALUES, len(times), p=FLAG_FRACTIONS)
+    return events
+
+
+def _header(tstart, tstop, keywords):
+    header = fits.Header()
+    header['TELESCOP'] = ('XMM', 'Mission')
+    header['INSTRUME'] = ('EPN', 'Instrument')
+    header['DATAMODE'] = ('TIMING', 'Instrument mode')
+    header['OBS_ID'] = ('0000000000', 'Synthetic observation')
+    header['MJDREF'] = (MJDREF_XMM, '[d] Reference time of the time scale')
+    header['TIMESYS'] = ('TT', 'Time system')
+    header['TIMEUNIT'] = ('s', 'Unit of the time values')
+    header['TIMEREF'] = ('LOCAL', 'Reference frame of the times')
+    header['TSTART'] = (tstart, '[s] Start of the observation')
+    header['TSTOP'] = (tstop, '[s] End of the observation')
+    header['ONTIME04'] = (tstop - tstart, '[s] Sum of the GTIs of CCD 4')
+    header['SYNTHETI'] = (True, 'Synthetic event list (tools/synthetic.py)')
+    for key, value in keywords.items():
+        header[key] = value
+    return header
+
+
+def synthetic_event_list(filename, nevents=None, rate=300.0, tstart=None, tstop=None, period=PERIOD,
+                         pulsed_fraction=0.3, background_rate=5.0, flares=(), pileup=0.0, seed=0):
+    """
+    Writes a synthetic EPIC-pn timing mode event list (EVENTS and STDGTI04 extensions).
+
+    Parameters:
+        filename (str): Path to the event list, e.g. "<wdir>/PN_clean_evt.fits".
+        nevents (int): Approximate number of events; scales rate and background_rate (default is to use them as given).
+        rate (float): Mean source count rate in counts/s.
+        tstart, tstop (float): Time range in seconds (default is MJD_START to MJD_STOP).
+        period (float): Pulse period in seconds.
+        pulsed_fraction (float): Amplitude of the sinusoidal pulse profile, relative to the mean rate.
+        background_rate (float): Particle background rate over the whole CCD in counts/s.
+        flares (list): Background flares as (centre time from tstart in s, width in s, peak rate relative to
+                       background_rate).
+        pileup (float): Fraction of the events of the three central source columns that are piled up.
+        seed (int): Random seed.
+
+    Returns:
+        dict: "filename", "nevents", "tstart", "tstop" and "rate" (source rate).
+    """
+    rng = np.random.default_rng(seed)
+    if tstart is None:
+        tstart = (MJD_START - MJDREF_XMM) * SECONDS_PER_DAY
+    if tstop is None:
+        tstop = tstart + (MJD_STOP - MJD_START) * SECONDS_PER_DAY
+    flares = [tuple(map(float, flare)) for flare in flares]
+    if nevents is not None:
+        # Source and background rates scaled together to give about nevents events
+        flare_counts = sum(peak * width * np.sqrt(2 * np.pi) for _, width, peak in flares)
+        expected = (rate + background_rate) * (tstop - tstart) + background_rate * flare_counts
+        rate, background_rate = rate * nevents / expected, background_rate * nevents / expected
+    source_cdf = np.cumsum(source_spectrum(ENERGY_GRID))
+
+    def source_rate(times):
+        return rate * (1 + pulsed_fraction * np.sin(2 * np.pi * (times - tstart) / period))
+
+    def flare_rate(times):
+        total = np.full(len(times), background_rate)
+        for centre, width, peak in flares:
+            total += background_rate * peak * np.exp(-0.5 * ((times - tstart - centre) / width) ** 2)
+        return total
+
+    background_max = background_rate * (1 + sum(peak for _, _, peak in flares))
+    # Segments of about CHUNK_ROWS events
+    segment = max(CHUNK_ROWS / (rate * (1 + pulsed_fraction) + background_max), 1.0)
+
+    columns = [fits.Column(name='TIME', format='D', unit='s'),
+               fits.Column(name='RAWX', format='I', unit='pixel'),
+               fits.Column(name='RAWY', format='I', unit='pixel'),
+               fits.Column(name='PI', format='I', unit='eV'),
+               fits.Column(name='PATTERN', format='B'),
+               fits.Column(name='FLAG', format='J')]
+    events_hdu = fits.BinTableHDU.from_columns(columns, nrows=0, name='EVENTS',
+                                               header=_header(tstart, tstop, {'SYNPER': (period, '[s] Pulse period')}))
+    for n, (tlmin, tlmax) in {2: (1, RAWX_MAX), 3: (1, RAWY_MAX), 4: (0, PI_MAX)}.items():
+        events_hdu.header[f'TLMIN{n}'] = tlmin
+        events_hdu.header[f'TLMAX{n}'] = tlmax
+    gti_hdu = fits.BinTableHDU.from_columns([fits.Column(name='START', format='D', unit='s', array=[tstart]),
+                                             fits.Column(name='STOP', format='D', unit='s', array=[tstop])],
+                                            name='STDGTI04', header=_header(tstart, tstop, {}))
+    primary = fits.PrimaryHDU(header=_header(tstart, tstop, {}))
+
+    tmp_file = f'{filename}.tmp'
+    nrows = 0
+    with open(tmp_file, 'wb') as out:
+        primary_bytes = primary.header.tostring().encode('ascii')
+        out.write(primary_bytes)
+        header_offset = out.tell()
+        out.write(events_hdu.header.tostring().encode('ascii'))
+        for t0 in np.arange(tstart, tstop, segment):
+            t1 = min(t0 + segment, tstop)
+            src_times = _thinned_times(rng, t0, t1, rate * (1 + pulsed_fraction), source_rate)
+            core = rng.random(len(src_times)) >= WINGS_FRACTION
+            src_rawx = np.rint(rng.normal(SOURCE_RAWX, np.where(core, PSF_SIGMA, PSF_WINGS)))
+            src_energy = _sample_energy(rng, source_cdf, len(src_times))
+            piled = (np.abs(src_rawx - SOURCE_RAWX) <= 1) & (rng.random(len(src_times)) < pileup)
+            # A piled-up event carries the energy of two photons
+            src_energy[piled] += _sample_energy(rng, source_cdf, piled.sum())
+            bkg_times = _thinned_times(rng, t0, t1, background_max, flare_rate)
+            bkg_energy = rng.uniform(ENERGY_GRID[0], ENERGY_GRID[-1], len(bkg_times))
+            bkg_rawx = rng.integers(1, RAWX_MAX + 1, len(bkg_times))
+
+            events = np.concatenate([_events(rng, src_times, np.clip(src_rawx, 1, RAWX_MAX), src_energy, piled),
+                                     _events(rng, bkg_times, bkg_rawx, bkg_energy)])
+            # concatenate may return native byte order; FITS rows are big-endian
+            events = events[np.argsort(events['TIME'], kind='stable')].astype(EVENT_DTYPE, copy=False)
+            out.write(events.tobytes())
+            nrows += len(events)
+        out.write(b'\0' * (-(nrows * EVENT_DTYPE.itemsize) % FITS_BLOCK))
+        out.write(gti_hdu.header.tostring().encode('ascii'))
+        gti_data = np.array([(tstart, tstop)], dtype=[('START', '>f8'), ('STOP', '>f8')]).tobytes()
+        out.write(gti_data + b'\0' * (-len(gti_data) % FITS_BLOCK))
+
+        # The number of rows is only known at the end; the header keeps the same length
+        events_hdu.header['NAXIS2'] = nrows
+        out.seek(header_offset)
+        out.write(events_hdu.header.tostring().encode('ascii'))
+    os.replace(tmp_file, filename)
+    return {'filename': filename, 'nevents': nrows, 'tstart': tstart, 'tstop': tstop, 'rate': rate}
@@ -0,0 +1,103 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides the time conversions shared by the scripts and the plotting tools: XMM-Newton TT seconds (the TIME column), MJD and the orbital phase of Vela X-1. The reference epoch is read from the MJDREF (or MJDREFI/MJDREFF) and TIMEZERO keywords of a header when one is given. The converters work on whole numpy arrays with plain arithmetic and do not build astropy Time objects, which is only done on request by met_to_time. It includes the following functions:
+
+time_reference: Returns the (MJDREF, TIMEZERO) of a header.
+
+met_to_mjd, mjd_to_met: Convert between TT seconds and MJD.
+
+orbital_phase: Orbital phase of Vela X-1 (or of any ephemeris) at given MJDs.
+
+met_to_time: Returns an astropy Time object, for the cases that need time scales or formats.
+"""
+
+import numpy as np
+
+# XMM-Newton reference epoch (1998-01-01T00:00:00 TT)
+MJDREF_XMM = 50814.0
+SECONDS_PER_DAY = 86400.0
+
+# Orbital ephemeris of Vela X-1: T90 (MJD) and orbital period (days)
+VELA_X1_T90 = 52974.001
+VELA_X1_PORB = 8.964357
+
+
+def time_reference(header=None, mjdref=MJDREF_XMM, timezero=0.0):
+    """
+    Returns the (MJDREF, TIMEZERO) of a header, or the given defaults for missing keywords.
+    """
+    if header is not None:
+        if 'MJDREF' in header:
+            mjdref = float(header['MJDREF'])
+        elif 'MJDREFI' in header:
+            mjdref = float(header['MJDREFI']) + float(header.get('MJDREFF', 0.0))
+        timezero = float(header.get('TIMEZERO', timezero))
+    return mjdref, timezero
+
+
+def met_to_mjd(times, header=None, mjdref=MJDREF_XMM, timezero=0.0):
+    """
+    Converts TT seconds to MJD.
+
+    Parameters:
+        times (array): Times in seconds since MJDREF (e.g. the TIME column).
+        header (Header): FITS header with MJDREF and TIMEZERO (default is the XMM-Newton reference).
+        mjdref, timezero (float): Reference epoch and time offset used when there is no header.
+    """
+    mjdref, timezero = time_reference(header, mjdref, timezero)
+    mjd = np.add(times, timezero, dtype=np.float64)
+    mjd /= SECONDS_PER_DAY
+    mjd += mjdref
+    return mjd
+
+
+def mjd_to_met(mjd, header=None, mjdref=MJDREF_XMM, timezero=0.0):
+    """
+    Converts MJD to TT seconds since MJDREF (the inverse of met_to_mjd).
+    """
+    mjdref, timezero = time_reference(header, mjdref, timezero)
+    times = np.subtract(mjd, mjdref, dtype=np.float64)
+    times *= SECONDS_PER_DAY
+    times -= timezero
+    return times
+
+
+def orbital_phase(mjd, t0=VELA_X1_T90, period=VELA_X1_PORB):
+    """
+    Returns the orbital phase (in [0, 1)) at the given MJDs.
+
+    Parameters:
+        mjd (array): Times in MJD.
+        t0 (float): Epoch of phase zero in MJD (default is T90 of Vela X-1).
+        period (float): Orbital period in days (default is Vela X-1).
+    """
+    phase = np.subtract(mjd, t0, dtype=np.float64)
+    phase /= period
+    np.mod(phase, 1.0, out=phase)
+    return phase
+
+
+def met_to_time(times, header=None, mjdref=MJDREF_XMM, timezero=0.0, scale=None):
+    """
+    Returns an astropy Time object for TT seconds, keeping the full precision of the reference epoch.
+
+    Parameters:
+        times (array): Times in seconds since MJDREF.
+        header (Header): FITS header with MJDREF, TIMEZERO and TIMESYS.
+        mjdref, timezero (float): Reference epoch and time offset used when there is no header.
+        scale (str): Time scale (default is TIMESYS of the header, or "tt").
+    """
+    from astropy.time import Time
+
+    mjdref, timezero = time_reference(header, mjdref, timezero)
+    if scale is None:
+        scale = str(header.get('TIMESYS', 'TT')).lower() if header is not None else 'tt'
+    days = np.add(times, timezero, dtype=np.float64)
+    days /= SECONDS_PER_DAY
+    return Time(mjdref, days, format='mjd', scale=scale)
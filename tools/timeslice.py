@@ -0,0 +1,166 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides adaptive time slicing of an observation. Instead of cutting fixed 283.44 s windows regardless of the flux, the slices are cut so that each of them reaches a target number of source counts (or signal-to-noise ratio), so that flares are not split into more spectra than needed and dips still collect enough counts for specgroup. It includes the following functions:
+
+adaptive_slices: Walks the cumulative source counts and cuts a new slice every time the target is reached.
+
+bayesian_block_slices: Segments the binned light curve into Bayesian Blocks and merges consecutive blocks until each one reaches the target.
+
+adaptive_gtis: Runs either method on the source events of an event list and writes one GTI file per slice, named as the files of gtiloop.py.
+"""
+
+import os
+import numpy as np
+
+from tools.events import load_event_columns, quality_columns, read_event_header, select_events
+from tools.ogip import write_gti
+from tools.phasespec import SOURCE_RAWX
+
+
+def _target(target_counts, target_snr):
+    # Without background the S/N of N counts is sqrt(N)
+    if target_counts is None and target_snr is None:
+        raise ValueError("Either target_counts or target_snr must be given.")
+    if target_counts is None:
+        # A non-positive target would never move the slice edge forward
+        if target_snr <= 0:
+            raise ValueError(f"target_snr must be positive, got {target_snr}.")
+        target_counts = int(np.ceil(target_snr**2))
+    if target_counts < 1:
+        raise ValueError(f"target_counts must be at least 1, got {target_counts}.")
+    return int(target_counts)
+
+
+def adaptive_slices(times, tstart, tstop, target_counts=None, target_snr=None, max_length=None):
+    """
+    Cuts [tstart, tstop] into slices that each contain target_counts events.
+
+    Parameters:
+        times (array): Sorted event times in seconds.
+        tstart, tstop (float): Time range to slice.
+        target_counts (int): Number of counts per slice.
+        target_snr (float): Signal-to-noise ratio per slice, used when target_counts is not given.
+        max_length (float): Maximum length of a slice in seconds (default is no limit).
+
+    Returns:
+        tuple: (start, stop) numpy arrays of the slices. A last slice short of the target is merged
+               into the previous one (unless that exceeds max_length).
+    """
+    target_counts = _target(target_counts, target_snr)
+    if max_length is not None and max_length <= 0:
+        raise ValueError(f"max_length must be positive, got {max_length}.")
+    times = np.asarray(times, dtype=np.float64)
+    times = times[(times >= tstart) & (times < tstop)]
+    edges = [float(tstart)]
+    start = 0    # Index of the first event of the current slice
+    while True:
+        # The event that completes the target opens the next slice. Events with the same (quantised) time
+        # stay in one slice, so the edge is the first time after the current edge, which always moves forward.
+        index = max(start + target_counts, np.searchsorted(times, edges[-1], side='right'))
+        edge = times[index] if index < len(times) else np.inf
+        if max_length is not None:
+            edge = min(edge, edges[-1] + max_length)
+        if edge >= tstop:
+            break
+        edges.append(float(edge))
+        start = np.searchsorted(times, edge, side='left')
+    edges.append(float(tstop))
+
+    if len(edges) > 2:
+        last_counts = len(times) - np.searchsorted(times, edges[-2], side='left')
+        merged_length = edges[-1] - edges[-3]
+        if last_counts < target_counts and (max_length is None or merged_length <= max_length):
+            del edges[-2]
+    edges = np.array(edges)
+    return edges[:-1], edges[1:]
+
+
+def bayesian_block_slices(times, tstart, tstop, binsize=10.0, target_counts=None, target_snr=None, p0=0.05):
+    """
+    Segments the binned light curve into Bayesian Blocks, merged until each slice reaches the target.
+
+    Parameters:
+        times (array): Sorted event times in seconds.
+        tstart, tstop (float): Time range to slice.
+        binsize (float): Bin size of the light curve in seconds.
+        target_counts (int): Minimum number of counts per slice (default is no merging).
+        target_snr (float): Minimum signal-to-noise ratio per slice, used when target_counts is not given.
+        p0 (float): False alarm probability of a change point.
+
+    Returns:
+        tuple: (start, stop) numpy arrays of the slices.
+    """
+    from astropy.stats import bayesian_blocks
+
+    times = np.asarray(times, dtype=np.float64)
+    bin_edges = np.append(np.arange(tstart, tstop, binsize), tstop)
+    counts, _ = np.histogram(times, bins=bin_edges)
+    centres = 0.5 * (bin_edges[1:] + bin_edges[:-1])
+    edges = bayesian_blocks(centres, counts, fitness='events', p0=p0)
+    edges[0], edges[-1] = tstart, tstop
+
+    if target_counts is not None or target_snr is not None:
+        target_counts = _target(target_counts, target_snr)
+        cumulative = np.searchsorted(times, edges, side='left')
+        kept = [0]
+        for i in range(1, len(edges)):
+            if cumulative[i] - cumulative[kept[-1]] >= target_counts:
+                kept.append(i)
+        # The remainder is merged into the last slice
+        if kept[-1] != len(edges) - 1:
+            if len(kept) > 1:
+                kept[-1] = len(edges) - 1
+            else:
+                kept.append(len(edges) - 1)
+        edges = edges[kept]
+    return edges[:-1], edges[1:]
+
+
+def adaptive_gtis(table, gti_dir, method='counts', target_counts=None, target_snr=None, rawx_ranges=SOURCE_RAWX,
+                  pattern_max=4, flag_zero=True, pi_range=None, **kwargs):
+    """
+    Writes one GTI file per adaptive slice of the source events of an event list.
+
+    Parameters:
+        table (str): Path to the event list (e.g. PN_clean_evt.fits).
+        gti_dir (str): Output directory; files are named "gti_<start>_<stop>.fits" as in gtiloop.py.
+        method (str): "counts" (adaptive_slices) or "bblocks" (bayesian_block_slices).
+        target_counts (int): Number of source counts per slice.
+        target_snr (float): Signal-to-noise ratio per slice, used when target_counts is not given.
+        rawx_ranges (list): Inclusive RAWX ranges of the source region.
+        pattern_max (int): Maximum PATTERN.
+        flag_zero (bool): Whether to require FLAG==0.
+        pi_range (tuple): Inclusive PI range in eV (default is no cut).
+        **kwargs: Passed to the slicing function (max_length, or binsize and p0).
+
+    Returns:
+        list: Paths of the GTI files, in time order.
+    """
+    header = read_event_header(table)
+    cols = load_event_columns(table, ['TIME', 'PI', 'RAWX'] + quality_columns(pattern_max, flag_zero))
+    mask = select_events(cols, rawx_ranges=rawx_ranges, pattern_max=pattern_max, flag_zero=flag_zero,
+                         pi_range=pi_range)
+    times = np.sort(cols['TIME'][mask])
+    if method == 'counts':
+        start, stop = adaptive_slices(times, header['TSTART'], header['TSTOP'], target_counts=target_counts,
+                                      target_snr=target_snr, **kwargs)
+    elif method == 'bblocks':
+        start, stop = bayesian_block_slices(times, header['TSTART'], header['TSTOP'], target_counts=target_counts,
+                                            target_snr=target_snr, **kwargs)
+    else:
+        raise ValueError(f"Unknown method '{method}'. Expected 'counts' or 'bblocks'.")
+
+    os.makedirs(gti_dir, exist_ok=True)
+    keywords = {key: header[key] for key in ('MJDREF', 'TIMESYS', 'TIMEREF', 'TIMEUNIT') if key in header}
+    gti_files = []
+    for t_start, t_stop in zip(start, stop):
+        gti_file = os.path.join(gti_dir, f"gti_{t_start:.3f}_{t_stop:.3f}.fits")
+        write_gti(gti_file, [t_start], [t_stop], header=keywords)
+        gti_files.append(gti_file)
+    return gti_files
@@ -0,0 +1,240 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides a pulsation search for barycentred event times, used to measure the spin period of Vela X-1 (about 283 s) for each observation instead of hard-coding it. It includes the following functions:
+
+z2n_power, htest_power, epoch_folding_power: Periodogram statistics (Z^2_n, H-test and epoch folding chi^2) evaluated for a block of trial frequencies at once.
+
+period_search: Splits the trial frequencies into blocks and evaluates them across a process pool. Memory-mapped event times (see tools/events.py) are re-opened by every worker instead of being copied to it. Returns the periodogram and the best period with its uncertainty.
+
+search_event_file: Runs period_search on the TIME column of an event list.
+
+fold_phase, pulse_cycles: Fold event times with a (t0, period, pdot) ephemeris.
+"""
+
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from tools.events import attach_event_columns, load_event_columns, read_event_header, share_columns
+
+METHODS = ('z2', 'htest', 'ef')
+
+# Number of events folded at a time, keeps the (frequencies x events) work array small
+EVENT_CHUNK = 1 << 15
+
+
+def fold_phase(times, t0, period, pdot=0.0):
+    """
+    Returns the phase in [0, 1) of each time for the ephemeris (t0, period, pdot).
+
+    Parameters:
+        times (array): Event times (same time system as t0).
+        t0 (float): Reference epoch of phase zero.
+        period (float): Period at t0 (same units as times).
+        pdot (float): First period derivative.
+    """
+    cycles = pulse_cycles(times, t0, period, pdot)
+    return cycles - np.floor(cycles)
+
+
+def pulse_cycles(times, t0, period, pdot=0.0):
+    """
+    Returns the (unwrapped) number of cycles elapsed since t0 for the ephemeris (t0, period, pdot).
+    """
+    dt = np.asarray(times, dtype=np.float64) - t0
+    nu = 1.0 / period
+    nudot = -pdot / period**2
+    return dt * (nu + 0.5 * nudot * dt)
+
+
+def _cycles(times, frequencies, t0, start, stop):
+    # Fractional number of cycles (frequencies x events) for a chunk of events
+    dt = np.asarray(times[start:stop], dtype=np.float64) - t0
+    cycles = np.multiply.outer(frequencies, dt)
+    cycles -= np.floor(cycles)
+    return cycles
+
+
+def _harmonic_sums(times, frequencies, nharm, t0):
+    # Sum over events of exp(i k phi) for k = 1..nharm, shape (frequencies, nharm)
+    sums = np.zeros((len(frequencies), nharm), dtype=np.complex128)
+    for start in range(0, len(times), EVENT_CHUNK):
+        z = np.exp(2j * np.pi * _cycles(times, frequencies, t0, start, start + EVENT_CHUNK))
+        zk = z.copy()
+        for k in range(nharm):
+            sums[:, k] += zk.sum(axis=1)
+            if k + 1 < nharm:
+                zk *= z
+    return sums
+
+
+def z2n_power(times, frequencies, nharm=2, t0=None):
+    """
+    Returns the Z^2_n statistic for each trial frequency.
+
+    Parameters:
+        times (array): Event times in seconds.
+        frequencies (array): Trial frequencies in Hz.
+        nharm (int): Number of harmonics.
+        t0 (float): Reference time (default is the first event).
+    """
+    frequencies = np.atleast_1d(np.asarray(frequencies, dtype=np.float64))
+    t0 = times[0] if t0 is None else t0
+    sums = _harmonic_sums(times, frequencies, nharm, t0)
+    return 2.0 / len(times) * np.sum(np.abs(sums)**2, axis=1)
+
+
+def htest_power(times, frequencies, nharm=20, t0=None):
+    """
+    Returns the H-test statistic (de Jager et al. 1989), max over m of Z^2_m - 4m + 4.
+
+    Parameters:
+        times (array): Event times in seconds.
+        frequencies (array): Trial frequencies in Hz.
+        nharm (int): Maximum number of harmonics (default is 20).
+        t0 (float): Reference time (default is the first event).
+    """
+    frequencies = np.atleast_1d(np.asarray(frequencies, dtype=np.float64))
+    t0 = times[0] if t0 is None else t0
+    sums = _harmonic_sums(times, frequencies, nharm, t0)
+    z2m = 2.0 / len(times) * np.cumsum(np.abs(sums)**2, axis=1)
+    m = np.arange(1, nharm + 1)
+    return np.max(z2m - 4 * m + 4, axis=1)
+
+
+def epoch_folding_power(times, frequencies, nbins=16, t0=None):
+    """
+    Returns the epoch folding chi^2 of the folded profile for each trial frequency.
+
+    Parameters:
+        times (array): Event times in seconds.
+        frequencies (array): Trial frequencies in Hz.
+        nbins (int): Number of phase bins of the folded profile.
+        t0 (float): Reference time (default is the first event).
+    """
+    frequencies = np.atleast_1d(np.asarray(frequencies, dtype=np.float64))
+    t0 = times[0] if t0 is None else t0
+    nfreq = len(frequencies)
+    profiles = np.zeros(nfreq * nbins, dtype=np.int64)
+    offsets = (np.arange(nfreq) * nbins)[:, None]
+    for start in range(0, len(times), EVENT_CHUNK):
+        bins = (_cycles(times, frequencies, t0, start, start + EVENT_CHUNK) * nbins).astype(np.int64)
+        np.minimum(bins, nbins - 1, out=bins)
+        # One bincount folds all trial frequencies of the block
+        profiles += np.bincount((bins + offsets).ravel(), minlength=nfreq * nbins)
+    profiles = profiles.reshape(nfreq, nbins)
+    expected = len(times) / nbins
+    return np.sum((profiles - expected)**2, axis=1) / expected
+
+
+_worker_times = None
+
+
+def _init_worker(times):
+    # Workers re-open memory-mapped event times, or attach the shared memory block, instead of
+    # receiving a pickled copy
+    global _worker_times
+    if isinstance(times, tuple):
+        filename, dtype, shape, offset = times
+        times = np.memmap(filename, dtype=dtype, mode='r', shape=shape, offset=offset)
+    elif isinstance(times, dict):
+        times = attach_event_columns(times)['TIME']
+    _worker_times = times
+
+
+def _power_block(args):
+    frequencies, method, nharm, nbins, t0 = args
+    if method == 'z2':
+        return z2n_power(_worker_times, frequencies, nharm=nharm, t0=t0)
+    if method == 'htest':
+        return htest_power(_worker_times, frequencies, nharm=nharm, t0=t0)
+    return epoch_folding_power(_worker_times, frequencies, nbins=nbins, t0=t0)
+
+
+@contextmanager
+def _shareable(times):
+    if isinstance(times, np.memmap) and times.filename is not None:
+        yield (times.filename, times.dtype, times.shape, times.offset)
+    else:
+        with share_columns({'TIME': times}) as descriptor:
+            yield descriptor
+
+
+def period_search(times, frequencies, method='z2', nharm=None, nbins=16, nproc=None, block_size=64):
+    """
+    Evaluates a periodogram over the trial frequencies and returns the best period.
+
+    Parameters:
+        times (array): Barycentred event times in seconds (may be a numpy.memmap).
+        frequencies (array): Trial frequencies in Hz.
+        method (str): "z2" (Z^2_n), "htest" (H-test) or "ef" (epoch folding).
+        nharm (int): Number of harmonics (default 2 for "z2", 20 for "htest").
+        nbins (int): Number of phase bins for "ef".
+        nproc (int): Number of worker processes (default is os.cpu_count(), 1 runs in-process).
+        block_size (int): Number of trial frequencies evaluated per task.
+
+    Returns:
+        dict: "frequency", "power", "best_frequency", "frequency_error", "best_period",
+              "period_error", "method" and "nevents".
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method '{method}'. Expected one of {METHODS}.")
+    if nharm is None:
+        nharm = 20 if method == 'htest' else 2
+    frequencies = np.asarray(frequencies, dtype=np.float64)
+    t0 = float(times[0])
+    blocks = [frequencies[i:i + block_size] for i in range(0, len(frequencies), block_size)]
+    tasks = [(block, method, nharm, nbins, t0) for block in blocks]
+
+    nproc = os.cpu_count() if nproc is None else nproc
+    if nproc > 1 and len(blocks) > 1:
+        with _shareable(times) as shared, ProcessPoolExecutor(max_workers=min(nproc, len(blocks)),
+                                                              initializer=_init_worker,
+                                                              initargs=(shared,)) as pool:
+            power = np.concatenate(list(pool.map(_power_block, tasks)))
+    else:
+        _init_worker(times)
+        power = np.concatenate([_power_block(task) for task in tasks])
+
+    # Refine the peak with a parabola through the three highest neighbouring trials
+    ipeak = int(np.argmax(power))
+    best = frequencies[ipeak]
+    if 0 < ipeak < len(power) - 1:
+        y0, y1, y2 = power[ipeak - 1:ipeak + 2]
+        denom = y0 - 2 * y1 + y2
+        if denom < 0:
+            best += 0.5 * (y0 - y2) / denom * (frequencies[ipeak + 1] - frequencies[ipeak])
+
+    # Frequency uncertainty from the fundamental power at the peak (Ransom et al. 2002)
+    span = float(times[-1]) - t0
+    z2 = z2n_power(times, [best], nharm=1, t0=t0)[0]
+    frequency_error = np.sqrt(3.0) / (np.pi * span * np.sqrt(z2)) if z2 > 0 else np.inf
+
+    return {'frequency': frequencies, 'power': power, 'best_frequency': best,
+            'frequency_error': frequency_error, 'best_period': 1.0 / best,
+            'period_error': frequency_error / best**2, 'method': method, 'nevents': len(times)}
+
+
+def search_event_file(table, pmin, pmax, oversample=5, **kwargs):
+    """
+    Runs period_search on the TIME column of an event list between two trial periods.
+
+    Parameters:
+        table (str): Path to the barycentred event list (e.g. PN_clean_evt.fits).
+        pmin, pmax (float): Range of trial periods in seconds.
+        oversample (int): Number of trials per independent Fourier spacing 1/T.
+        **kwargs: Passed to period_search (method, nharm, nbins, nproc, block_size).
+    """
+    times = load_event_columns(table, ['TIME'])['TIME']
+    header = read_event_header(table)
+    span = header.get('TSTOP', times[-1]) - header.get('TSTART', times[0])
+    df = 1.0 / (oversample * span)
+    frequencies = np.arange(1.0 / pmax, 1.0 / pmin + df, df)
+    return period_search(times, frequencies, **kwargs)
@@ -0,0 +1,243 @@
+#   Copyright (c) European Space Agency, 2025.
+#
+#   This file is subject to the terms and conditions defined in file 'LICENCE.txt', which
+#   is part of this source code package. No part of the package, including
+#   this file, may be copied, modified, propagated, or distributed except according to
+#   the terms contained in the file ‘LICENCE.txt’.
+
+"""
+This code provides batch fitting of time-resolved spectra with pyXSPEC. XSPEC keeps its data and models in a single global session (AllData, AllModels), so the grouped spectra are spread across worker processes, each one running its own XSPEC session. It includes the following functions:
+
+fit_spectrum: Loads one grouped spectrum, applies the model definition, fits it and returns the best-fit parameters, their errors and the fit statistic.
+
+fit_spectra: Runs fit_spectrum for a list of grouped spectra across a process pool and collects the results into one astropy Table.
+
+fit_chain: Warm-started sequential fits. The spectra are ordered by time and every slice is initialised from the best fit of the previous (successful) slice instead of the model defaults. Long lists are cut into contiguous chains that run in parallel.
+"""
+
+import os
+import re
+import time
+import tempfile
+import multiprocessing
+import numpy as np
+from astropy.io import fits
+from concurrent.futures import ProcessPoolExecutor
+
+# Default energy range used in the notebook plots (keV)
+IGNORE = "**-0.5 10.0-**"
+
+
+def _init_xspec(chatter=0):
+    # Each worker process owns one XSPEC session, kept quiet
+    from xspec import Xset
+    Xset.chatter = chatter
+    Xset.logChatter = chatter
+
+
+def _count_iterations(log_text):
+    # Rows of the XSPEC fit table ("Chi-Squared  |beta|/N  Lvl  1:nH ...") are one per iteration
+    count = 0
+    in_table = False
+    for line in log_text.splitlines():
+        if '|beta|/N' in line:
+            in_table = True
+        elif in_table:
+            tokens = line.split()
+            if tokens and re.match(r'^[-+]?[0-9.]+(e[-+]?[0-9]+)?$', tokens[0], re.IGNORECASE):
+                count += 1
+            elif line.strip().startswith('==='):
+                in_table = False
+    return count
+
+
+def _fit(spectrum, model, params=None, ignore=IGNORE, statistic='chi', niterations=100, error_delta=2.706):
+    # Returns the result row and the best-fit values by parameter index (None if the fit failed)
+    from xspec import AllData, AllModels, Fit, Model, Spectrum, Xset
+
+    AllData.clear()
+    AllModels.clear()
+    row = {'SPECTRUM': os.path.basename(spectrum)}
+    values = None
+    log_fd, log_file = tempfile.mkstemp(suffix='.log')
+    os.close(log_fd)
+    try:
+        s = Spectrum(spectrum)
+        s.ignore(ignore)
+        AllData.ignore("bad")
+        m = Model(model)
+        if params:
+            m.setPars(params)
+        Fit.statMethod = statistic
+        Fit.nIterations = niterations
+        Fit.query = "yes"
+        # The fit log is the only place where XSPEC reports the number of iterations
+        Xset.openLog(log_file)
+        chatter = Xset.logChatter
+        Xset.logChatter = 10
+        # Wall time of the fit only, without loading the spectrum and its responses
+        start = time.perf_counter()
+        try:
+            Fit.perform()
+        finally:
+            Xset.logChatter = chatter
+            Xset.closeLog()
+        row['TIME_S'] = time.perf_counter() - start
+        with open(log_file, 'r') as file:
+            row['NITER'] = _count_iterations(file.read())
+        Fit.error(f"maximum 10.0 {error_delta} 1-{m.nParameters}")
+        row['STATISTIC'] = Fit.statistic
+        row['DOF'] = Fit.dof
+        row['STATUS'] = 'ok'
+        for comp in m.componentNames:
+            component = getattr(m, comp)
+            for par in component.parameterNames:
+                p = getattr(component, par)
+                row[f'{comp}_{par}'] = p.values[0]
+                row[f'{comp}_{par}_lo'] = p.error[0] if not p.frozen else np.nan
+                row[f'{comp}_{par}_hi'] = p.error[1] if not p.frozen else np.nan
+        values = {i: m(i).values[0] for i in range(1, m.nParameters + 1)}
+    except Exception as e:
+        row['STATUS'] = f'failed: {e}'
+    finally:
+        os.remove(log_file)
+    return row, values
+
+
+def fit_spectrum(spectrum, model, params=None, ignore=IGNORE, statistic='chi', niterations=100,
+                 error_delta=2.706):
+    """
+    Fits one grouped spectrum in the XSPEC session of the current process.
+
+    Parameters:
+        spectrum (str): Path to the grouped spectrum (from specgroup).
+        model (str): XSPEC model expression, e.g. "phabs*(powerlaw+gaussian)".
+        params (dict): Initial parameter values passed to Model.setPars, e.g. {1: 1.0, 2: 1.2}.
+        ignore (str): Channels to ignore, in XSPEC syntax (default is outside 0.5-10 keV).
+        statistic (str): Fit statistic ("chi" or "cstat").
+        niterations (int): Maximum number of fit iterations.
+        error_delta (float): Delta statistic of the parameter errors (2.706 for 90% confidence).
+
+    Returns:
+        dict: "SPECTRUM", "STATISTIC", "DOF", "STATUS", "NITER" (fit iterations), "TIME_S" (fit
+              wall time) and, for every parameter "comp_par", the best-fit value and its
+              lower/upper error bounds ("comp_par_lo", "comp_par_hi").
+    """
+    return _fit(spectrum, model, params=params, ignore=ignore, statistic=statistic,
+                niterations=niterations, error_delta=error_delta)[0]
+
+
+def _fit_task(args):
+    spectrum, kwargs = args
+    return fit_spectrum(spectrum, **kwargs)
+
+
+def rows_to_table(rows):
+    """
+    Collects fit result rows (dicts) into one astropy Table. Failed fits have no parameter
+    columns; they are filled with NaN.
+    """
+    from astropy.table import Table
+
+    names = []
+    for row in rows:
+        for name in row:
+            if name not in names:
+                names.append(name)
+    columns = {name: [row.get(name, np.nan) for row in rows] for name in names}
+    return Table(columns, names=names)
+
+
+def fit_spectra(spectra, model, params=None, nproc=None, **kwargs):
+    """
+    Fits a list of grouped spectra with the same model across a process pool.
+
+    Parameters:
+        spectra (list): Paths to the grouped spectra.
+        model (str): XSPEC model expression.
+        params (dict): Initial parameter values passed to Model.setPars.
+        nproc (int): Number of worker processes (default is os.cpu_count(), 1 runs in-process).
+        **kwargs: Passed to fit_spectrum (ignore, statistic, niterations, error_delta).
+
+    Returns:
+        astropy.table.Table: One row per spectrum, in the order of the input list.
+    """
+    kwargs = dict(kwargs, model=model, params=params)
+    tasks = [(spectrum, kwargs) for spectrum in spectra]
+    nproc = os.cpu_count() if nproc is None else nproc
+    if nproc > 1 and len(tasks) > 1:
+        # Spawn fresh interpreters so that no worker inherits the XSPEC state of the parent
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=min(nproc, len(tasks)), mp_context=context,
+                                 initializer=_init_xspec) as pool:
+            rows = list(pool.map(_fit_task, tasks))
+    else:
+        rows = [_fit_task(task) for task in tasks]
+    return rows_to_table(rows)
+
+
+def spectrum_start_time(spectrum):
+    """
+    Returns the start time of a spectrum, from the GTI window in the file name (e.g.
+    "PN_spectrum_grp_gti_673310879.000_673311162.440.fits") or from the TSTART keyword of the
+    SPECTRUM extension, or None.
+    """
+    match = re.search(r'gti_([0-9.]+)_([0-9.]+)', os.path.basename(spectrum))
+    if match:
+        return float(match.group(1))
+    with fits.open(spectrum) as hdul:
+        if 'SPECTRUM' in hdul and 'TSTART' in hdul['SPECTRUM'].header:
+            return float(hdul['SPECTRUM'].header['TSTART'])
+    return None
+
+
+def _chain_task(args):
+    spectra, kwargs = args
+    params = kwargs.pop('params')
+    rows = []
+    start_values = params
+    for spectrum in spectra:
+        row, values = _fit(spectrum, params=start_values, **kwargs)
+        row['SEED'] = 'previous' if start_values is not params else 'initial'
+        rows.append(row)
+        # Seed the next slice from the last successful fit
+        if values is not None:
+            start_values = values
+    return rows
+
+
+def fit_chain(spectra, model, params=None, nchains=1, **kwargs):
+    """
+    Warm-started sequential fits: every slice is initialised from the best fit of its predecessor.
+
+    Parameters:
+        spectra (list): Paths to the grouped spectra (they are ordered by start time).
+        model (str): XSPEC model expression.
+        params (dict): Initial parameter values of the first slice of every chain.
+        nchains (int): Number of contiguous chains fitted in parallel processes (default is 1).
+        **kwargs: Passed to fit_spectrum (ignore, statistic, niterations, error_delta).
+
+    Returns:
+        astropy.table.Table: One row per spectrum in time order, including "TSTART", the number of
+                             fit iterations "NITER", the fit wall time "TIME_S" and the "SEED" used.
+    """
+    if not spectra:
+        return rows_to_table([])
+    times = [spectrum_start_time(spectrum) for spectrum in spectra]
+    order = sorted(range(len(spectra)), key=lambda i: (times[i] is None, times[i] or 0.0, i))
+    spectra = [spectra[i] for i in order]
+    times = [times[i] for i in order]
+
+    kwargs = dict(kwargs, model=model, params=params)
+    nchains = max(1, min(nchains, len(spectra)))
+    bounds = np.linspace(0, len(spectra), nchains + 1).astype(int)
+    tasks = [(spectra[a:b], dict(kwargs)) for a, b in zip(bounds[:-1], bounds[1:])]
+    if nchains > 1:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=nchains, mp_context=context, initializer=_init_xspec) as pool:
+            rows = [row for chain in pool.map(_chain_task, tasks) for row in chain]
+    else:
+        rows = _chain_task(tasks[0])
+    for row, tstart in zip(rows, times):
+        row['TSTART'] = np.nan if tstart is None else tstart
+    return rows_to_table(rows)
@@ -18,34 +18,135 @@
 # Furthermore, the U.S. government neither controls nor guarantees the accuracy, relevance, timeliness, or completeness of the information contained in non-government website links.
 
 
+"""
+The plot arrays of every spectrum (energies, rates and their errors) are extracted from XSPEC once per
+(grouped spectrum file, plot settings) and cached as a small .npz file. The cache key is made of the
+checksums of the grouped file and of the background, RMF and ARF files referenced in its header, the
+noticed channels and the plot settings (including the plot rebinning). Re-styling a figure, or plotting
+spectra that are already cached, does not need a live XSPEC session.
+
+XSPEC and Matplotlib are only imported when a plot array has to be generated or a figure drawn.
+"""
+
 import os.path
 from os import path
-import subprocess
+import hashlib
 import numpy as np
-import matplotlib.pyplot as plt
-from astropy.io import fits
-from astropy.table import Table
-from matplotlib.colors import LogNorm
-from matplotlib.ticker import ScalarFormatter  # For formatting axis labels
-from xspec import *
+
+# Default location of the plot array cache
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'xspecplot')
+
+
+def file_checksum(filename, blocksize=1 << 20):
+    """
+    Returns the SHA-256 checksum of a file.
+    """
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(blocksize), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _ancillary_checksums(filename):
+    # Checksums of the background, RMF and ARF files referenced in the spectrum header
+    from astropy.io import fits
+
+    header = fits.getheader(filename, 'SPECTRUM')
+    checksums = []
+    for keyword in ('BACKFILE', 'RESPFILE', 'ANCRFILE'):
+        name = str(header.get(keyword, 'none')).strip()
+        if name.lower() in ('', 'none'):
+            checksums.append(f'{keyword}=none')
+            continue
+        name = os.path.join(os.path.dirname(os.path.abspath(filename)), name)
+        checksums.append(f'{keyword}={file_checksum(name) if os.path.exists(name) else "missing"}')
+    return '|'.join(checksums)
+
+
+def extract_plot_arrays(spectrum, xAxis="keV", xLog=True, yLog=True, plot="data", rebin=None, ignore=None,
+                        cache_dir=CACHE_DIR):
+    """
+    Returns the XSPEC plot arrays of a grouped spectrum, from the cache when available.
+
+    Parameters:
+        spectrum (str or xspec.Spectrum): Grouped spectrum file, or a spectrum loaded in XSPEC.
+        xAxis (str): X-axis units (default is "keV").
+        xLog (bool): Whether to use logarithmic scale for X-axis.
+        yLog (bool): Whether to use logarithmic scale for Y-axis.
+        plot (str): XSPEC plot command (default is "data").
+        rebin (tuple): Plot rebinning (minimum significance, maximum number of bins), passed to
+                       Plot.setRebin on a cache miss (default leaves the rebinning of the session alone;
+                       pass the rebinning set in the session so that the cache key covers it).
+        ignore (str): Channels to ignore when the spectrum is loaded from a file, e.g. "**-0.5 10.0-**"
+                      (a loaded spectrum keeps its own noticed channels).
+        cache_dir (str): Cache directory (None disables the cache).
+
+    Returns:
+        dict: "x", "xerr", "y", "yerr" (numpy arrays) and "labels" (list of the axis labels).
+    """
+    if isinstance(spectrum, str):
+        filename, index, noticed = spectrum, None, f'ignore={ignore}'
+    else:
+        filename, index, noticed = spectrum.fileName, spectrum.index, f'noticed={list(spectrum.noticed)}'
+
+    cache_file = None
+    if cache_dir is not None:
+        settings = f'{plot}|{xAxis}|{xLog}|{yLog}|rebin={None if rebin is None else tuple(rebin)}|{noticed}'
+        key = hashlib.sha256('|'.join([file_checksum(filename), _ancillary_checksums(filename),
+                                       settings]).encode()).hexdigest()
+        cache_file = os.path.join(cache_dir, f'{key}.npz')
+        if os.path.exists(cache_file):
+            with np.load(cache_file) as cached:
+                return {'x': cached['x'], 'xerr': cached['xerr'], 'y': cached['y'], 'yerr': cached['yerr'],
+                        'labels': [str(label) for label in cached['labels']]}
+
+    # Cache miss: generate the plot data with XSPEC
+    from xspec import AllData, Plot, Spectrum
+
+    loaded = None
+    if index is None:
+        loaded = Spectrum(filename)   # Load the spectrum temporarily into the current session
+        index = loaded.index
+        if ignore:
+            loaded.ignore(ignore)
+    try:
+        Plot.device = "/null"    # Disable XSPEC native plot output
+        Plot.xAxis = xAxis       # Set X axis to energy units
+        Plot.xLog = xLog         # Logarithmic X-axis
+        Plot.yLog = yLog         # Logarithmic Y-axis
+        if rebin is not None:
+            Plot.setRebin(*rebin)    # Only when asked for, XSPEC has no way to read the previous setting
+        Plot(plot)
+        arrays = {'x': np.array(Plot.x(index)), 'xerr': np.array(Plot.xErr(index)),
+                  'y': np.array(Plot.y(index)), 'yerr': np.array(Plot.yErr(index)),
+                  'labels': list(Plot.labels())}
+    finally:
+        if loaded is not None:
+            AllData -= index
+
+    if cache_file is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_file = cache_file + '.tmp.npz'
+        np.savez(tmp_file, x=arrays['x'], xerr=arrays['xerr'], y=arrays['y'], yerr=arrays['yerr'],
+                 labels=np.array(arrays['labels']))
+        os.replace(tmp_file, cache_file)
+    return arrays
 
 
-def xspecplot(data, xAxis="keV", xLog=True, yLog=True, figname="multiple-spectra.png"):
+def xspecplot(data, xAxis="keV", xLog=True, yLog=True, figname="multiple-spectra.png", cache_dir=CACHE_DIR):
     """
     Plots spectra using XSPEC and Matplotlib, stacked vertically.
     
     Parameters:
-        data (list): List of XSPEC data objects. Indices must start from 1.
+        data (list): List of XSPEC data objects, or of grouped spectrum files.
         xAxis (str): X-axis units (default is "keV").
         xLog (bool): Whether to use logarithmic scale for X-axis.
         yLog (bool): Whether to use logarithmic scale for Y-axis.
-        title (str): Title for the entire figure.
+        figname (str): Name of the output figure.
+        cache_dir (str): Cache of the XSPEC plot arrays (None always regenerates them).
     """
-    Plot.device = "/null"    # Disable XSPEC native plot output
-    Plot.xAxis = xAxis       # Set X axis to energy units
-    Plot.xLog = xLog         # Logarithmic X-axis
-    Plot.yLog = yLog         # Logarithmic Y-axis
-    Plot("data")             # Generate XSPEC plots for source/background spectra
+    import matplotlib.pyplot as plt
 
     num_plots = len(data)    # Number of plots
     fig, axes = plt.subplots(num_plots, 1, figsize=(8, 4 * num_plots), sharex=True)
@@ -54,13 +155,15 @@ def xspecplot(data, xAxis="keV", xLog=True, yLog=True, figname="multiple-spectra
     if num_plots == 1:
         axes = [axes]
 
+    labels = None
     for i, (dataset, ax) in enumerate(zip(data, axes), start=1):  # Start enumeration from 1
         try:
-            energies = Plot.x(i)    # X-axis values (index starts from 1)
-            edeltas = Plot.xErr(i)  # X-axis error values
-            rates = Plot.y(i)       # Y-axis values
-            errors = Plot.yErr(i)   # Y-axis error values
-            labels = Plot.labels()
+            arrays = extract_plot_arrays(dataset, xAxis=xAxis, xLog=xLog, yLog=yLog, cache_dir=cache_dir)
+            energies = arrays['x']      # X-axis values
+            edeltas = arrays['xerr']    # X-axis error values
+            rates = arrays['y']         # Y-axis values
+            errors = arrays['yerr']     # Y-axis error values
+            labels = arrays['labels']
 
             # Plot spectrum with error bars
             ax.errorbar(